@@ -0,0 +1,234 @@
+# address_index.py - Inverted-index address lookup with canonical tokenization
+import heapq
+import math
+import re
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+# Canonical forms so "123 Main Street", "123 main st." and "123 MAIN ST" index identically
+STREET_SUFFIXES = {
+    "street": "st", "str": "st", "st": "st",
+    "avenue": "ave", "av": "ave", "ave": "ave",
+    "road": "rd", "rd": "rd",
+    "drive": "dr", "dr": "dr",
+    "lane": "ln", "ln": "ln",
+    "boulevard": "blvd", "blvd": "blvd",
+    "court": "ct", "ct": "ct",
+    "place": "pl", "pl": "pl",
+    "parkway": "pkwy", "pkwy": "pkwy",
+    "highway": "hwy", "hwy": "hwy",
+    "circle": "cir", "cir": "cir",
+    "terrace": "ter", "ter": "ter",
+    "way": "way",
+}
+DIRECTIONS = {
+    "north": "n", "south": "s", "east": "e", "west": "w",
+    "n": "n", "s": "s", "e": "e", "w": "w",
+}
+ORDINALS = {
+    "first": "1st", "second": "2nd", "third": "3rd", "fourth": "4th", "fifth": "5th",
+    "sixth": "6th", "seventh": "7th", "eighth": "8th", "ninth": "9th", "tenth": "10th",
+}
+UNIT_WORDS = {"apt", "apartment", "unit", "suite", "ste"}
+
+# Token kinds, used for weighting: a matching street name says far more than a matching "st"
+NAME, NUMBER, SUFFIX = "name", "number", "suffix"
+KIND_WEIGHT = {NAME: 1.0, NUMBER: 1.5, SUFFIX: 0.1}
+HOUSE_NUMBER_MISMATCH_PENALTY = 0.5
+
+# Fuzzy matching: allowed typos per token length (tokens shorter than 4 characters must match exactly)
+FUZZY_MIN_TOKEN_LENGTH = 4
+FUZZY_LONG_TOKEN_LENGTH = 7
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+def tokenize_address(address: str) -> List[Tuple[str, str]]:
+    """Split an address into canonical (token, kind) pairs"""
+    tokens = []
+    skip_next = False
+    for raw in _TOKEN.findall(address.lower()):
+        if skip_next:
+            skip_next = False
+            continue
+        if raw in UNIT_WORDS:
+            skip_next = True  # Drop the unit number too
+            continue
+        if raw.isdigit():
+            tokens.append((raw, NUMBER))
+        elif raw in STREET_SUFFIXES or raw in DIRECTIONS:
+            tokens.append((STREET_SUFFIXES.get(raw) or DIRECTIONS[raw], SUFFIX))
+        else:
+            tokens.append((ORDINALS.get(raw, raw), NAME))
+    return tokens
+
+def canonical_address(address: str) -> str:
+    """Canonical spelling of an address, e.g. '123 Main Street' -> '123 main st'"""
+    return " ".join(token for token, _ in tokenize_address(address))
+
+def typo_distance(a: str, b: str) -> int:
+    """Edit distance where swapping two adjacent characters ("mian" / "main") counts as one typo"""
+    rows = [list(range(len(b) + 1))]
+    for i in range(1, len(a) + 1):
+        row = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            row[j] = min(rows[i - 1][j] + 1, row[j - 1] + 1, rows[i - 1][j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                row[j] = min(row[j], rows[i - 2][j - 2] + 1)
+        rows.append(row)
+    return rows[-1][-1]
+
+def allowed_typos(token: str) -> int:
+    if len(token) < FUZZY_MIN_TOKEN_LENGTH:
+        return 0
+    return 1 if len(token) < FUZZY_LONG_TOKEN_LENGTH else 2
+
+def _deletions(word: str, depth: int) -> Set[str]:
+    """The word plus every string made by deleting up to `depth` characters from it"""
+    variants = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+        variants |= frontier
+    return variants
+
+class TypoIndex:
+    """Symmetric-delete index for nearest-word lookups
+
+    Two words within k typos (insert, delete, replace or adjacent swap) always share a
+    variant obtained by deleting at most k characters from each, so candidates come
+    from a handful of dict lookups instead of comparing against every known word.
+    """
+
+    def __init__(self, words: Iterable[str] = (), max_typos: int = 2):
+        self.max_typos = max_typos
+        self._variants: Dict[str, Set[str]] = {}
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str) -> None:
+        for variant in _deletions(word, self.max_typos):
+            self._variants.setdefault(variant, set()).add(word)
+
+    def closest(self, word: str, max_typos: int) -> List[Tuple[str, int]]:
+        """Words within `max_typos` typos of `word`, closest first"""
+        candidates = set()
+        for variant in _deletions(word, min(max_typos, self.max_typos)):
+            candidates.update(self._variants.get(variant, ()))
+        matches = []
+        for candidate in candidates:
+            typos = typo_distance(word, candidate)
+            if typos <= max_typos:
+                matches.append((candidate, typos))
+        return sorted(matches, key=lambda match: (match[1], match[0]))
+
+# Misspelled suffixes ("avenu", "stret") are corrected before street names are
+_SUFFIX_TYPOS = TypoIndex((word for word in {**STREET_SUFFIXES, **DIRECTIONS} if len(word) >= FUZZY_MIN_TOKEN_LENGTH),
+                          max_typos=1)
+
+class AddressIndex:
+    """Maps addresses to records; lookups rank records by IDF-weighted token overlap"""
+
+    def __init__(self):
+        self._records: List[Any] = []
+        self._addresses: List[str] = []
+        self._house_numbers: List[str] = []
+        # token -> ids of addresses containing it (street name and house number tokens only)
+        self._postings: Dict[str, List[int]] = {}
+        # Suffix/direction tokens per address, used only to score candidates already found
+        self._suffixes: List[frozenset] = []
+        # Street name vocabulary for typo correction
+        self._name_typos = TypoIndex()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def add(self, address: str, record: Any) -> int:
+        doc_id = len(self._records)
+        tokens = tokenize_address(address)
+        self._records.append(record)
+        self._addresses.append(address)
+        self._house_numbers.append(next((token for token, kind in tokens if kind == NUMBER), ""))
+        self._suffixes.append(frozenset(token for token, kind in tokens if kind == SUFFIX))
+        for token, kind in set(tokens):
+            if kind == SUFFIX:
+                continue
+            if token not in self._postings:
+                self._postings[token] = []
+                if kind == NAME:
+                    self._name_typos.add(token)
+            self._postings[token].append(doc_id)
+        return doc_id
+
+    def _idf(self, token: str) -> float:
+        return math.log(1 + len(self._records) / len(self._postings[token]))
+
+    def _query_terms(self, query: str, fuzzy: bool) -> List[Tuple[int, str, str, float]]:
+        """(position, token, kind, factor) per query token; fuzzy adds typo corrections with factor < 1"""
+        terms = []
+        for position, (token, kind) in enumerate(tokenize_address(query)):
+            typos = allowed_typos(token) if fuzzy and kind == NAME and token not in self._postings else 0
+            if not typos:
+                terms.append((position, token, kind, 1.0))
+                continue
+            suffixes = _SUFFIX_TYPOS.closest(token, 1)
+            if suffixes:
+                word = suffixes[0][0]
+                terms.append((position, STREET_SUFFIXES.get(word) or DIRECTIONS[word], SUFFIX, 1.0))
+                continue
+            corrections = self._name_typos.closest(token, typos)
+            if not corrections:
+                terms.append((position, token, kind, 1.0))
+            for corrected, typos_used in corrections:
+                terms.append((position, corrected, NAME, 1 - typos_used / len(token)))
+        return terms
+
+    def _rank(self, terms: List[Tuple[int, str, str, float]], limit: int) -> List[Dict]:
+        scores: Dict[int, float] = {}
+        # doc id -> {query position: best match factor}, to report how much of the query matched
+        coverage: Dict[int, Dict[int, float]] = {}
+        matched_name = set()
+        for position, token, kind, factor in terms:
+            if kind == SUFFIX or token not in self._postings:
+                continue
+            weight = KIND_WEIGHT[kind] * self._idf(token) * factor
+            for doc_id in self._postings[token]:
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight
+                matched = coverage.setdefault(doc_id, {})
+                matched[position] = max(matched.get(position, 0.0), factor)
+                if kind == NAME:
+                    matched_name.add(doc_id)
+        if not scores:
+            return []
+
+        query_number = next((token for _, token, kind, _ in terms if kind == NUMBER), "")
+        query_suffixes = {token for _, token, kind, _ in terms if kind == SUFFIX}
+        for doc_id in scores:
+            if query_suffixes:
+                scores[doc_id] += KIND_WEIGHT[SUFFIX] * len(query_suffixes & self._suffixes[doc_id])
+            house_number = self._house_numbers[doc_id]
+            # A street match at another house number is a weaker (but still useful) candidate
+            if query_number and house_number and house_number != query_number and doc_id in matched_name:
+                scores[doc_id] *= HOUSE_NUMBER_MISMATCH_PENALTY
+
+        positions = len({position for position, _, kind, _ in terms if kind != SUFFIX})
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [
+            {
+                "address": self._addresses[doc_id],
+                "record": self._records[doc_id],
+                "score": round(score, 4),
+                "match": round(sum(coverage[doc_id].values()) / positions, 3)
+            }
+            for doc_id, score in best
+        ]
+
+    def search(self, query: str, limit: int = 5) -> List[Dict]:
+        """Return up to `limit` matches as {"address", "record", "score", "match"}, best first
+
+        "match" is the share of the query's street-name and house-number tokens found in the address.
+        """
+        return self._rank(self._query_terms(query, fuzzy=False), limit)
+
+    def fuzzy_search(self, query: str, limit: int = 5) -> List[Dict]:
+        """Like search(), but misspelled street names and suffixes match their closest indexed spelling"""
+        return self._rank(self._query_terms(query, fuzzy=True), limit)
@@ -0,0 +1,80 @@
+# analytics.py - Incrementally maintained conversation analytics for /analytics/summary
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# Configuration
+ANALYTICS_ACTIVE_WINDOW = int(os.getenv("ANALYTICS_ACTIVE_WINDOW", 3600))  # Seconds since last turn to count as active
+
+class ConversationAnalytics:
+    """Counters updated once per turn, so a summary never walks the sessions
+
+    Counts are per worker process (each gunicorn worker reports the turns it handled).
+    """
+
+    def __init__(self, active_window: float = ANALYTICS_ACTIVE_WINDOW, clock=time.monotonic):
+        self.active_window = active_window
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last_seen: "OrderedDict[str, float]" = OrderedDict()  # session id -> last turn, oldest first
+        self.sessions_started = 0
+        self.turns = 0
+        self.interactions = 0  # Conversation history entries written (user and bot)
+        self.escalations = 0
+        self.intents: Dict[str, int] = {}  # Intent detected at the start of a conversation -> count
+        self.funnel: Dict[str, Dict[str, int]] = {}  # Flow intent -> {step reached or "finished": count}
+
+    def record_turn(self, session_id: str, new_session: bool, intent: Optional[str], step_before: int,
+                    flow_before: Optional[str], flow_after: Optional[str], step_after: int,
+                    history_entries: int, escalated: bool) -> None:
+        """Account for one processed turn
+
+        intent is the intent detected this turn (None when the turn continued a flow);
+        flow/step before and after are the session's flow intent and step around the turn.
+        """
+        now = self._clock()
+        with self._lock:
+            self._last_seen[session_id] = now
+            self._last_seen.move_to_end(session_id)
+            self._expire(now)
+            self.sessions_started += new_session
+            self.turns += 1
+            self.interactions += history_entries
+            self.escalations += escalated
+            if intent is not None:
+                self.intents[intent] = self.intents.get(intent, 0) + 1
+            if step_after and (step_after != step_before or flow_after != flow_before):
+                steps = self.funnel.setdefault(flow_after or "unknown", {})
+                steps[str(step_after)] = steps.get(str(step_after), 0) + 1
+            if step_before and not step_after:
+                steps = self.funnel.setdefault(flow_before or "unknown", {})
+                steps["finished"] = steps.get("finished", 0) + 1
+
+    def _expire(self, now: float) -> None:
+        # Oldest activity is at the front, so only sessions that just went idle are visited
+        while self._last_seen:
+            session_id, seen = next(iter(self._last_seen.items()))
+            if now - seen < self.active_window:
+                break
+            self._last_seen.popitem(last=False)
+
+    def active_sessions(self) -> int:
+        with self._lock:
+            self._expire(self._clock())
+            return len(self._last_seen)
+
+    def summary(self) -> Dict:
+        active = self.active_sessions()
+        with self._lock:
+            return {
+                "total_sessions": self.sessions_started,
+                "active_sessions": active,
+                "active_window_seconds": self.active_window,
+                "total_turns": self.turns,
+                "total_interactions": self.interactions,
+                "escalations": self.escalations,
+                "intent_distribution": dict(self.intents),
+                "step_funnel": {flow: dict(steps) for flow, steps in self.funnel.items()}
+            }
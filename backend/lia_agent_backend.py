@@ -1,13 +1,55 @@
 # LIA – Agentic AI Architecture (CrewAI-style) with FastAPI + Session Memory
 
+from collections import OrderedDict
 from typing import Dict, Optional, List
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
+import asyncio
+import logging
+import os
+import sys
+import time
 import uvicorn
 
+# conversation_history and metrics are shared with main.py in the repository root, which is not on
+# sys.path when this file is run directly or served from backend/ (uvicorn lia_agent_backend:app)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from conversation_history import ConversationHistory
+from llm_intent import LLMIntentClassifier, create_llm_intent_classifier
+from metrics import registry as metrics_registry
+
+logger = logging.getLogger(__name__)
+
+# === Configuration ===
+AGENT_TIMEOUT = float(os.getenv("AGENT_TIMEOUT", 2.0))  # Seconds an agent may take before the orchestrator gives up
+AGENT_LATENCY = float(os.getenv("AGENT_LATENCY", 0))  # Simulated seconds per city system lookup (demo data)
+SPECULATIVE_AGENTS = os.getenv("SPECULATIVE_AGENTS", "true").lower() == "true"  # Start the session's last agent alongside a slow intent agent
+
+AGENT_SECONDS = metrics_registry.histogram("lia_agent_duration_seconds", "Agent call latency by outcome", ["agent", "status"])
+
 # === Session Memory ===
-session_memory: Dict[str, List[str]] = {}
+# Each session keeps a bounded history; older messages fold into its summary
+session_memory: "OrderedDict[str, ConversationHistory]" = OrderedDict()  # Least recently used first
+session_intents: Dict[str, str] = {}  # Last detected intent, used to pick the speculative agent
+MEMORY_WINDOW = int(os.getenv("MEMORY_WINDOW", 10))  # Messages returned with each response
+MEMORY_MAX_SESSIONS = int(os.getenv("MEMORY_MAX_SESSIONS", 10000))  # Sessions kept; the least recently used are dropped
+
+def session_history(session_id: str) -> ConversationHistory:
+    """The session's history, marked as most recently used; drops the oldest sessions past MEMORY_MAX_SESSIONS"""
+    memory = session_memory.get(session_id)
+    if memory is None:
+        memory = session_memory[session_id] = ConversationHistory()
+        while len(session_memory) > MEMORY_MAX_SESSIONS:
+            evicted, _ = session_memory.popitem(last=False)
+            session_intents.pop(evicted, None)
+    else:
+        session_memory.move_to_end(session_id)
+    return memory
 
 # === FastAPI App ===
 app = FastAPI()
@@ -27,19 +69,48 @@ class ChatRequest(BaseModel):
     context: Optional[Dict] = {}
     session_id: Optional[str] = "default"
 
+class AgentTiming(BaseModel):
+    agent: str
+    status: str  # ok, timeout, error or cancelled
+    ms: float
+    speculative: bool = False
+
 class ChatResponse(BaseModel):
     response: str
-    memory: List[str]
+    memory: List[str]  # Last MEMORY_WINDOW messages
+    summary: str = ""  # Rolling summary of the messages before the window's buffer
+    intent: str = ""
+    agents: List[AgentTiming] = []  # Every agent call made for this message, in start order
 
 # === Agent Definitions ===
 class BaseAgent:
+    timeout = AGENT_TIMEOUT  # Seconds before the orchestrator cancels the call
+    speculative_safe = False  # Read-only agents may be started before the intent is known
+    awaits_io = False  # ahandle waits on a remote call (city system, LLM) rather than answering inline
+
     def __init__(self, name: str):
         self.name = name
 
     def handle(self, input_text: str, context: dict) -> str:
         raise NotImplementedError
 
+    async def ahandle(self, input_text: str, context: dict) -> str:
+        """Async entry point used by the orchestrator; agents that do I/O override it"""
+        return self.handle(input_text, context)
+
+class LookupAgent(BaseAgent):
+    """Agent answering from a city system; the demo data stands in for the call (AGENT_LATENCY)"""
+
+    awaits_io = True
+
+    async def ahandle(self, input_text: str, context: dict) -> str:
+        if AGENT_LATENCY:
+            await asyncio.sleep(AGENT_LATENCY)
+        return self.handle(input_text, context)
+
 class IntentAgent(BaseAgent):
+    # Keyword matching answers inline (awaits_io False), so there is no detection time for a
+    # speculative agent to overlap with; LLMIntentAgent waits on the model and sets awaits_io
     def __init__(self):
         super().__init__("Intent Agent")
 
@@ -56,7 +127,29 @@ class IntentAgent(BaseAgent):
         else:
             return "unknown"
 
-class BillAgent(BaseAgent):
+class LLMIntentAgent(IntentAgent):
+    """Intent detection by the LLM classifier (keyword fallback included)"""
+
+    awaits_io = True
+
+    def __init__(self, classifier: LLMIntentClassifier):
+        super().__init__()
+        self.classifier = classifier
+        # The classifier answers within its own deadline, falling back to keywords; don't cut it short
+        self.timeout = max(AGENT_TIMEOUT, classifier.deadline + 0.5)
+
+    async def ahandle(self, input_text: str, context: dict) -> str:
+        detected = await self.classifier.detect(input_text)
+        return detected["intent"]
+
+def create_intent_agent() -> IntentAgent:
+    """LLMIntentAgent when LLM intent detection is configured (see llm_intent.py), else keyword matching"""
+    classifier = create_llm_intent_classifier()
+    return IntentAgent() if classifier is None else LLMIntentAgent(classifier)
+
+class BillAgent(LookupAgent):
+    speculative_safe = True
+
     def __init__(self):
         super().__init__("Bill Agent")
 
@@ -68,7 +161,9 @@ class BillAgent(BaseAgent):
             return f"Bill for {address}: $82.35. Would you like to proceed with payment?"
         return f"No bill found for {address}."
 
-class TicketAgent(BaseAgent):
+class TicketAgent(LookupAgent):
+    speculative_safe = True
+
     def __init__(self):
         super().__init__("Ticket Agent")
 
@@ -80,7 +175,8 @@ class TicketAgent(BaseAgent):
             return "Ticket 123 found. Fine: $45.00. Would you like to pay now?"
         return "Ticket not found."
 
-class PermitAgent(BaseAgent):
+class PermitAgent(LookupAgent):
+    # Submits an application, so it only runs once the intent is confirmed
     def __init__(self):
         super().__init__("Permit Agent")
 
@@ -92,38 +188,113 @@ class PermitAgent(BaseAgent):
         return f"Your {permit_type} permit application for {location} has been submitted."
 
 # === Orchestrator Agent ===
+UNKNOWN_REPLY = "I'm not sure how to help with that. Please try again."
+TIMEOUT_REPLY = "That service is taking longer than expected. Please try again in a moment."
+ERROR_REPLY = "Something went wrong while handling your request. Please try again."
+
 class LIAOrchestrator:
-    def __init__(self):
-        self.intent_agent = IntentAgent()
+    """Detects the intent and runs the matching agent
+
+    With a likely intent (the session's previous one), a read-only agent for it starts
+    concurrently with intent detection and is cancelled if the guess turns out wrong.
+    That only pays off while intent detection waits on I/O (intent_agent.awaits_io); with
+    the keyword IntentAgent the guess would just add a task per message, so it is skipped.
+    """
+
+    def __init__(self, intent_agent: Optional[IntentAgent] = None):
+        self.intent_agent = intent_agent or IntentAgent()
         self.agents = {
             "pay_bill": BillAgent(),
             "pay_ticket": TicketAgent(),
             "apply_permit": PermitAgent()
         }
 
-    def run(self, user_input: str, context: dict = {}) -> str:
-        intent = self.intent_agent.handle(user_input, context)
-        agent = self.agents.get(intent)
-        if agent:
-            return agent.handle(user_input, context)
-        return "I'm not sure how to help with that. Please try again."
+    async def call(self, agent: BaseAgent, input_text: str, context: dict, timings: List[Dict],
+                   speculative: bool = False) -> Dict:
+        """Run one agent under its timeout; the timing record is added to timings even if cancelled"""
+        record = {"agent": agent.name, "status": "cancelled", "ms": 0.0, "speculative": speculative}
+        timings.append(record)
+        started = time.perf_counter()
+        try:
+            record["output"] = await asyncio.wait_for(agent.ahandle(input_text, context), agent.timeout)
+            record["status"] = "ok"
+        except asyncio.TimeoutError:
+            record["status"] = "timeout"
+            logger.warning(f"{agent.name} timed out after {agent.timeout}s")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            record["status"] = "error"
+            logger.error(f"{agent.name} failed: {e}")
+        finally:
+            elapsed = time.perf_counter() - started
+            record["ms"] = round(elapsed * 1000, 2)
+            AGENT_SECONDS.observe(elapsed, agent.name, record["status"])
+        return record
+
+    async def run(self, user_input: str, context: dict = {}, likely_intent: Optional[str] = None) -> Dict:
+        timings: List[Dict] = []
+        likely_agent = self.agents.get(likely_intent) if SPECULATIVE_AGENTS and self.intent_agent.awaits_io else None
+        speculative = None
+        if likely_agent is not None and likely_agent.speculative_safe:
+            speculative = asyncio.create_task(self.call(likely_agent, user_input, context, timings, speculative=True))
 
-lia_core = LIAOrchestrator()
+        try:
+            detected = await self.call(self.intent_agent, user_input, context, timings)
+            intent = detected.get("output", "unknown")
+            agent = self.agents.get(intent)
+            if speculative is not None and agent is likely_agent:
+                result = await speculative
+            else:
+                if speculative is not None:
+                    speculative.cancel()
+                    await asyncio.gather(speculative, return_exceptions=True)
+                if detected["status"] != "ok":
+                    result = detected  # Reply with the detection's timeout or error, not "not sure"
+                else:
+                    result = await self.call(agent, user_input, context, timings) if agent else None
+        finally:
+            if speculative is not None and not speculative.done():
+                speculative.cancel()
+
+        if result is None:
+            response = UNKNOWN_REPLY
+        elif result["status"] == "ok":
+            response = result["output"]
+        else:
+            response = TIMEOUT_REPLY if result["status"] == "timeout" else ERROR_REPLY
+        return {"response": response, "intent": intent, "agents": timings}
+
+lia_core = LIAOrchestrator(create_intent_agent())
+
+@app.on_event("shutdown")
+async def close_intent_classifier():
+    if isinstance(lia_core.intent_agent, LLMIntentAgent):
+        await lia_core.intent_agent.classifier.aclose()
 
 # === FastAPI Route ===
 @app.post("/chat", response_model=ChatResponse)
-def chat(request: ChatRequest):
+async def chat(request: ChatRequest):
     session_id = request.session_id or "default"
-    response = lia_core.run(request.user_input, request.context or {})
+    result = await lia_core.run(request.user_input, request.context or {}, session_intents.get(session_id))
+    response = result["response"]
+    if result["intent"] in lia_core.agents:
+        session_intents[session_id] = result["intent"]
 
     # Update session memory
-    if session_id not in session_memory:
-        session_memory[session_id] = []
-    session_memory[session_id].append(f"User: {request.user_input}")
-    session_memory[session_id].append(f"LIA: {response}")
+    memory = session_history(session_id)
+    memory.append("user", request.user_input)
+    memory.append("bot", response)
+
+    window = [f"{'User' if turn.role == 'user' else 'LIA'}: {turn.text}" for turn in memory.window(MEMORY_WINDOW)]
+    return ChatResponse(response=response, memory=window, summary=memory.summary(),
+                        intent=result["intent"], agents=result["agents"])
 
-    return ChatResponse(response=response, memory=session_memory[session_id])
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus scrape endpoint (agent latencies)"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
 
 # === Run the server (for local dev) ===
 # if __name__ == "__main__":
-#     uvicorn.run("lia_agent_architecture:app", host="0.0.0.0", port=8000, reload=True)
+#     uvicorn.run("backend.lia_agent_backend:app", host="0.0.0.0", port=8000, reload=True)
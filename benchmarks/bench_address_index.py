@@ -0,0 +1,106 @@
+# benchmarks/bench_address_index.py - Address index vs. the original linear substring scan
+#
+# Generates synthetic city address books of increasing size and times lookups.
+#
+#   python benchmarks/bench_address_index.py --sizes 1000,10000,100000
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from address_index import AddressIndex
+
+SYLLABLES = ["ma", "in", "ol", "ive", "pi", "ne", "oak", "ce", "dar", "wil", "low", "bir", "ch", "el", "m",
+             "ash", "ford", "ham", "ton", "ville", "brook", "wood", "field", "lake", "hill", "ridge", "view"]
+SUFFIXES = ["street", "st", "avenue", "ave", "road", "rd", "drive", "lane", "boulevard", "court", "way"]
+
+def street_names(count: int, rng: random.Random):
+    names = set()
+    while len(names) < count:
+        names.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))))
+    return sorted(names)
+
+def address_book(size: int, rng: random.Random):
+    streets = street_names(max(50, size // 40), rng)
+    return [f"{rng.randint(1, 9999)} {rng.choice(streets)} {rng.choice(SUFFIXES)}" for _ in range(size)]
+
+def with_typo(address: str, rng: random.Random) -> str:
+    """Misspell the street name the way people do: swap, drop or replace one letter"""
+    number, street, suffix = address.split(" ")
+    i = rng.randrange(len(street) - 1)
+    kind = rng.choice(["swap", "drop", "replace"])
+    if kind == "swap":
+        street = street[:i] + street[i + 1] + street[i] + street[i + 2:]
+    elif kind == "drop":
+        street = street[:i] + street[i + 1:]
+    else:
+        street = street[:i] + rng.choice("aeioumnrst") + street[i + 1:]
+    return f"{number} {street} {suffix}"
+
+def legacy_search(address: str, addresses):
+    """The original search_by_address bill scan, kept for comparison"""
+    address_clean = address.lower().strip()
+    address_clean = address_clean.replace("street", "st").replace("avenue", "ave").replace("road", "rd")
+    for addr in addresses:
+        addr_normalized = addr.replace("street", "st").replace("avenue", "ave").replace("road", "rd")
+        if any(part in addr_normalized for part in address_clean.split()) or any(part in address_clean for part in addr_normalized.split()):
+            return addr
+    return None
+
+def time_lookups(search, queries) -> float:
+    started = time.perf_counter()
+    for query in queries:
+        search(query)
+    return (time.perf_counter() - started) / len(queries)
+
+def main():
+    parser = argparse.ArgumentParser(description="Address index benchmark")
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--legacy-queries", type=int, default=20, help="The linear scan is slow; use fewer queries")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'addresses':>10} {'build ms':>9} {'index us':>9} {'legacy us':>10} {'index miss us':>14}"
+          f" {'legacy miss us':>15} {'index exact':>12} {'legacy exact':>13}")
+    typo_results = []
+    for size in [int(s) for s in args.sizes.split(",")]:
+        addresses = address_book(size, rng)
+        started = time.perf_counter()
+        index = AddressIndex()
+        for addr in addresses:
+            index.add(addr, addr)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        # Users type the same address in other spellings: "123 Main Street" vs "123 main st"
+        targets = [rng.choice(addresses) for _ in range(args.queries)]
+        queries = [t.replace(" street", " St").replace(" avenue", " Ave").title() for t in targets]
+        index_us = time_lookups(lambda q: index.search(q, limit=5), queries) * 1e6
+        # Non-unique addresses can legitimately tie; count a hit when the top result is the same street address
+        exact = sum(index.search(q, limit=1)[0]["address"] == t for q, t in zip(queries, targets)) / len(queries)
+        legacy_queries = queries[:args.legacy_queries]
+        legacy_us = time_lookups(lambda q: legacy_search(q, addresses), legacy_queries) * 1e6
+        legacy_exact = sum(legacy_search(q, addresses) == t for q, t in zip(legacy_queries, targets)) / len(legacy_queries)
+        # Addresses that are not on file force the linear scan through every record
+        misses = [f"Zzyzx Qx{i}" for i in range(args.legacy_queries)]
+        index_miss_us = time_lookups(lambda q: index.search(q, limit=5), misses) * 1e6
+        legacy_miss_us = time_lookups(lambda q: legacy_search(q, addresses), misses) * 1e6
+        print(f"{size:>10} {build_ms:>9.1f} {index_us:>9.1f} {legacy_us:>10.1f} {index_miss_us:>14.1f}"
+              f" {legacy_miss_us:>15.1f} {exact:>11.1%} {legacy_exact:>12.1%}")
+        typo_results.append((size, index, targets))
+
+    # Typo-tolerant lookups: the correct address should be among the top-5 candidates
+    print(f"\n{'addresses':>10} {'fuzzy us':>9} {'top-1':>7} {'top-5':>7}")
+    for size, index, targets in typo_results:
+        typo_queries = [with_typo(t, rng) for t in targets]
+        fuzzy_us = time_lookups(lambda q: index.fuzzy_search(q, limit=5), typo_queries) * 1e6
+        ranked = [[r["address"] for r in index.fuzzy_search(q, limit=5)] for q in typo_queries]
+        top1 = sum(bool(r) and r[0] == t for r, t in zip(ranked, targets)) / len(targets)
+        top5 = sum(t in r for r, t in zip(ranked, targets)) / len(targets)
+        print(f"{size:>10} {fuzzy_us:>9.1f} {top1:>6.1%} {top5:>6.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/bench_agent_orchestrator.py - Agent backend latency: sequential vs. speculative agent fan-out
+#
+# Sends follow-up messages (same intent as the session's previous turn, the
+# case speculation targets) plus a share of intent switches through the
+# agent backend's /chat in-process. Intent detection takes --intent-latency
+# seconds (standing in for an LLM call) and every lookup agent takes
+# --agent-latency seconds.
+#
+#   sequential   SPECULATIVE_AGENTS=false: intent, then the agent
+#   speculative  the session's last agent starts alongside intent detection
+#
+#   python benchmarks/bench_agent_orchestrator.py --intent-latency 0.15 --agent-latency 0.1
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+import backend.lia_agent_backend as agent_backend
+
+MESSAGES = [
+    ("pay my water bill", {"address": "456 Olive Ave"}),
+    ("check my bill", {"address": "456 Olive Ave"}),
+    ("what about the bill total", {"address": "456 Olive Ave"}),
+    ("I also have a parking ticket", {"ticket_id": "123"}),
+    ("pay the ticket now", {"ticket_id": "123"}),
+]
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+async def run_client(client: httpx.AsyncClient, index: int, conversations: int, latencies: list, statuses: dict) -> None:
+    for n in range(conversations):
+        session_id = f"bench-{index}-{n}"
+        for text, context in MESSAGES:
+            started = time.perf_counter()
+            response = await client.post("/chat", json={"user_input": text, "context": context, "session_id": session_id})
+            latencies.append(time.perf_counter() - started)
+            for call in response.json()["agents"]:
+                key = f"{call['status']}{' (speculative)' if call['speculative'] else ''}"
+                statuses[key] = statuses.get(key, 0) + 1
+
+async def run_mode(speculative: bool, clients: int, conversations: int) -> dict:
+    agent_backend.SPECULATIVE_AGENTS = speculative
+    agent_backend.session_intents.clear()
+    latencies, statuses = [], {}
+    transport = httpx.ASGITransport(app=agent_backend.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await asyncio.gather(*(run_client(client, i, conversations, latencies, statuses) for i in range(clients)))
+    return {"latencies": latencies, "statuses": statuses}
+
+async def main_async(args) -> None:
+    intent_agent = agent_backend.lia_core.intent_agent
+    detect = intent_agent.handle
+    async def slow_intent(input_text, context):
+        await asyncio.sleep(args.intent_latency)
+        return detect(input_text, context)
+    intent_agent.ahandle = slow_intent
+    intent_agent.awaits_io = True  # Speculation only runs alongside an intent agent that waits on I/O
+    agent_backend.AGENT_LATENCY = args.agent_latency
+
+    print(f"intent {args.intent_latency * 1000:.0f} ms, lookup agents {args.agent_latency * 1000:.0f} ms, "
+          f"{args.clients} clients x {args.conversations} conversations of {len(MESSAGES)} messages")
+    print(f"{'mode':<12} {'p50 ms':>8} {'p95 ms':>8}  agent calls")
+    for mode in ("sequential", "speculative"):
+        result = await run_mode(mode == "speculative", args.clients, args.conversations)
+        calls = ", ".join(f"{key} {count}" for key, count in sorted(result["statuses"].items()))
+        print(f"{mode:<12} {percentile(result['latencies'], 50) * 1000:>8.1f} "
+              f"{percentile(result['latencies'], 95) * 1000:>8.1f}  {calls}")
+
+def main_bench():
+    parser = argparse.ArgumentParser(description="Agent orchestrator benchmark")
+    parser.add_argument("--intent-latency", type=float, default=0.15, help="Seconds per intent detection")
+    parser.add_argument("--agent-latency", type=float, default=0.1, help="Seconds per lookup agent call")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--conversations", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    asyncio.run(main_async(args))
+
+if __name__ == "__main__":
+    main_bench()
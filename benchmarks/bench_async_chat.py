@@ -0,0 +1,111 @@
+# benchmarks/bench_async_chat.py - Chat concurrency with I/O-bound flow steps: async handlers vs. the threadpool model
+#
+# Drives mixed conversations (bill payment, status lookup, issue report,
+# greeting plus permit application) through the ASGI app in-process from
+# --clients concurrent clients while every city records or payment call
+# takes --latency seconds.
+#
+#   async       flow handlers await city_data and call_city_backend; a waiting turn holds nothing
+#   threadpool  each records or backend call blocks one of the anyio threadpool workers,
+#               as it did when /chat ran whole turns in the threadpool
+#
+#   python benchmarks/bench_async_chat.py --latency 0.1 --clients 50,200,400
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SESSION_BACKEND", "memory")
+os.environ["CITY_DATA_BACKEND"] = "memory"
+os.environ.setdefault("INTERACTION_LOG_PATH", os.devnull)
+os.environ.setdefault("LLM_INTENT_ENABLED", "false")
+
+import anyio
+import httpx
+from fastapi.concurrency import run_in_threadpool
+
+import main
+
+CONVERSATIONS = [
+    ["I want to pay my water bill", "123 Main Street", "Yes, pay now", "continue_payment"],
+    ["check my application status", "Look up by address", "123 Main Street"],
+    ["I want to report an issue", "Pothole", "Main and 3rd"],
+    ["hello", "I need a permit", "Event permit", "12 Oak Street"],
+]
+
+async def async_backend_call(fn, *args):
+    await asyncio.sleep(main.BACKEND_LATENCY)
+    return fn(*args)
+
+def blocking_backend_call_sync(fn, args):
+    time.sleep(main.BACKEND_LATENCY)
+    return fn(*args)
+
+async def threadpool_backend_call(fn, *args):
+    return await run_in_threadpool(blocking_backend_call_sync, fn, args)
+
+async def async_round_trip():
+    await asyncio.sleep(main.BACKEND_LATENCY)
+
+async def threadpool_round_trip():
+    await run_in_threadpool(time.sleep, main.BACKEND_LATENCY)
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+async def run_client(client: httpx.AsyncClient, index: int, deadline: float, stats: dict) -> None:
+    i = index
+    while time.monotonic() < deadline:
+        session_id = None
+        for message in CONVERSATIONS[i % len(CONVERSATIONS)]:
+            started = time.monotonic()
+            response = await client.post("/chat", json={"message": message, "session_id": session_id})
+            stats["latencies"].append(time.monotonic() - started)
+            body = response.json()
+            session_id = body["session_id"]
+            if response.status_code != 200 or body["needs_escalation"]:
+                stats["errors"] += 1
+        stats["conversations"] += 1
+        i += 1
+
+async def run_mode(mode: str, clients: int, duration: float) -> dict:
+    main.call_city_backend = async_backend_call if mode == "async" else threadpool_backend_call
+    # In-memory records (CITY_DATA_BACKEND=memory) wait the same latency per lookup
+    main.city_data._round_trip = async_round_trip if mode == "async" else threadpool_round_trip
+    stats = {"conversations": 0, "errors": 0, "latencies": []}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        deadline = time.monotonic() + duration
+        started = time.monotonic()
+        await asyncio.gather(*(run_client(client, i, deadline, stats) for i in range(clients)))
+        stats["elapsed"] = time.monotonic() - started
+    return stats
+
+async def main_async(args) -> None:
+    main.BACKEND_LATENCY = args.latency
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    print(f"backend latency {args.latency * 1000:.0f} ms per call, threadpool size {limiter.total_tokens}")
+    print(f"{'clients':>7} {'mode':<10} {'conv/s':>8} {'turns/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    for clients in args.clients:
+        for mode in ("threadpool", "async"):
+            stats = await run_mode(mode, clients, args.duration)
+            turns = len(stats["latencies"])
+            print(f"{clients:>7} {mode:<10} {stats['conversations'] / stats['elapsed']:>8.1f} "
+                  f"{turns / stats['elapsed']:>8.1f} {percentile(stats['latencies'], 50) * 1000:>8.1f} "
+                  f"{percentile(stats['latencies'], 95) * 1000:>8.1f} {stats['errors']:>7}")
+
+def main_bench():
+    parser = argparse.ArgumentParser(description="Async chat concurrency benchmark")
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds per city records/payment call")
+    parser.add_argument("--clients", type=lambda v: [int(c) for c in v.split(",")], default=[50, 200, 400])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per run")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    asyncio.run(main_async(args))
+
+if __name__ == "__main__":
+    main_bench()
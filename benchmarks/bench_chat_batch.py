@@ -0,0 +1,127 @@
+# benchmarks/bench_chat_batch.py - SMS gateway bursts: /chat/batch vs. one POST /chat per message
+#
+# Builds a burst of --sessions short conversations (bill payment, status
+# lookup, greeting) and delivers it to a uvicorn server started for the run:
+#
+#   individual  one POST /chat per message, --concurrency sessions at a time,
+#               each session's messages sent in order
+#   batch       the burst cut into /chat/batch requests of --batch-size
+#               messages; later batches wait for earlier ones, as a gateway
+#               draining its queue would
+#
+# Both deliveries produce the same replies; the script checks it.
+#
+#   python benchmarks/bench_chat_batch.py --sessions 400 --batch-size 100,500
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONVERSATIONS = [
+    ["I want to pay my water bill", "123 Main Street", "Yes, pay now"],
+    ["check my application status", "Look up by address", "123 Main Street"],
+    ["hello", "I want to report an issue", "Pothole", "Main and 3rd"],
+]
+
+def start_server(port: int) -> subprocess.Popen:
+    env = dict(os.environ, SESSION_BACKEND="memory", INTERACTION_LOG_PATH=os.devnull, LLM_INTENT_ENABLED="false")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+def wait_healthy(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not become healthy")
+
+def build_burst(sessions: int, run: str) -> list:
+    # Messages interleaved across sessions, as they arrive from the gateway
+    scripts = [(f"{run}-{i}", CONVERSATIONS[i % len(CONVERSATIONS)]) for i in range(sessions)]
+    burst = []
+    for turn in range(max(len(script) for _, script in scripts)):
+        for session_id, script in scripts:
+            if turn < len(script):
+                burst.append({"session_id": session_id, "message": script[turn]})
+    return burst
+
+async def send_individually(client: httpx.AsyncClient, burst: list, concurrency: int) -> list:
+    replies = [None] * len(burst)
+    by_session = {}
+    for position, message in enumerate(burst):
+        by_session.setdefault(message["session_id"], []).append(position)
+    slots = asyncio.Semaphore(concurrency)
+    async def send_session(positions):
+        async with slots:
+            for position in positions:
+                response = await client.post("/chat", json=burst[position])
+                replies[position] = response.json()["reply"]
+    await asyncio.gather(*(send_session(positions) for positions in by_session.values()))
+    return replies
+
+async def send_batches(client: httpx.AsyncClient, burst: list, batch_size: int) -> list:
+    replies = []
+    for start in range(0, len(burst), batch_size):
+        response = await client.post("/chat/batch", json={"messages": burst[start:start + batch_size]})
+        replies.extend(result["reply"] for result in response.json()["results"])
+    return replies
+
+def normalize(replies: list) -> list:
+    # Receipt and reference numbers differ between runs
+    return [" ".join(word for word in reply.split() if not any(ch.isdigit() for ch in word)) for reply in replies]
+
+async def main_async(args, base_url: str) -> None:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        await send_individually(client, build_burst(50, "warmup"), args.concurrency)
+        print(f"{args.sessions} sessions, {len(build_burst(args.sessions, 'x'))} messages per burst")
+        print(f"{'delivery':<20} {'msgs/s':>9} {'speedup':>8}")
+        baseline_rate, baseline_replies = None, None
+        modes = [("individual", None)] + [(f"batch of {size}", size) for size in args.batch_size]
+        for round_number in range(args.rounds):
+            for label, size in modes:
+                burst = build_burst(args.sessions, f"r{round_number}-{label}")
+                started = time.perf_counter()
+                if size is None:
+                    replies = await send_individually(client, burst, args.concurrency)
+                else:
+                    replies = await send_batches(client, burst, size)
+                rate = len(burst) / (time.perf_counter() - started)
+                if size is None:
+                    baseline_rate, baseline_replies = rate, normalize(replies)
+                elif normalize(replies) != baseline_replies:
+                    raise SystemExit(f"{label}: replies differ from individual delivery")
+                print(f"{label:<20} {rate:>9.0f} {rate / baseline_rate:>7.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch chat API benchmark")
+    parser.add_argument("--sessions", type=int, default=400, help="Conversations per burst")
+    parser.add_argument("--batch-size", type=lambda v: [int(s) for s in v.split(",")], default=[100, 500])
+    parser.add_argument("--concurrency", type=int, default=32, help="Sessions posted at a time in individual mode")
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = start_server(args.port)
+    try:
+        wait_healthy(base_url)
+        asyncio.run(main_async(args, base_url))
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/bench_date_parser.py - Garage sale date parsing: date_parser vs. the original validator
+#
+#   python benchmarks/bench_date_parser.py --rounds 2000
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import date_parser
+from date_parser import normalize_date_phrase, parse_date_phrase
+
+# Phrasings users actually type when asked for a sale date
+CORPUS = [
+    "June 8", "june 8th", "June 8, 2026", "Jun 8", "6/8", "06/08", "6/8/26", "2026-06-08",
+    "Saturday", "this saturday", "next Saturday", "Sat", "sat and sun", "Saturday to Sunday",
+    "tomorrow", "day after tomorrow", "today", "this weekend", "next weekend",
+    "in 3 days", "in a week", "in two weeks",
+    "June 8-9", "June 8 - 9", "June 8th to the 9th", "june 8 and 9", "June 30 - July 1", "6/8-6/9", "6/8-9",
+    "8 June", "the 8th of June", "8-9 june", "On June 8th", "for next saturday",
+    "  JUNE 8TH  ", "June 8th, 2026 through the 10th", "Oct 31 - Nov 1", "dec 31-jan 1",
+    "someday", "asap", "feb 30", "13/45",
+]
+
+def legacy_validate(date_str: str) -> dict:
+    """The original validate_garage_sale_date parsing, kept for comparison"""
+    try:
+        from datetime import datetime, timedelta
+        import re
+
+        date_str = date_str.lower().strip()
+        current_date = datetime.now()
+        if re.match(r'^(january|february|march|april|may|june|july|august|september|october|november|december)\s+\d{1,2}', date_str):
+            date_str = re.sub(r'(st|nd|rd|th)', '', date_str)
+            try:
+                parsed_date = datetime.strptime(f"{date_str} {current_date.year}", "%B %d %Y")
+            except:
+                parsed_date = datetime.strptime(f"{date_str} {current_date.year}", "%b %d %Y")
+        elif re.match(r'\d{1,2}/\d{1,2}', date_str):
+            try:
+                parsed_date = datetime.strptime(f"{date_str}/{current_date.year}", "%m/%d/%Y")
+            except:
+                return {"valid": False, "error": "format"}
+        elif re.match(r'\d{4}-\d{2}-\d{2}', date_str):
+            parsed_date = datetime.strptime(date_str, "%Y-%m-%d")
+        else:
+            try:
+                parsed_date = datetime.strptime(date_str, "%B %d")
+                parsed_date = parsed_date.replace(year=current_date.year)
+            except:
+                return {"valid": False, "error": "format"}
+        return {"valid": True, "parsed_date": parsed_date}
+    except Exception:
+        return {"valid": False, "error": "format"}
+
+def timed(fn, phrases, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for phrase in phrases:
+            fn(phrase)
+    return (time.perf_counter() - started) / (rounds * len(phrases)) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Date parser benchmark")
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    today = date.today()
+    legacy_understood = sum(legacy_validate(p)["valid"] for p in CORPUS)
+    understood = sum(parse_date_phrase(p, today) is not None for p in CORPUS)
+    print(f"corpus: {len(CORPUS)} phrasings")
+    print(f"understood: original {legacy_understood}, date_parser {understood}")
+
+    both = [p for p in CORPUS if legacy_validate(p)["valid"] and parse_date_phrase(p, today) is not None]
+    uncached = lambda p: date_parser._parse_normalized.__wrapped__(normalize_date_phrase.__wrapped__(p), today)
+    cached = lambda p: parse_date_phrase(p, today)
+    print(f"\n{'phrases':<22} {'original us':>12} {'uncached us':>12} {'cached us':>10} {'speedup':>8}")
+    for label, phrases in (("all", CORPUS), ("both understand", both)):
+        legacy_us = timed(legacy_validate, phrases, args.rounds)
+        uncached_us = timed(uncached, phrases, args.rounds)
+        cached_us = timed(cached, phrases, args.rounds)
+        print(f"{label:<22} {legacy_us:>12.2f} {uncached_us:>12.2f} {cached_us:>10.2f} {legacy_us / cached_us:>7.1f}x")
+    print(f"\ncache: {date_parser.cache_stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+# benchmarks/bench_flow_engine.py - Per-turn cost of the declarative flow engine vs. the if/elif step ladders
+#
+# Runs bill payment and status lookup conversations through the flow engine
+# (conversation_flows in main.py) and through a copy of the hand-written step
+# ladders they replaced, with the same data and backend calls, and reports
+# the time per turn.
+#
+#   python benchmarks/bench_flow_engine.py --conversations 20000
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("INTERACTION_LOG_PATH", os.devnull)
+
+import main
+from main import call_city_backend, city_data, submit_payment
+from session_store import new_session
+
+PAY_BILL = ["I want to pay my bill", "123 Main Street", "Yes, pay now", "continue_payment"]
+CHECK_STATUS = ["check my application", "Look up by address", "123 Main Street"]
+
+# --- The ladders as they were before the engine (responses and transitions unchanged) ---
+
+async def legacy_pay_bill_flow(session, user_input):
+    if session["step"] == 1:
+        session["step"] = 2
+        return {
+            "response": "I'd be happy to help you find and pay your bills! 💳\n\nTo locate your account, could you please share your address? You can say something like '123 Main Street' or just 'Main Street' - I'll do my best to find it.",
+            "needs_escalation": False
+        }
+    elif session["step"] == 2:
+        if user_input.lower() == "enter a different address":
+            return {"response": "Sure! Please type the address on your account (for example '123 Main Street').", "needs_escalation": False}
+        result = await city_data.find_bill(user_input)
+        if result["found"]:
+            bill = result["data"]
+            session["context"]["bill"] = bill
+            session["context"]["address"] = result["address"]
+            session["step"] = 3
+            return {
+                "response": f"Perfect! I found your account for **{result['address']}**:\n\n💰 **{bill['type'].title()} Bill**: ${bill['amount']:.2f}\n📅 **Due Date**: {bill['due_date']}\n🏠 **Account**: {bill['account']}\n\nWould you like to proceed with the payment?",
+                "needs_escalation": False,
+                "options": ["Yes, pay now", "Show me other bills", "Not now"]
+            }
+        elif result["candidates"]:
+            return {
+                "response": f"I couldn't find an exact match for '{user_input}', but these accounts look close. Is one of them yours?",
+                "needs_escalation": False,
+                "options": result["candidates"] + ["Enter a different address"]
+            }
+        session["failed_attempts"] += 1
+        return {"response": f"I couldn't find any bills for '{user_input}'.", "needs_escalation": session["failed_attempts"] >= 2}
+    elif session["step"] == 3:
+        user_lower = user_input.lower()
+        if "yes" in user_lower or "pay" in user_lower:
+            session["step"] = 4
+            bill = session["context"]["bill"]
+            return {
+                "response": f"Awesome! I'm processing your ${bill['amount']:.2f} {bill['type']} bill payment.\n\n📱 **Please check your SMS and email** for the secure payment link. You'll receive it within a few moments.\n\n⏳ Processing payment...",
+                "needs_escalation": False,
+                "auto_continue_delay": 2000
+            }
+        session["step"] = 0
+        session["intent"] = None
+        return {"response": "No problem at all!", "needs_escalation": False}
+    elif session["step"] == 4:
+        session["step"] = 0
+        session["intent"] = None
+        bill = session["context"]["bill"]
+        receipt = await call_city_backend(submit_payment, bill)
+        return {
+            "response": f"✅ **Payment Successful!**\n\nYour ${bill['amount']:.2f} {bill['type']} bill has been paid successfully!\n\n🧾 **Receipt #**: {receipt}\n📧 **Confirmation email**: Sent to your registered email\n📱 **SMS confirmation**: Sent to your phone\n\nWhat would you like to do next?",
+            "needs_escalation": False,
+            "options": ["Download receipt", "Pay another bill", "Check other services", "I'm all set"]
+        }
+
+async def legacy_check_status_flow(session, user_input):
+    if session["step"] == 1:
+        session["step"] = 2
+        return {
+            "response": "I can help you check your application status! 📊\n\nDo you have your application ID, or would you like me to look it up by address?",
+            "needs_escalation": False,
+            "options": ["I have the application ID", "Look up by address"]
+        }
+    elif session["step"] == 2:
+        if "application id" in user_input.lower():
+            session["step"] = 3
+            return {"response": "Great! Please enter your application ID (it usually starts with APP followed by numbers):", "needs_escalation": False}
+        session["step"] = 4
+        return {"response": "I'll look up your applications by address. What's the address associated with your application?", "needs_escalation": False}
+    elif session["step"] == 4:
+        result = await city_data.find_application_by_address(user_input)
+        session["step"] = 0
+        session["intent"] = None
+        if result["found"]:
+            app = result["data"]
+            return {
+                "response": f"📋 **Application Found**\n\n📝 **Type**: {app['type'].title()}\n🏠 **Address**: {app['address']}\n📊 **Status**: {app['status'].title()}\n📅 **Submitted**: {app['submitted']}\n\n**Status Details**: Your application is {app['status']}.\n\nAnything else I can help with?",
+                "needs_escalation": False
+            }
+        return {"response": f"I couldn't find any applications for '{user_input}'.", "needs_escalation": False}
+
+LEGACY = {"pay_bill": legacy_pay_bill_flow, "check_status": legacy_check_status_flow}
+
+async def legacy_turn(session, intent, user_input):
+    # The old dispatch: an if/elif over intents, then the flow's step ladder
+    if session["step"] == 0:
+        session["intent"] = intent
+        session["step"] = 1
+    if session["intent"] == "pay_bill":
+        return await legacy_pay_bill_flow(session, user_input)
+    elif session["intent"] == "apply_permit":
+        pass
+    elif session["intent"] == "pay_ticket":
+        pass
+    elif session["intent"] == "report_issue":
+        pass
+    elif session["intent"] == "check_status":
+        return await legacy_check_status_flow(session, user_input)
+
+async def engine_turn(session, intent, user_input):
+    if session["step"] == 0:
+        return await main.INTENT_HANDLERS[intent](session, user_input)
+    return await main.conversation_flows.advance(session, user_input)
+
+async def run(turn, conversations: int) -> float:
+    turns = 0
+    started = time.perf_counter()
+    for i in range(conversations):
+        intent, script = ("pay_bill", PAY_BILL) if i % 2 == 0 else ("check_status", CHECK_STATUS)
+        session = new_session()
+        for message in script:
+            await turn(session, intent, message)
+            turns += 1
+    return (time.perf_counter() - started) / turns
+
+async def main_async(args) -> None:
+    # Both produce the same replies for these scripts
+    for intent, script in (("pay_bill", PAY_BILL), ("check_status", CHECK_STATUS)):
+        legacy, engine = new_session(), new_session()
+        for message in script:
+            expected = (await legacy_turn(legacy, intent, message))["response"]
+            actual = (await engine_turn(engine, intent, message))["response"]
+            if not message.startswith("continue") and expected != actual:
+                raise SystemExit(f"Replies differ for {message!r}:\n{expected}\n---\n{actual}")
+
+    await run(legacy_turn, 1000)
+    await run(engine_turn, 1000)
+    results = {"if/elif ladders": [], "flow engine": []}
+    for _ in range(args.rounds):
+        results["if/elif ladders"].append(await run(legacy_turn, args.conversations))
+        results["flow engine"].append(await run(engine_turn, args.conversations))
+    print(f"per-turn cost, best of {args.rounds} rounds x {args.conversations} conversations "
+          f"({main.BACKEND_LATENCY:.0f}s backend latency)")
+    for label, samples in results.items():
+        print(f"  {label:<16} {min(samples) * 1e6:7.2f} us")
+
+def main_bench():
+    parser = argparse.ArgumentParser(description="Flow engine benchmark")
+    parser.add_argument("--conversations", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    main.BACKEND_LATENCY = 0
+    asyncio.run(main_async(args))
+
+if __name__ == "__main__":
+    main_bench()
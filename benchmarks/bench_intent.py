@@ -0,0 +1,82 @@
+# benchmarks/bench_intent.py - Compiled intent classifier vs. the original keyword cascade
+#
+#   python benchmarks/bench_intent.py
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent_classifier import classify_intent
+
+# Messages as they arrive at /chat: button clicks, short requests and longer free text
+CORPUS = [
+    "I want to pay my bill", "I need a garage sale permit", "Pay a ticket", "Report an issue",
+    "Check permit status", "Yes, pay now", "Check other services", "I'm all set", "Download receipt",
+    "Pay another bill", "hello", "Hi there!", "I need a garage sale permit for June 8th",
+    "Check my permit GSP-2025-045", "There's a pothole on Pine Street",
+    "my water bill seems really high this month, can I pay it online?",
+    "I got a parking ticket downtown yesterday and want to dispute it",
+    "what is the status of my construction permit application",
+    "can I talk to a real person please", "the streetlight outside 456 olive ave is out",
+    "I'd like to apply for a business license for my bakery", "noise complaint about my neighbor",
+    "How do I track application APP001?", "I'm confused about my electricity account",
+    "yard sale next weekend", "Is the city hall open on Saturday?", "thanks",
+    "I want to report a water leak on Maple Avenue near the school crossing",
+    "representative", "my application", "speeding violation on Highway 101 last month",
+]
+
+def legacy_detect_intent(message: str) -> dict:
+    """The pre-compiled-classifier implementation, kept verbatim for comparison"""
+    message_lower = message.lower().strip()
+    if message_lower in ["check other services", "other services", "main menu", "back to menu"]:
+        return {"intent": "greeting", "confidence": 0.9, "entities": {}, "needs_clarification": False}
+    if message_lower in ["download receipt", "get receipt"]:
+        return {"intent": "download_receipt", "confidence": 0.9, "entities": {}, "needs_clarification": False}
+    if message_lower in ["pay another bill", "another bill"]:
+        return {"intent": "pay_bill", "confidence": 0.9, "entities": {}, "needs_clarification": False}
+    if message_lower in ["i'm all set", "all set", "done", "finished", "no thanks"]:
+        return {"intent": "farewell", "confidence": 0.9, "entities": {}, "needs_clarification": False}
+    if any(phrase in message_lower for phrase in ["garage sale permit", "garage sale", "yard sale permit", "yard sale"]):
+        return {"intent": "apply_permit", "confidence": 0.95, "entities": {"permit_type": "garage_sale"}, "needs_clarification": False}
+    if any(phrase in message_lower for phrase in ["check permit gsp", "permit gsp", "garage sale status", "check my garage sale"]):
+        return {"intent": "check_status", "confidence": 0.95, "entities": {"permit_type": "garage_sale"}, "needs_clarification": False}
+    if any(word in message_lower for word in ["hello", "hi", "hey", "help", "start"]):
+        return {"intent": "greeting", "confidence": 0.9, "entities": {}, "needs_clarification": False}
+    if any(word in message_lower for word in ["bill", "pay", "water", "electricity", "gas", "electric", "utility"]):
+        return {"intent": "pay_bill", "confidence": 0.9, "entities": {}, "needs_clarification": False}
+    if any(word in message_lower for word in ["permit", "license", "apply", "application", "construction"]):
+        return {"intent": "apply_permit", "confidence": 0.8, "entities": {}, "needs_clarification": False}
+    if any(word in message_lower for word in ["ticket", "fine", "violation", "parking", "speeding"]):
+        return {"intent": "pay_ticket", "confidence": 0.9, "entities": {}, "needs_clarification": False}
+    if any(word in message_lower for word in ["report", "issue", "problem", "pothole", "streetlight", "traffic", "noise"]):
+        return {"intent": "report_issue", "confidence": 0.9, "entities": {}, "needs_clarification": False}
+    if any(phrase in message_lower for phrase in ["application status", "check status", "track application", "status of", "my application", "permit status"]):
+        return {"intent": "check_status", "confidence": 0.9, "entities": {}, "needs_clarification": False}
+    if any(word in message_lower for word in ["human", "agent", "person", "representative", "help me", "confused"]):
+        return {"intent": "escalate", "confidence": 0.9, "entities": {}, "needs_clarification": False}
+    return {"intent": "other", "confidence": 0.3, "entities": {}, "needs_clarification": True}
+
+# Messages the cascade only resolves after scanning most of its keyword lists
+LATE_RULE_INTENTS = {"check_status", "escalate", "other"}
+
+def run_corpus(classifier, corpus) -> None:
+    for message in corpus:
+        classifier(message)
+
+def main():
+    mismatches = [m for m in CORPUS if classify_intent(m) != legacy_detect_intent(m)]
+    if mismatches:
+        raise SystemExit(f"Classifier disagrees with the original on: {mismatches}")
+
+    late = [m for m in CORPUS if legacy_detect_intent(m)["intent"] in LATE_RULE_INTENTS]
+    rounds = 2000
+    for label, corpus in [("full corpus", CORPUS), ("late-rule/fallback messages", late)]:
+        print(f"{label} ({len(corpus)} messages)")
+        for name, classifier in [("legacy cascade", legacy_detect_intent), ("compiled", classify_intent)]:
+            best = min(timeit.repeat(lambda: run_corpus(classifier, corpus), number=rounds, repeat=7))
+            per_message_us = best / (rounds * len(corpus)) * 1e6
+            print(f"  {name:>15}: {per_message_us:6.2f} us/message")
+
+if __name__ == "__main__":
+    main()
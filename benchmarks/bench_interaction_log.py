@@ -0,0 +1,97 @@
+# benchmarks/bench_interaction_log.py - Request-path cost of interaction logging: InteractionLogger vs. logger.info
+#
+# Measures how long log_interaction keeps a request thread busy, first with a
+# healthy file sink and then with a sink that stalls, where the original
+# synchronous logging stalls the request and the queue drops records instead.
+#
+#   python benchmarks/bench_interaction_log.py --records 5000
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from interaction_log import INTERACTION_LOG_QUEUE_SIZE, InteractionLogger, RotatingFileSink
+
+def record(i: int) -> dict:
+    return {
+        "event": "interaction",
+        "timestamp": "2026-06-01T12:00:00",
+        "session_id": f"session-{i % 500}",
+        "user_message": "I want to pay my water bill",
+        "bot_response": "I'd be happy to help you find and pay your bills! To locate your account, could you...",
+        "intent": "pay_bill"
+    }
+
+class SlowHandler(logging.FileHandler):
+    """A log destination that stalls (full disk, slow network volume, blocked pipe)"""
+
+    def __init__(self, path: str, stall: float):
+        super().__init__(path)
+        self.stall = stall
+
+    def emit(self, rec):
+        time.sleep(self.stall)
+        super().emit(rec)
+
+class SlowSink(RotatingFileSink):
+    def __init__(self, path: str, stall: float):
+        super().__init__(path)
+        self.stall = stall
+
+    def write_batch(self, lines):
+        time.sleep(self.stall)
+        super().write_batch(lines)
+
+def legacy_logger(handler: logging.Handler) -> logging.Logger:
+    log = logging.getLogger(f"bench.legacy.{id(handler)}")
+    log.propagate = False
+    log.setLevel(logging.INFO)
+    log.addHandler(handler)
+    return log
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def measure(fn, count: int):
+    samples = []
+    for i in range(count):
+        started = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - started)
+    return sum(samples) / count * 1e6, percentile(samples, 99) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Interaction logging benchmark")
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--stall-ms", type=float, default=2.0, help="Per-write stall of the slow destination")
+    parser.add_argument("--stall-queue-size", type=int, default=200, help="Queue size for the stalling run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'destination':<14} {'logging':<18} {'mean us':>9} {'p99 us':>9} {'dropped':>8}")
+        for label, stall in (("file", 0.0), ("stalling file", args.stall_ms / 1000)):
+            count = args.records if not stall else max(200, args.records // 5)
+            path = os.path.join(tmp, f"legacy-{int(stall * 1e6)}.log")
+            handler = SlowHandler(path, stall) if stall else logging.FileHandler(path)
+            log = legacy_logger(handler)
+            mean, p99 = measure(lambda i: log.info(f"Interaction: {json.dumps(record(i))}"), count)
+            print(f"{label:<14} {'logger.info':<18} {mean:>9.1f} {p99:>9.1f} {'-':>8}")
+            handler.close()
+
+            path = os.path.join(tmp, f"queued-{int(stall * 1e6)}.jsonl")
+            sink = SlowSink(path, stall) if stall else RotatingFileSink(path)
+            queued = InteractionLogger(sink, queue_size=args.stall_queue_size if stall else INTERACTION_LOG_QUEUE_SIZE)
+            queued.start()
+            mean, p99 = measure(lambda i: queued.log(record(i)), count)
+            queued.stop(timeout=30)
+            print(f"{label:<14} {'InteractionLogger':<18} {mean:>9.1f} {p99:>9.1f} {queued.counters['dropped']:>8}")
+            print(f"{'':<14} {'':<18} written {queued.counters['written']} in {queued.counters['batches']} batches")
+
+if __name__ == "__main__":
+    main()
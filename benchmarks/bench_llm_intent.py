@@ -0,0 +1,71 @@
+# benchmarks/bench_llm_intent.py - Latency of async LLM intent detection against the mock LLM
+#
+# Runs the mock server in-process and measures detect() end to end in three phases:
+# a healthy model, a hanging model (timeouts until the breaker opens) and the open breaker.
+#
+#   python benchmarks/bench_llm_intent.py --requests 500 --concurrency 50
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import httpx
+import uvicorn
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_intent import CORPUS
+from llm_intent import CircuitBreaker, LLMIntentClassifier
+from mock_llm_server import app as mock_app
+
+def start_mock_server(port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(mock_app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def run_phase(name, classifier, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        async with semaphore:
+            started = time.perf_counter()
+            await classifier.detect(CORPUS[i % len(CORPUS)] + f" #{i}")
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    print(f"{name:>14}: p50 {percentile(latencies, 50) * 1000:8.2f} ms  p99 {percentile(latencies, 99) * 1000:8.2f} ms"
+          f"  {requests / elapsed:8.1f} req/s  breaker={classifier.breaker.state}")
+
+async def main(args):
+    base_url = f"http://127.0.0.1:{args.port}"
+    classifier = LLMIntentClassifier(api_key="mock", base_url=f"{base_url}/v1", call_timeout=0.5, deadline=0.8,
+                                     breaker=CircuitBreaker(failure_threshold=5, reset_timeout=60))
+    async with httpx.AsyncClient(base_url=base_url) as control:
+        await control.post("/control", json={"latency_ms": args.latency_ms, "failure_rate": 0.0, "hang": False})
+        await run_phase("healthy", classifier, args.requests, args.concurrency)
+        await control.post("/control", json={"hang": True})
+        await run_phase("model hanging", classifier, args.concurrency, args.concurrency)
+        await run_phase("breaker open", classifier, args.requests, args.concurrency)
+    print(classifier.stats())
+    await classifier.aclose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Async LLM intent detection latency benchmark")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=40.0, help="Simulated model latency")
+    parser.add_argument("--port", type=int, default=8900)
+    args = parser.parse_args()
+    start_mock_server(args.port)
+    asyncio.run(main(args))
@@ -0,0 +1,79 @@
+# benchmarks/bench_metrics.py - Overhead of the /metrics instrumentation on chat turns
+#
+# Runs the same chat conversations in interleaved blocks with recording switched
+# on and off, and compares the median per-turn latency. Also times a single
+# histogram observation and a /metrics render.
+#
+#   python benchmarks/bench_metrics.py --blocks 20 --conversations 50
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SESSION_BACKEND", "memory")
+os.environ.setdefault("INTERACTION_LOG_PATH", os.devnull)
+
+from fastapi.testclient import TestClient
+
+import main
+from metrics import Histogram
+
+CONVERSATIONS = [
+    ["I want to pay my water bill", "123 Main Street", "Yes, pay now", "continue_payment"],
+    ["I need a garage sale permit", "123 Main Street", "This Saturday"],
+    ["There's a pothole on my street", "456 Oak Avenue"],
+    ["hello", "What are the library hours?"],
+]
+
+def run_block(client: TestClient, conversations: int) -> float:
+    """Seconds per turn over one block of conversations"""
+    turns = 0
+    started = time.perf_counter()
+    for i in range(conversations):
+        session_id = None
+        for message in CONVERSATIONS[i % len(CONVERSATIONS)]:
+            reply = client.post("/chat", json={"message": message, "session_id": session_id}).json()
+            session_id = reply["session_id"]
+            turns += 1
+    return (time.perf_counter() - started) / turns
+
+def main_bench():
+    parser = argparse.ArgumentParser(description="Metrics overhead benchmark")
+    parser.add_argument("--blocks", type=int, default=20, help="Blocks per mode, interleaved on/off")
+    parser.add_argument("--conversations", type=int, default=50, help="Conversations per block")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    client = TestClient(main.app)
+    run_block(client, args.conversations)  # Warm up caches and the thread pool
+
+    timings = {True: [], False: []}
+    for _ in range(args.blocks):
+        for enabled in (False, True):
+            main.metrics_registry.set_enabled(enabled)
+            timings[enabled].append(run_block(client, args.conversations))
+    main.metrics_registry.set_enabled(True)
+
+    off = statistics.median(timings[False])
+    on = statistics.median(timings[True])
+    print(f"per-turn latency, median of {args.blocks} blocks x {args.conversations} conversations")
+    print(f"  metrics off: {off * 1e6:8.1f} us")
+    print(f"  metrics on:  {on * 1e6:8.1f} us")
+    print(f"  overhead:    {(on - off) / off * 100:+8.2f} %")
+
+    histogram = Histogram("bench_seconds", "bench", ["stage"])
+    count = 200000
+    started = time.perf_counter()
+    for i in range(count):
+        histogram.observe(0.0012, "flow_handler")
+    print(f"histogram observe: {(time.perf_counter() - started) / count * 1e9:.0f} ns")
+
+    started = time.perf_counter()
+    body = client.get("/metrics").text
+    print(f"/metrics scrape: {(time.perf_counter() - started) * 1000:.1f} ms, {len(body.splitlines())} lines")
+
+if __name__ == "__main__":
+    main_bench()
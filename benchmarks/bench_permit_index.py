@@ -0,0 +1,61 @@
+# benchmarks/bench_permit_index.py - Annual permit-limit checks: PermitIndex vs. the original scan
+#
+#   python benchmarks/bench_permit_index.py --sizes 1000,100000,500000
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_address_index import address_book
+from permit_index import PermitIndex
+
+def permit_registry(size: int, rng: random.Random):
+    """{address: [permit, ...]} with `size` permits spread over several years"""
+    addresses = address_book(max(1, size // 3), rng)
+    registry = {}
+    for i in range(size):
+        year = rng.choice([2021, 2022, 2023, 2024, 2025])
+        permit = {"permit_id": f"GSP-{year}-{i:06d}", "duration": 1, "year": year,
+                  "status": rng.choice(["approved", "approved", "approved", "denied"])}
+        registry.setdefault(rng.choice(addresses), []).append(permit)
+    return registry
+
+def legacy_count(address: str, registry, year: int) -> int:
+    """The original check_annual_permit_limit scan, kept for comparison"""
+    address_clean = address.lower().strip()
+    count = 0
+    for addr, permits in registry.items():
+        if addr in address_clean or address_clean in addr:
+            count += len([p for p in permits if p.get("year", 2025) == year and p.get("status") == "approved"])
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="Permit index benchmark")
+    parser.add_argument("--sizes", default="1000,100000,500000")
+    parser.add_argument("--checks", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    print(f"{'permits':>9} {'build ms':>9} {'index us/check':>15} {'scan us/check':>14} {'count mismatches':>17}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        registry = permit_registry(size, rng)
+        started = time.perf_counter()
+        index = PermitIndex.from_registry(registry)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        queries = [rng.choice(list(registry)) for _ in range(args.checks)]
+        started = time.perf_counter()
+        indexed = [index.approved(q, 2025)[0] for q in queries]
+        index_us = (time.perf_counter() - started) / len(queries) * 1e6
+        started = time.perf_counter()
+        scanned = [legacy_count(q, registry, 2025) for q in queries]
+        scan_us = (time.perf_counter() - started) / len(queries) * 1e6
+        # The scan also counts other addresses that contain this one ("12 oak st" inside "112 oak st")
+        mismatches = sum(a != b for a, b in zip(indexed, scanned))
+        print(f"{size:>9} {build_ms:>9.1f} {index_us:>15.2f} {scan_us:>14.1f} {mismatches:>17}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/bench_repository.py - City data lookups: in-memory repository vs. pooled SQLite repository
+#
+# Runs the lookups the chat flows make (bill by address, ticket number,
+# application ID, annual garage sale permits) from --clients concurrent
+# tasks against each backend and reports lookups per second and p95
+# latency. The SQLite database is a temporary file, seeded with the demo
+# records plus --filler bills/applications so the indexes matter, and the
+# query plans are printed to show every lookup is an index search.
+#
+#   python benchmarks/bench_repository.py --clients 1,20,100 --pool-sizes 1,5
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from address_index import canonical_address
+from repository import (INSERT_APPLICATION, SELECT_APPLICATION, SELECT_APPROVED_PERMITS, SELECT_BILL,
+                        SELECT_TICKET, InMemoryCityRepository, SQLCityRepository)
+
+LOOKUPS = [
+    ("bill by address", lambda repo: repo.find_bill("123 Main Street")),
+    ("ticket number", lambda repo: repo.get_ticket("TK002")),
+    ("application id", lambda repo: repo.get_application("APP001")),
+    ("permits this year", lambda repo: repo.approved_permits("456 Oak Avenue", 2025)),
+]
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+def add_filler(path: str, count: int) -> None:
+    repo = SQLCityRepository(path, 1)
+    def insert(connection):
+        with connection:
+            connection.executemany("INSERT OR IGNORE INTO bills VALUES (?, ?, ?, ?, ?)", [
+                (f"{i} filler st", 10.0, "water", "2025-06-01", f"WAT-{i:06d}") for i in range(count)
+            ])
+            connection.executemany(INSERT_APPLICATION, [
+                (f"APPF{i:06d}", "business license", "under review", f"{i} Filler St",
+                 canonical_address(f"{i} Filler St"), "2025-05-01", None, None) for i in range(count)
+            ])
+    repo.pool.run_sync(insert)
+    repo.pool.close()
+
+def print_query_plans(repo: SQLCityRepository) -> None:
+    params = {SELECT_BILL: ("123 main st",), SELECT_TICKET: ("TK002",), SELECT_APPLICATION: ("APP001",),
+              SELECT_APPROVED_PERMITS: ("456 oak avenue", 2025)}
+    for sql, args in params.items():
+        plan = repo.pool.run_sync(lambda c: [row[-1] for row in c.execute("EXPLAIN QUERY PLAN " + sql, args)])
+        print(f"  {sql.split(' WHERE ')[0][:40]:<40} {'; '.join(plan)}")
+
+async def run(repo, clients: int, duration: float) -> dict:
+    latencies = []
+    deadline = time.monotonic() + duration
+    async def client(index: int) -> None:
+        i = index
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            await LOOKUPS[i % len(LOOKUPS)][1](repo)
+            latencies.append(time.perf_counter() - started)
+            i += 1
+    started = time.monotonic()
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    return {"rate": len(latencies) / (time.monotonic() - started), "p95": percentile(latencies, 95)}
+
+async def main_async(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "city.db")
+        add_filler(path, args.filler)
+        repos = {"memory": InMemoryCityRepository(latency=0)}
+        for size in args.pool_sizes:
+            repos[f"sqlite pool={size}"] = SQLCityRepository(path, size)
+
+        print(f"query plans ({args.filler} filler bills/applications):")
+        print_query_plans(repos[f"sqlite pool={args.pool_sizes[0]}"])
+        print(f"{'backend':<16} {'clients':>7} {'lookups/s':>10} {'p95 ms':>8}")
+        for label, repo in repos.items():
+            for clients in args.clients:
+                result = await run(repo, clients, args.duration)
+                print(f"{label:<16} {clients:>7} {result['rate']:>10.0f} {result['p95'] * 1000:>8.2f}")
+            await repo.close()
+
+def main_bench():
+    parser = argparse.ArgumentParser(description="City data repository benchmark")
+    parser.add_argument("--clients", type=lambda v: [int(c) for c in v.split(",")], default=[1, 20, 100])
+    parser.add_argument("--pool-sizes", type=lambda v: [int(c) for c in v.split(",")], default=[1, 5])
+    parser.add_argument("--filler", type=int, default=20000, help="Extra bills and applications in the database")
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per run")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    asyncio.run(main_async(args))
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,62 @@
+# benchmarks/bench_street_catalogue.py - Street boundary validation at city-catalogue scale
+#
+# Compares the token-trie StreetCatalogue with the original `any(boundary in address ...)`
+# scan over catalogues of growing size, and counts substring false positives.
+#
+#   python benchmarks/bench_street_catalogue.py --sizes 30,1000,10000
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_address_index import street_names
+from street_catalogue import StreetCatalogue
+
+SUFFIXES = ["street", "st", "avenue", "ave", "road", "rd", "drive", "dr", "lane", "ln"]
+
+def catalogue_entries(size: int, rng: random.Random):
+    # Real catalogues list the long and short spellings, as CITY_BOUNDARIES does
+    entries = []
+    for name in street_names(size // 2, rng):
+        i = rng.randrange(0, len(SUFFIXES), 2)
+        entries += [f"{name} {SUFFIXES[i]}", f"{name} {SUFFIXES[i + 1]}"]
+    return entries
+
+def time_per_call(check, addresses) -> float:
+    started = time.perf_counter()
+    for address in addresses:
+        check(address)
+    return (time.perf_counter() - started) / len(addresses)
+
+def main():
+    parser = argparse.ArgumentParser(description="Street catalogue benchmark")
+    parser.add_argument("--sizes", default="30,1000,10000")
+    parser.add_argument("--addresses", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    print(f"{'streets':>8} {'build ms':>9} {'trie us':>8} {'scan us':>8} {'trie false+':>12} {'scan false+':>12}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        entries = catalogue_entries(size, rng)
+        started = time.perf_counter()
+        catalogue = StreetCatalogue(entries)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        # Half the addresses are in the city; the rest glue a prefix onto a real street name
+        # ("domain street" vs "main street"), which a substring scan wrongly accepts
+        valid = [f"{rng.randint(1, 9999)} {rng.choice(entries)}" for _ in range(args.addresses // 2)]
+        outside = [f"{rng.randint(1, 9999)} xq{rng.choice(entries)}" for _ in range(args.addresses // 2)]
+        addresses = valid + outside
+
+        trie_us = time_per_call(lambda a: a in catalogue, addresses) * 1e6
+        scan_us = time_per_call(lambda a: any(b in a for b in entries), addresses) * 1e6
+        trie_fp = sum(a in catalogue for a in outside)
+        scan_fp = sum(any(b in a for b in entries) for a in outside)
+        assert all(a in catalogue for a in valid)
+        print(f"{len(entries):>8} {build_ms:>9.1f} {trie_us:>8.1f} {scan_us:>8.1f} {trie_fp:>12} {scan_fp:>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# benchmarks/bench_ui.py - GET / cost: Jinja2 render per request vs. the precompressed UI bundle
+#
+# Rebuilds the page as it was before the split (CSS and JS inline in
+# index.html, rendered through Jinja2Templates on every hit) and compares it
+# with ui_bundle (main.py) for a first visit and a revalidating repeat visit,
+# both through the ASGI app in-process and for the handler alone. Also prints
+# the bytes a browser downloads per visit.
+#
+#   python benchmarks/bench_ui.py --requests 2000
+import argparse
+import asyncio
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("INTERACTION_LOG_PATH", os.devnull)
+
+import httpx
+from fastapi import Request
+from fastapi.responses import HTMLResponse
+from fastapi.templating import Jinja2Templates
+
+import main
+
+BROWSER_HEADERS = {"Accept-Encoding": "gzip, deflate, br"}
+
+def write_inline_template(directory: str) -> None:
+    with open("templates/index.html") as f:
+        page = f.read()
+    def inline(match: re.Match) -> str:
+        name = match.group(2)
+        with open(os.path.join("static", name)) as f:
+            body = f.read()
+        return f"<style>\n{body}</style>" if match.group(1) == "link" else f"<script>\n{body}</script>"
+    page = re.sub(r"<(link|script)[^>]*asset_url\('([^']+)'\)[^>]*>(?:</script>)?", inline, page)
+    with open(os.path.join(directory, "index.html"), "w") as f:
+        f.write(page)
+
+def wire_bytes(response: httpx.Response) -> int:
+    # response.content is already decoded
+    return int(response.headers["content-length"])
+
+async def time_requests(client: httpx.AsyncClient, path: str, headers: dict, count: int) -> float:
+    started = time.perf_counter()
+    for _ in range(count):
+        await client.get(path, headers=headers)
+    return (time.perf_counter() - started) / count
+
+async def main_async(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        write_inline_template(tmp)
+        legacy_templates = Jinja2Templates(directory=tmp)
+
+        @main.app.get("/bench/legacy-ui", response_class=HTMLResponse)
+        def legacy_ui(request: Request):
+            return legacy_templates.TemplateResponse("index.html", {"request": request})
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            legacy = await client.get("/bench/legacy-ui", headers=BROWSER_HEADERS)
+            page = await client.get("/", headers=BROWSER_HEADERS)
+            asset_paths = re.findall(r'(?:href|src)="(/static/[^"]+)"', page.text)
+            assets = [await client.get(path, headers=BROWSER_HEADERS) for path in asset_paths]
+            revalidate = dict(BROWSER_HEADERS, **{"If-None-Match": page.headers["etag"]})
+
+            print("bytes on the wire per visit:")
+            legacy_bytes = wire_bytes(legacy)
+            print(f"  {'inline page, rendered':<32} first {legacy_bytes:>7}  repeat {legacy_bytes:>7}")
+            first = wire_bytes(page) + sum(wire_bytes(a) for a in assets)
+            print(f"  {'bundle (' + page.headers.get('content-encoding', 'identity') + ')':<32} first {first:>7}  "
+                  f"repeat {0:>7} (304, assets cached)")
+
+            for path, headers in (("/bench/legacy-ui", BROWSER_HEADERS), ("/", BROWSER_HEADERS), ("/", revalidate)):
+                await time_requests(client, path, headers, 200)
+            print(f"\nper request through the ASGI app, {args.requests} requests:")
+            for label, path, headers in (("render per request", "/bench/legacy-ui", BROWSER_HEADERS),
+                                         ("bundle 200", "/", BROWSER_HEADERS),
+                                         ("bundle 304", "/", revalidate)):
+                print(f"  {label:<20} {await time_requests(client, path, headers, args.requests) * 1e6:8.1f} us")
+
+        scope_request = Request({"type": "http", "method": "GET", "path": "/", "headers": [
+            (b"accept-encoding", b"gzip, deflate, br")], "query_string": b""})
+        handler_samples = {}
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            legacy_templates.TemplateResponse("index.html", {"request": scope_request})
+        handler_samples["render per request"] = (time.perf_counter() - started) / args.requests
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            main.ui_bundle.page_response(scope_request.headers)
+        handler_samples["bundle"] = (time.perf_counter() - started) / args.requests
+        print(f"\nhandler only:")
+        for label, seconds in handler_samples.items():
+            print(f"  {label:<20} {seconds * 1e6:8.1f} us")
+
+def main_bench():
+    parser = argparse.ArgumentParser(description="UI serving benchmark")
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    asyncio.run(main_async(args))
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,275 @@
+# benchmarks/load_scenarios.py - Scripted multi-turn /chat scenarios with per-step latency and memory per session
+#
+# Replays the conversation flows (pay bill through continue_payment, garage
+# sale permit, ticket by number, status by address, issue report) from
+# --clients concurrent clients, either against the ASGI app in-process or
+# against a running server, and reports:
+#
+#   - conversations/s and turns/s, overall and per scenario
+#   - p50/p95/p99 latency of every scenario step, plus replies that missed
+#     the expected text
+#   - memory per session: traced allocations in-process, RSS growth of the
+#     server process with --serve or --pid
+#
+# --save writes the results as a baseline JSON (with the git commit);
+# --compare reads one and exits 1 if throughput or any step's p95 got worse
+# than --tolerance percent.
+#
+#   python benchmarks/load_scenarios.py --save baseline.json
+#   python benchmarks/load_scenarios.py --compare baseline.json
+#   python benchmarks/load_scenarios.py --serve --clients 32
+#   python benchmarks/load_scenarios.py --url http://127.0.0.1:8000 --pid 12345
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# (step label, message, text expected in the reply); "{n}" is a per-conversation number
+SCENARIOS = {
+    "pay_bill": [
+        ("intent", "I want to pay my water bill", "share your address"),
+        ("address", "123 Main Street", "found your account"),
+        ("confirm", "Yes, pay now", "processing your"),
+        ("payment", "continue_payment", "Payment Successful"),
+    ],
+    "garage_sale_permit": [
+        ("intent", "I need a garage sale permit", "garage sale permit"),
+        ("address", "{n} Elm Street", "Application Submitted"),  # New address each time, under the annual limit
+    ],
+    "ticket_by_number": [
+        ("intent", "I got a parking ticket", "find your ticket"),
+        ("lookup", "I have the ticket number", "enter your ticket number"),
+        ("ticket", "TK002", "Found your ticket"),
+        ("pay", "Yes, pay it", "Ticket Paid"),
+    ],
+    "status_by_address": [
+        ("intent", "check status", "application status"),
+        ("lookup", "Look up by address", "What's the address"),
+        ("address", "123 Main Street", "Application Found"),
+    ],
+    "report_issue": [
+        ("intent", "I want to report an issue", "What type of issue"),
+        ("type", "Pothole", "specific location"),
+        ("location", "Main and 3rd", "Issue Reported"),
+    ],
+}
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+def start_server(port: int) -> subprocess.Popen:
+    env = dict(os.environ, SESSION_BACKEND="memory", INTERACTION_LOG_PATH=os.devnull)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+def wait_healthy(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not become healthy")
+
+def rss_bytes(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    raise RuntimeError(f"No VmRSS for pid {pid}")
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+class Recorder:
+    """Latencies per "scenario/step" and completed conversations per scenario"""
+
+    def __init__(self):
+        self.latencies = {f"{name}/{i + 1} {label}": [] for name, steps in SCENARIOS.items()
+                          for i, (label, _, _) in enumerate(steps)}
+        self.misses = {key: 0 for key in self.latencies}
+        self.conversations = {name: 0 for name in SCENARIOS}
+
+async def run_conversation(client: httpx.AsyncClient, name: str, number: int, recorder: Recorder) -> None:
+    session_id = str(uuid.uuid4())
+    for i, (label, message, expected) in enumerate(SCENARIOS[name]):
+        key = f"{name}/{i + 1} {label}"
+        started = time.perf_counter()
+        response = await client.post("/chat", json={"message": message.format(n=number), "session_id": session_id})
+        recorder.latencies[key].append(time.perf_counter() - started)
+        if response.status_code != 200 or expected not in response.json()["reply"]:
+            recorder.misses[key] += 1
+    recorder.conversations[name] += 1
+
+async def run_load(client: httpx.AsyncClient, clients: int, duration: float, recorder: Recorder) -> float:
+    names = list(SCENARIOS)
+    counter = iter(range(10 ** 9))
+    deadline = time.monotonic() + duration
+    async def run_client(index: int) -> None:
+        i = index
+        while time.monotonic() < deadline:
+            await run_conversation(client, names[i % len(names)], next(counter), recorder)
+            i += 1
+    started = time.monotonic()
+    await asyncio.gather(*(run_client(i) for i in range(clients)))
+    return time.monotonic() - started
+
+async def measure_memory(client: httpx.AsyncClient, sessions: int, pid) -> dict:
+    """Memory added per finished conversation (each leaves one session behind)"""
+    names = list(SCENARIOS)
+    recorder = Recorder()
+    if pid is None:
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+    else:
+        before = rss_bytes(pid)
+    for i in range(sessions):
+        await run_conversation(client, names[i % len(names)], 10 ** 6 + i, recorder)
+    if pid is None:
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    else:
+        after = rss_bytes(pid)
+    return {"method": "tracemalloc" if pid is None else "rss", "sessions": sessions,
+            "bytes_per_session": round((after - before) / sessions)}
+
+def summarize(recorder: Recorder, elapsed: float) -> dict:
+    steps = {}
+    for key, samples in recorder.latencies.items():
+        steps[key] = {
+            "count": len(samples),
+            "misses": recorder.misses[key],
+            "p50_ms": round(percentile(samples, 50) * 1000, 3),
+            "p95_ms": round(percentile(samples, 95) * 1000, 3),
+            "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        }
+    turns = sum(len(samples) for samples in recorder.latencies.values())
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "conversations_per_s": round(sum(recorder.conversations.values()) / elapsed, 1),
+        "turns_per_s": round(turns / elapsed, 1),
+        "scenarios": {name: round(count / elapsed, 1) for name, count in recorder.conversations.items()},
+        "steps": steps,
+    }
+
+def print_results(results: dict) -> None:
+    print(f"{results['target']} @ {results['commit']}: {results['clients']} clients, "
+          f"{results['conversations_per_s']} conversations/s, {results['turns_per_s']} turns/s")
+    print(f"{'step':<34} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'misses':>7}")
+    for key, step in results["steps"].items():
+        print(f"{key:<34} {step['count']:>7} {step['p50_ms']:>8.2f} {step['p95_ms']:>8.2f} "
+              f"{step['p99_ms']:>8.2f} {step['misses']:>7}")
+    memory = results["memory"]
+    print(f"memory: {memory['bytes_per_session']} bytes per session ({memory['method']}, {memory['sessions']} sessions)")
+
+def compare(results: dict, baseline: dict, tolerance: float, min_ms: float) -> list:
+    """Regressions beyond tolerance percent; step p95 changes under min_ms are noise"""
+    regressions = []
+    limit = 1 + tolerance / 100
+    if results["turns_per_s"] * limit < baseline["turns_per_s"]:
+        regressions.append(f"throughput {baseline['turns_per_s']} -> {results['turns_per_s']} turns/s")
+    print(f"\nvs. baseline @ {baseline['commit']} ({baseline['created']})")
+    print(f"{'step':<34} {'base p95':>9} {'now p95':>9} {'change':>8}")
+    for key, step in results["steps"].items():
+        old = baseline["steps"].get(key)
+        if old is None:
+            continue
+        change = (step["p95_ms"] / old["p95_ms"] - 1) * 100 if old["p95_ms"] else 0.0
+        print(f"{key:<34} {old['p95_ms']:>9.2f} {step['p95_ms']:>9.2f} {change:>7.1f}%")
+        if step["p95_ms"] > old["p95_ms"] * limit and step["p95_ms"] - old["p95_ms"] > min_ms:
+            regressions.append(f"{key} p95 {old['p95_ms']} -> {step['p95_ms']} ms")
+    old_memory, memory = baseline["memory"], results["memory"]
+    if old_memory["method"] == memory["method"] and memory["bytes_per_session"] > old_memory["bytes_per_session"] * limit:
+        regressions.append(f"memory {old_memory['bytes_per_session']} -> {memory['bytes_per_session']} bytes per session")
+    return regressions
+
+async def main_async(args) -> dict:
+    pid = args.pid
+    server = None
+    if args.serve:
+        args.url = f"http://127.0.0.1:{args.port}"
+        server = start_server(args.port)
+        pid = server.pid
+    try:
+        if args.url:
+            wait_healthy(args.url)
+            limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+            client = httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60.0)
+            target = args.url
+        else:
+            os.environ.setdefault("SESSION_BACKEND", "memory")
+            os.environ.setdefault("INTERACTION_LOG_PATH", os.devnull)
+            import main
+            client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench", timeout=60.0)
+            target = "in-process"
+        async with client:
+            await run_load(client, args.clients, min(2.0, args.duration), Recorder())  # Warm-up
+            recorder = Recorder()
+            elapsed = await run_load(client, args.clients, args.duration, recorder)
+            memory = await measure_memory(client, args.memory_sessions, pid)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    results = {"commit": git_commit(), "created": datetime.now().isoformat(timespec="seconds"),
+               "target": target, "clients": args.clients, "duration_s": args.duration}
+    results.update(summarize(recorder, elapsed))
+    results["memory"] = memory
+    return results
+
+def main_bench():
+    parser = argparse.ArgumentParser(description="Scenario-driven /chat load test")
+    parser.add_argument("--url", help="Running server to test (default: the ASGI app in-process)")
+    parser.add_argument("--serve", action="store_true", help="Start uvicorn for the run and test it over HTTP")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--pid", type=int, help="Server process id, for RSS per session with --url")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load")
+    parser.add_argument("--memory-sessions", type=int, default=1000, help="Conversations run for the memory measurement")
+    parser.add_argument("--save", help="Write the results to this baseline JSON")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=25.0, help="Allowed regression in percent")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="Ignore p95 increases smaller than this")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    results = asyncio.run(main_async(args))
+    print_results(results)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"saved baseline to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.min_ms)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,166 @@
+# benchmarks/load_websockets.py - Thousands of concurrent /ws/chat sockets on one worker
+#
+# Starts one uvicorn worker, opens --idle sockets that only hold their session
+# and --active sockets that loop through pay-bill conversations, where payment
+# completion is pushed by the server instead of polled. Reports connect time,
+# turn latency, push delay, throughput, errors and server memory, then checks
+# that the idle sockets are still usable.
+#
+#   python benchmarks/load_websockets.py --idle 3000 --active 200 --duration 20
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import httpx
+import websockets
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAY_BILL_SCRIPT = ["I want to pay my water bill", "123 Main Street", "Yes, pay now"]
+PUSH_DELAY = 2.0  # auto_continue_delay of the payment step, in seconds
+
+def start_server(port: int) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=dict(os.environ, SESSION_BACKEND="memory"),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+def wait_healthy(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not become healthy")
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+async def receive_reply(socket) -> dict:
+    """Collect chunk events up to the `done` event"""
+    text = ""
+    while True:
+        event = json.loads(await socket.recv())
+        if event["type"] == "chunk":
+            text += event["text"]
+        elif event["type"] == "done":
+            return {**event, "reply": text}
+
+async def open_socket(url: str):
+    socket = await websockets.connect(url, ping_interval=None, max_queue=None)
+    session = json.loads(await socket.recv())
+    assert session["type"] == "session"
+    return socket
+
+async def run_active(url: str, deadline: float, stats: dict) -> None:
+    try:
+        socket = await open_socket(url)
+    except Exception:
+        stats["errors"] += 1
+        return
+    async with socket:
+        while time.monotonic() < deadline:
+            try:
+                for message in PAY_BILL_SCRIPT:
+                    started = time.monotonic()
+                    await socket.send(json.dumps({"message": message}))
+                    reply = await receive_reply(socket)
+                    stats["latencies"].append(time.monotonic() - started)
+                    stats["turns"] += 1
+                pushed_at = time.monotonic()
+                if not reply.get("follow_up"):
+                    stats["errors"] += 1
+                    continue
+                pushed = await receive_reply(socket)
+                stats["push_delays"].append(time.monotonic() - pushed_at - PUSH_DELAY)
+                stats["conversations" if "Payment Successful" in pushed["reply"] else "errors"] += 1
+            except Exception:
+                stats["errors"] += 1
+                return
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+async def main_async(args) -> int:
+    url = f"ws://127.0.0.1:{args.port}/ws/chat"
+    server = start_server(args.port)
+    try:
+        wait_healthy(f"http://127.0.0.1:{args.port}")
+        baseline_mb = rss_mb(server.pid)
+
+        started = time.monotonic()
+        idle = []
+        for i in range(0, args.idle, 200):  # Connect in waves to stay under the listen backlog
+            idle += await asyncio.gather(*(open_socket(url) for _ in range(min(200, args.idle - i))),
+                                         return_exceptions=True)
+        connect_s = time.monotonic() - started
+        idle_errors = sum(isinstance(s, Exception) for s in idle)
+        idle = [s for s in idle if not isinstance(s, Exception)]
+        idle_mb = rss_mb(server.pid)
+        print(f"idle sockets: {len(idle)} open ({idle_errors} failed) in {connect_s:.1f}s, "
+              f"server RSS {baseline_mb:.0f} -> {idle_mb:.0f} MB "
+              f"({(idle_mb - baseline_mb) * 1024 / max(1, len(idle)):.1f} KB/socket)")
+
+        stats = {"turns": 0, "conversations": 0, "errors": 0, "latencies": [], "push_delays": []}
+        deadline = time.monotonic() + args.duration
+        started = time.monotonic()
+        await asyncio.gather(*(run_active(url, deadline, stats) for _ in range(args.active)))
+        elapsed = time.monotonic() - started
+        print(f"active sockets: {args.active} for {elapsed:.1f}s with {len(idle)} idle alongside")
+        print(f"  turns: {stats['turns']} ({stats['turns'] / elapsed:.0f}/s), "
+              f"conversations completed: {stats['conversations']}, errors: {stats['errors']}")
+        print(f"  turn latency p50 {percentile(stats['latencies'], 50) * 1000:.1f} ms, "
+              f"p99 {percentile(stats['latencies'], 99) * 1000:.1f} ms")
+        print(f"  push delay beyond the {PUSH_DELAY:.0f}s payment step: "
+              f"p50 {percentile(stats['push_delays'], 50) * 1000:.1f} ms, "
+              f"p99 {percentile(stats['push_delays'], 99) * 1000:.1f} ms")
+        print(f"  server RSS {rss_mb(server.pid):.0f} MB")
+
+        # Idle sockets must still be served after the load
+        sample = idle[:: max(1, len(idle) // 50)]
+        alive = 0
+        for socket in sample:
+            try:
+                await socket.send(json.dumps({"message": "hello"}))
+                if "LIA" in (await asyncio.wait_for(receive_reply(socket), 10))["reply"]:
+                    alive += 1
+            except Exception:
+                pass
+        print(f"idle sockets still answering: {alive}/{len(sample)} sampled")
+        await asyncio.gather(*(s.close() for s in idle), return_exceptions=True)
+        return 0 if alive == len(sample) and not idle_errors and not stats["errors"] else 1
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket chat load test")
+    parser.add_argument("--idle", type=int, default=3000)
+    parser.add_argument("--active", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--port", type=int, default=8790)
+    args = parser.parse_args()
+
+    # Client and server each hold one descriptor per socket
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    needed = args.idle + args.active + 100
+    if soft < needed:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, needed), hard))
+    sys.exit(asyncio.run(main_async(args)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# benchmarks/load_workers.py - Multi-worker load test for LIA
+#
+# Starts `gunicorn -c gunicorn.conf.py main:app` with an increasing number of
+# workers against the shared backends gunicorn.conf.py requires for more than
+# one worker (Redis sessions and ID sequences, a SQLite city database in a
+# temporary directory), drives complete pay-bill conversations from concurrent
+# clients and reports throughput per worker count. Before measuring, the
+# script counts the distinct worker PIDs answering /health and stops if
+# gunicorn started fewer workers than requested.
+# A conversation whose turns land on workers that lost its state shows up as "broken".
+#
+#   python benchmarks/load_workers.py --workers 1,2,4 --redis-url redis://localhost:6379/0
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAY_BILL_SCRIPT = [
+    ("I want to pay my water bill", "share your address"),
+    ("123 Main Street", "found your account"),
+    ("Yes, pay now", "processing your"),
+    ("continue_payment", "Payment Successful"),
+]
+
+def start_server(workers: int, port: int, redis_url: str, database_path: str) -> subprocess.Popen:
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers), REDIS_URL=redis_url,
+               SESSION_BACKEND="redis", ID_BACKEND="redis", CITY_DATA_BACKEND="sql", DATABASE_PATH=database_path)
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app", "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+def wait_healthy(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not become healthy")
+
+async def count_workers(base_url: str, expected: int, timeout: float = 10.0) -> int:
+    """Distinct worker PIDs seen on /health; new connections let gunicorn spread them over workers"""
+    pids = set()
+    deadline = time.monotonic() + timeout
+    limits = httpx.Limits(max_keepalive_connections=0)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=5.0) as client:
+        while len(pids) < expected and time.monotonic() < deadline:
+            responses = await asyncio.gather(*(client.get("/health") for _ in range(expected * 4)))
+            pids.update(response.json()["worker_pid"] for response in responses)
+    return len(pids)
+
+async def run_client(client: httpx.AsyncClient, deadline: float, totals: dict) -> None:
+    while time.monotonic() < deadline:
+        session_id = str(uuid.uuid4())
+        broken = False
+        for message, expected in PAY_BILL_SCRIPT:
+            response = await client.post("/chat", json={"message": message, "session_id": session_id})
+            totals["turns"] += 1
+            if expected not in response.json()["reply"]:
+                broken = True
+        totals["broken" if broken else "conversations"] += 1
+
+async def measure(base_url: str, concurrency: int, duration: float) -> dict:
+    totals = {"turns": 0, "conversations": 0, "broken": 0}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        started = time.monotonic()
+        deadline = started + duration
+        await asyncio.gather(*(run_client(client, deadline, totals) for _ in range(concurrency)))
+        totals["elapsed"] = time.monotonic() - started
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-worker load test for LIA")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts to test")
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent simulated users")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per measurement")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--redis-url", default=os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    baseline = None
+    print(f"{'workers':>7} {'turns/s':>10} {'speedup':>8} {'efficiency':>10} {'broken':>7}")
+    for workers in [int(w) for w in args.workers.split(",")]:
+        with tempfile.TemporaryDirectory() as data_dir:
+            server = start_server(workers, args.port, args.redis_url, os.path.join(data_dir, "lia.db"))
+            try:
+                wait_healthy(base_url)
+                running = asyncio.run(count_workers(base_url, workers))
+                if running < workers:
+                    raise SystemExit(f"Asked for {workers} workers but only {running} answered; "
+                                     f"check the gunicorn.conf.py warning about shared backends")
+                totals = asyncio.run(measure(base_url, args.concurrency, args.duration))
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+        throughput = totals["turns"] / totals["elapsed"]
+        baseline = baseline or throughput / workers
+        speedup = throughput / baseline
+        print(f"{workers:>7} {throughput:>10.1f} {speedup:>7.2f}x {speedup / workers:>9.0%} {totals['broken']:>7}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# benchmarks/mock_llm_server.py - Local stand-in for the OpenAI chat completions API
+#
+# Answers like a model would (intent JSON), with configurable latency and failures:
+#   uvicorn benchmarks.mock_llm_server:app --port 8900
+#   OPENAI_BASE_URL=http://127.0.0.1:8900/v1 LLM_INTENT_ENABLED=true uvicorn main:app
+#
+# POST /control {"latency_ms": 40, "failure_rate": 0.0, "hang": false} changes behaviour at runtime.
+import asyncio
+import json
+import os
+import random
+import sys
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent_classifier import classify_intent
+
+app = FastAPI(title="Mock LLM")
+
+settings = {
+    "latency_ms": float(os.getenv("MOCK_LLM_LATENCY_MS", 40)),
+    "failure_rate": float(os.getenv("MOCK_LLM_FAILURE_RATE", 0.0)),
+    "hang": os.getenv("MOCK_LLM_HANG", "false") == "true"
+}
+
+@app.post("/control")
+async def control(request: Request):
+    settings.update(await request.json())
+    return settings
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    if settings["hang"]:
+        await asyncio.sleep(3600)
+    await asyncio.sleep(settings["latency_ms"] / 1000 * random.uniform(0.8, 1.2))
+    if random.random() < settings["failure_rate"]:
+        return JSONResponse({"error": {"message": "mock overloaded"}}, status_code=503)
+
+    result = classify_intent(body["messages"][-1]["content"])
+    content = {"intent": result["intent"], "confidence": result["confidence"], "entities": result["entities"]}
+    return {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion",
+        "model": body.get("model"),
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": json.dumps(content)}}]
+    }
@@ -0,0 +1,147 @@
+# benchmarks/soak_memory.py - Memory soak test and leak detector for main.chat and the agent backend's chat
+#
+# Calls the /chat handlers directly (no HTTP) for --turns synthetic turns.
+# Every conversation uses a new session id, so the session stores fill up
+# to their caps and must then stay flat. tracemalloc runs throughout:
+#
+#   warm-up     --warmup turns fill the stores; traced growth divided by the
+#               sessions they retain gives bytes per session
+#   soak        a snapshot every --interval turns reports traced memory and
+#               bytes per turn since the end of warm-up
+#
+# At the end the top allocation sites grown since warm-up are listed, and the
+# script exits 1 if growth per turn of either target exceeds --max-growth
+# bytes. The session caps are lowered (SESSION_MAX_ENTRIES, MEMORY_MAX_SESSIONS,
+# ANALYTICS_ACTIVE_WINDOW) so steady state is reached quickly; garage sale
+# permits are left out because every one is a new city record.
+#
+#   python benchmarks/soak_memory.py --turns 2000000 --interval 200000
+#   python benchmarks/soak_memory.py --target backend --max-growth 5
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MAIN_CONVERSATIONS = [
+    ["I want to pay my water bill", "123 Main Street", "Yes, pay now", "continue_payment"],
+    ["I got a parking ticket", "I have the ticket number", "TK002", "Yes, pay it"],
+    ["check status", "Look up by address", "123 Main Street"],
+    ["I want to report an issue", "Pothole", "Main and 3rd"],
+    ["hello", "thanks, bye"],
+]
+
+BACKEND_CONVERSATIONS = [
+    [("I want to pay my bill", {"address": "456 Olive Ave"}), ("check the bill again", {"address": "456 Olive Ave"})],
+    [("I got a ticket", {"ticket_id": "123"}), ("pay the ticket", {"ticket_id": "123"})],
+    [("permit please", {"permit_type": "event", "location": "12 Oak Street"})],
+    [("what can you do", {})],
+]
+
+def make_main_turns():
+    import main
+    async def turns():
+        number = 0
+        while True:
+            number += 1
+            session_id = f"soak-{number}"
+            for message in MAIN_CONVERSATIONS[number % len(MAIN_CONVERSATIONS)]:
+                await main.chat(main.ChatRequest(message=message, session_id=session_id))
+                yield
+    return turns(), lambda: main.session_store.stats()["size"]
+
+def make_backend_turns():
+    import backend.lia_agent_backend as agent_backend
+    async def turns():
+        number = 0
+        while True:
+            number += 1
+            session_id = f"soak-{number}"
+            for text, context in BACKEND_CONVERSATIONS[number % len(BACKEND_CONVERSATIONS)]:
+                await agent_backend.chat(agent_backend.ChatRequest(user_input=text, context=context, session_id=session_id))
+                yield
+    return turns(), lambda: len(agent_backend.session_memory)
+
+def traced() -> int:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+async def soak(name: str, factory, args) -> dict:
+    turns, retained_sessions = factory()
+    print(f"\n== {name}: {args.warmup} warm-up + {args.turns} soak turns ==")
+    start = traced()
+    started = time.perf_counter()
+    for _ in range(args.warmup):
+        await turns.__anext__()
+    baseline = traced()
+    baseline_snapshot = tracemalloc.take_snapshot()
+    sessions = retained_sessions()
+    per_session = (baseline - start) / max(1, sessions)
+    print(f"warm-up: {sessions} sessions retained, {(baseline - start) / 1e6:.1f} MB traced, "
+          f"{per_session:.0f} bytes per session")
+
+    print(f"{'turns':>10} {'sessions':>9} {'traced MB':>10} {'bytes/turn':>11} {'turns/s':>8}")
+    done = 0
+    current = baseline
+    while done < args.turns:
+        batch = min(args.interval, args.turns - done)
+        for _ in range(batch):
+            await turns.__anext__()
+        done += batch
+        current = traced()
+        rate = (args.warmup + done) / (time.perf_counter() - started)
+        print(f"{done:>10} {retained_sessions():>9} {current / 1e6:>10.2f} {(current - baseline) / done:>11.2f} {rate:>8.0f}")
+
+    growth_per_turn = (current - baseline) / max(1, done)
+    print(f"top allocation sites grown since warm-up:")
+    for stat in tracemalloc.take_snapshot().compare_to(baseline_snapshot, "lineno")[:args.top]:
+        print(f"  {stat.size_diff / 1024:>9.1f} KiB {stat.count_diff:>+8} blocks  {stat.traceback[0]}")
+    return {"target": name, "bytes_per_session": per_session, "bytes_per_turn": growth_per_turn}
+
+async def main_async(args) -> bool:
+    targets = {"main": make_main_turns, "backend": make_backend_turns}
+    names = list(targets) if args.target == "both" else [args.target]
+    results = []
+    tracemalloc.start(args.frames)
+    for name in names:
+        results.append(await soak(name, targets[name], args))
+    tracemalloc.stop()
+
+    print()
+    ok = True
+    for result in results:
+        leaking = result["bytes_per_turn"] > args.max_growth
+        ok = ok and not leaking
+        print(f"{result['target']:<8} {result['bytes_per_session']:>8.0f} bytes/session {result['bytes_per_turn']:>8.2f} bytes/turn "
+              f"{'FAIL' if leaking else 'ok'} (limit {args.max_growth} bytes/turn)")
+    return ok
+
+def main_bench():
+    parser = argparse.ArgumentParser(description="Memory soak test for the chat handlers")
+    parser.add_argument("--target", choices=["main", "backend", "both"], default="both")
+    parser.add_argument("--turns", type=int, default=200000, help="Turns after warm-up, per target")
+    parser.add_argument("--warmup", type=int, default=20000, help="Turns that fill the session stores first")
+    parser.add_argument("--interval", type=int, default=20000, help="Turns between snapshots")
+    parser.add_argument("--max-sessions", type=int, default=2000, help="Session cap of both stores during the soak")
+    parser.add_argument("--max-growth", type=float, default=10.0, help="Allowed traced growth in bytes per turn")
+    parser.add_argument("--top", type=int, default=10, help="Allocation sites to list")
+    parser.add_argument("--frames", type=int, default=1, help="Traceback frames tracemalloc keeps per allocation")
+    args = parser.parse_args()
+
+    os.environ["SESSION_BACKEND"] = "memory"
+    os.environ["SESSION_MAX_ENTRIES"] = str(args.max_sessions)
+    os.environ["MEMORY_MAX_SESSIONS"] = str(args.max_sessions)
+    os.environ.setdefault("ANALYTICS_ACTIVE_WINDOW", "5")  # Active-session tracking is bounded by time
+    os.environ.setdefault("INTERACTION_LOG_PATH", os.devnull)
+    os.environ.setdefault("LLM_INTENT_ENABLED", "false")
+    logging.disable(logging.WARNING)
+    if not asyncio.run(main_async(args)):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main_bench()
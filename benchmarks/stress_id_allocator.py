@@ -0,0 +1,108 @@
+# benchmarks/stress_id_allocator.py - Concurrency stress test for IdAllocator
+#
+# Allocates IDs from many threads (in-memory and Redis stores) and from several
+# processes sharing Redis, with and without block pre-allocation, and fails if any
+# ID is handed out twice. Also shows how often the old timestamp-based IDs collided.
+#
+#   python benchmarks/stress_id_allocator.py --threads 32 --per-thread 2000
+#   python benchmarks/stress_id_allocator.py --redis-url redis://localhost:6379/0 --processes 4
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from id_allocator import IdAllocator, InMemorySequenceStore, RedisSequenceStore
+
+def allocate_threaded(allocator: IdAllocator, name: str, threads: int, per_thread: int):
+    results = [[] for _ in range(threads)]
+    barrier = threading.Barrier(threads)
+
+    def worker(slot: int) -> None:
+        barrier.wait()
+        results[slot] = [allocator.next(name) for _ in range(per_thread)]
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return [value for chunk in results for value in chunk], time.perf_counter() - started
+
+def _process_worker(redis_url: str, prefix: str, name: str, block_size: int, threads: int, per_thread: int, queue) -> None:
+    import redis
+    allocator = IdAllocator(RedisSequenceStore(redis.Redis.from_url(redis_url), prefix), block_size)
+    queue.put(allocate_threaded(allocator, name, threads, per_thread)[0])
+
+def allocate_multiprocess(redis_url: str, prefix: str, name: str, block_size: int, processes: int,
+                          threads: int, per_thread: int):
+    queue = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_process_worker,
+                                       args=(redis_url, prefix, name, block_size, threads, per_thread, queue))
+               for _ in range(processes)]
+    started = time.perf_counter()
+    for p in workers:
+        p.start()
+    values = [value for _ in workers for value in queue.get()]
+    for p in workers:
+        p.join()
+    return values, time.perf_counter() - started
+
+def legacy_timestamp_collisions(count: int) -> int:
+    """IDs the old f"APP{now:%Y%m%d%H%M}" scheme would have repeated for `count` submissions"""
+    ids = [f"APP{datetime.now().strftime('%Y%m%d%H%M')}" for _ in range(count)]
+    return len(ids) - len(set(ids))
+
+def report(label: str, values, elapsed: float) -> bool:
+    duplicates = len(values) - len(set(values))
+    print(f"{label:<38} {len(values):>8} {len(values) / elapsed:>12.0f} {duplicates:>11}")
+    return duplicates == 0
+
+def main():
+    parser = argparse.ArgumentParser(description="ID allocator stress test")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--per-thread", type=int, default=2000)
+    parser.add_argument("--block-size", type=int, default=32)
+    parser.add_argument("--redis-url", default=None, help="Also test the Redis store (threads and processes)")
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'mode':<38} {'ids':>8} {'ids/s':>12} {'duplicates':>11}")
+    ok = True
+    for block_size in (1, args.block_size):
+        allocator = IdAllocator(InMemorySequenceStore(), block_size)
+        values, elapsed = allocate_threaded(allocator, "GSP-2026", args.threads, args.per_thread)
+        ok &= report(f"memory, {args.threads} threads, block {block_size}", values, elapsed)
+
+    if args.redis_url:
+        import redis
+        prefix = f"lia:stress:{uuid.uuid4().hex[:8]}:"
+        client = redis.Redis.from_url(args.redis_url)
+        per_thread = max(1, args.per_thread // 10)  # Each unblocked allocation is a network round trip
+        for block_size in (1, args.block_size):
+            name = f"threads-{block_size}"
+            allocator = IdAllocator(RedisSequenceStore(client, prefix), block_size)
+            values, elapsed = allocate_threaded(allocator, name, args.threads, per_thread)
+            ok &= report(f"redis, {args.threads} threads, block {block_size}", values, elapsed)
+
+            name = f"processes-{block_size}"
+            threads = max(1, args.threads // args.processes)
+            values, elapsed = allocate_multiprocess(args.redis_url, prefix, name, block_size, args.processes,
+                                                    threads, per_thread)
+            ok &= report(f"redis, {args.processes} procs x {threads} threads, block {block_size}", values, elapsed)
+        for key in client.scan_iter(f"{prefix}*"):
+            client.delete(key)
+
+    print(f"\nOld APP<yyyymmddHHMM> IDs repeated for 1000 submissions in a burst: {legacy_timestamp_collisions(1000)}")
+    if not ok:
+        print("FAILED: duplicate IDs allocated")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# conversation_history.py - Bounded per-session conversation history with a rolling summary of older turns
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+# Configuration
+HISTORY_MAX_TURNS = int(os.getenv("HISTORY_MAX_TURNS", 20))  # Messages (user and bot) kept verbatim per session
+HISTORY_SUMMARY_MESSAGES = int(os.getenv("HISTORY_SUMMARY_MESSAGES", 5))  # Older user messages quoted in the summary
+HISTORY_TEXT_LIMIT = int(os.getenv("HISTORY_TEXT_LIMIT", 200))  # Characters stored per message
+
+class Turn:
+    """One message: role is "user" or "bot", at is epoch seconds"""
+
+    __slots__ = ("role", "text", "at")
+
+    def __init__(self, role: str, text: str, at: int):
+        self.role = role
+        self.text = text
+        self.at = at
+
+    def to_dict(self) -> Dict:
+        return {"role": self.role, "text": self.text, "at": self.at}
+
+class ConversationHistory:
+    """Ring buffer of the last max_turns messages; older ones fold into a rolling summary
+
+    Folding only counts the dropped message and keeps the resident's own words
+    (bot replies are templates); the summary text is built when asked for.
+    """
+
+    __slots__ = ("turns", "folded", "earlier", "_summary")
+
+    def __init__(self, max_turns: int = HISTORY_MAX_TURNS, summary_messages: int = HISTORY_SUMMARY_MESSAGES):
+        self.turns: deque = deque(maxlen=max_turns)
+        self.folded = 0  # Messages dropped from the buffer so far
+        self.earlier: deque = deque(maxlen=summary_messages)  # Latest user messages among the dropped ones
+        self._summary: Optional[str] = None
+
+    def append(self, role: str, text: str, at: Optional[int] = None) -> None:
+        if len(self.turns) == self.turns.maxlen:
+            self._fold(self.turns[0])
+        if len(text) > HISTORY_TEXT_LIMIT:
+            text = text[:HISTORY_TEXT_LIMIT] + "..."
+        self.turns.append(Turn(role, text, int(time.time()) if at is None else at))
+
+    def _fold(self, turn: Turn) -> None:
+        self.folded += 1
+        if turn.role == "user":
+            self.earlier.append(turn.text)
+        self._summary = None
+
+    def summary(self) -> str:
+        """Short description of the messages no longer in the buffer ("" while nothing was dropped)"""
+        if not self.folded:
+            return ""
+        if self._summary is None:
+            summary = f"{self.folded} earlier messages not shown"
+            if self.earlier:
+                summary += "; the resident earlier said: " + "; ".join(f'"{text}"' for text in self.earlier)
+            self._summary = summary
+        return self._summary
+
+    def window(self, count: int) -> List[Turn]:
+        """The last count messages, oldest first"""
+        if count <= 0:
+            return []
+        start = max(0, len(self.turns) - count)
+        return [self.turns[i] for i in range(start, len(self.turns))]
+
+    def llm_messages(self, count: int) -> List[Dict]:
+        """Chat-completion messages for the summary plus the last count messages"""
+        messages = []
+        if self.folded:
+            messages.append({"role": "system", "content": f"Conversation so far: {self.summary()}"})
+        for turn in self.window(count):
+            messages.append({"role": "user" if turn.role == "user" else "assistant", "content": turn.text})
+        return messages
+
+    def __len__(self) -> int:
+        return self.folded + len(self.turns)
+
+    def __iter__(self) -> Iterator[Turn]:
+        return iter(self.turns)
+
+    def to_dict(self) -> Dict:
+        return {
+            "max_turns": self.turns.maxlen,
+            "turns": [[turn.role, turn.text, turn.at] for turn in self.turns],
+            "folded": self.folded,
+            "earlier": list(self.earlier)
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ConversationHistory":
+        history = cls(data.get("max_turns") or HISTORY_MAX_TURNS)
+        for role, text, at in data["turns"]:
+            history.turns.append(Turn(role, text, at))
+        history.folded = data["folded"]
+        history.earlier.extend(data["earlier"])
+        return history
+
+    @classmethod
+    def from_entries(cls, entries: List[Dict]) -> "ConversationHistory":
+        """Convert the old list of {"user"|"bot": text, "timestamp": iso} entries"""
+        history = cls()
+        for entry in entries:
+            role = "user" if "user" in entry else "bot"
+            at = int(datetime.fromisoformat(entry["timestamp"]).timestamp()) if entry.get("timestamp") else None
+            history.append(role, entry.get(role, ""), at)
+        return history
@@ -0,0 +1,170 @@
+# date_parser.py - Precompiled, memoized parsing of the date phrases users type
+import os
+import re
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+# Configuration
+DATE_CACHE_SIZE = int(os.getenv("DATE_CACHE_SIZE", 2048))  # Distinct (phrase, today) pairs kept
+
+MONTHS = {
+    "january": 1, "jan": 1, "february": 2, "feb": 2, "march": 3, "mar": 3, "april": 4, "apr": 4,
+    "may": 5, "june": 6, "jun": 6, "july": 7, "jul": 7, "august": 8, "aug": 8,
+    "september": 9, "sept": 9, "sep": 9, "october": 10, "oct": 10, "november": 11, "nov": 11,
+    "december": 12, "dec": 12,
+}
+WEEKDAYS = {
+    "monday": 0, "mon": 0, "tuesday": 1, "tue": 1, "tues": 1, "wednesday": 2, "wed": 2,
+    "thursday": 3, "thu": 3, "thur": 3, "thurs": 3, "friday": 4, "fri": 4,
+    "saturday": 5, "sat": 5, "sunday": 6, "sun": 6,
+}
+RELATIVE_DAYS = {"yesterday": -1, "today": 0, "tonight": 0, "tomorrow": 1, "tmrw": 1, "day after tomorrow": 2}
+NUMBER_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+                "eight": 8, "nine": 9, "ten": 10}
+
+def _alternation(words) -> str:
+    return "|".join(sorted(words, key=len, reverse=True))
+
+_MONTH = _alternation(MONTHS)
+_WEEKDAY = _alternation(WEEKDAYS)
+_YEAR = r"\d{4}|\d{2}"
+
+# Normalization: "On June 8th, 2026 through the 9th" -> "june 8 2026-9"
+_ORDINAL_SUFFIX = re.compile(r"(\d)(?:st|nd|rd|th)\b")
+_RANGE_WORD = re.compile(r"\s*(?:-|–|—|\bto\b|\bthrough\b|\bthru\b|\buntil\b|\btill\b|\band\b|&)\s*(?:the\s+)?")
+_FILLER = re.compile(r"^(?:(?:on|for|the)\s+)+|[,.!?]")
+_SPACES = re.compile(r"\s+")
+
+_ISO = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+_MONTH_DAY = re.compile(
+    rf"({_MONTH}) (\d{{1,2}})(?: ({_YEAR}))?(?:-(?:({_MONTH}) )?(\d{{1,2}})(?: ({_YEAR}))?)?")
+_DAY_MONTH = re.compile(rf"(\d{{1,2}})(?:-(\d{{1,2}}))? (?:of )?({_MONTH})(?: ({_YEAR}))?")
+_NUMERIC = re.compile(r"(\d{1,2})/(\d{1,2})(?:/(\d{4}|\d{2}))?(?:-(?:(\d{1,2})/)?(\d{1,2})(?:/(\d{4}|\d{2}))?)?")
+_WEEKDAY_RANGE = re.compile(rf"(?:(this|next|coming) )?({_WEEKDAY})(?:-({_WEEKDAY}))?")
+_WEEKEND = re.compile(r"(?:(this|next|coming) )?weekend")
+_IN_DAYS = re.compile(rf"in ({_alternation(NUMBER_WORDS)}|\d+) (day|days|week|weeks)")
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def normalize_date_phrase(text: str) -> str:
+    """Lowercase, drop fillers and ordinals, and spell every range separator as "-"; pure, so memoized"""
+    text = _SPACES.sub(" ", text.lower()).strip()
+    text = _ORDINAL_SUFFIX.sub(r"\1", _FILLER.sub("", text))
+    return _RANGE_WORD.sub("-", text).strip()
+
+def _year(value: Optional[str], default: int) -> int:
+    if not value:
+        return default
+    return 2000 + int(value) if len(value) == 2 else int(value)
+
+def _nearest(month: int, day: int, year: Optional[str], today: date) -> date:
+    """The date; without an explicit year, whichever of this year's or next year's is closer to today
+
+    So "Jan 5" typed in December means next January, while "Oct 1" typed on Oct 18 stays in the past.
+    """
+    parsed = date(_year(year, today.year), month, day)
+    if year is None and parsed < today:
+        try:
+            following = parsed.replace(year=parsed.year + 1)
+        except ValueError:  # Feb 29
+            return parsed
+        if following - today < today - parsed:
+            return following
+    return parsed
+
+def _range_end(start: date, month: int, day: int, year: Optional[str]) -> date:
+    end = date(_year(year, start.year), month, day)
+    if year is None and end < start:
+        end = end.replace(year=end.year + 1)  # "Dec 31 - Jan 1"
+    return end
+
+def _next_weekday(weekday: int, today: date, strictly_after: bool) -> date:
+    days_ahead = (weekday - today.weekday()) % 7
+    if days_ahead == 0 and strictly_after:
+        days_ahead = 7
+    return today + timedelta(days=days_ahead)
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_normalized(text: str, today: date) -> Optional[Tuple[date, date, bool]]:
+    """(start, end, relative) for a normalized phrase, or None; today is part of the cache key"""
+    try:
+        if text in RELATIVE_DAYS:
+            start = today + timedelta(days=RELATIVE_DAYS[text])
+            return start, start, True
+
+        match = _ISO.fullmatch(text)
+        if match:
+            start = date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+            return start, start, False
+
+        match = _MONTH_DAY.fullmatch(text)
+        if match:
+            month1, day1, year1, month2, day2, year2 = match.groups()
+            start = _nearest(MONTHS[month1], int(day1), year1, today)
+            if day2 is None:
+                return start, start, False
+            return start, _range_end(start, MONTHS[month2 or month1], int(day2), year2 or year1), False
+
+        match = _DAY_MONTH.fullmatch(text)
+        if match:
+            day1, day2, month, year = match.groups()
+            start = _nearest(MONTHS[month], int(day1), year, today)
+            end = _range_end(start, MONTHS[month], int(day2), year) if day2 else start
+            return start, end, False
+
+        match = _NUMERIC.fullmatch(text)
+        if match:
+            month1, day1, year1, month2, day2, year2 = match.groups()
+            start = _nearest(int(month1), int(day1), year1, today)
+            if day2 is None:
+                return start, start, False
+            return start, _range_end(start, int(month2 or month1), int(day2), year2 or year1), False
+
+        match = _WEEKDAY_RANGE.fullmatch(text)
+        if match:
+            modifier, first, last = match.groups()
+            # "saturday"/"this saturday" may be today; "next saturday" is always after today
+            start = _next_weekday(WEEKDAYS[first], today, strictly_after=modifier == "next")
+            end = _next_weekday(WEEKDAYS[last], start, strictly_after=False) if last else start
+            return start, end, True
+
+        match = _WEEKEND.fullmatch(text)
+        if match:
+            start = _next_weekday(WEEKDAYS["saturday"], today, strictly_after=match.group(1) == "next")
+            if today.weekday() == 6 and match.group(1) != "next":
+                start = today  # "this weekend" said on a Sunday
+                return start, start, True
+            return start, start + timedelta(days=1), True
+
+        match = _IN_DAYS.fullmatch(text)
+        if match:
+            amount = NUMBER_WORDS.get(match.group(1)) or int(match.group(1))
+            start = today + timedelta(days=amount * (7 if match.group(2).startswith("week") else 1))
+            return start, start, True
+    except (ValueError, OverflowError):
+        return None  # Matched the shape but not a real date ("feb 30", "13/45", "in 99999999 days")
+    return None
+
+def parse_date_phrase(text: str, today: Optional[date] = None) -> Optional[Dict]:
+    """Parse "June 8", "6/8/2026", "next Saturday", "June 8-9", "this weekend"...
+
+    Returns {"start", "end", "days", "relative"} or None when the phrase is not a date
+    or a range ends before it starts ("nov 20 2027 - nov 1 2026").
+    """
+    parsed = _parse_normalized(normalize_date_phrase(text), today or date.today())
+    if parsed is None:
+        return None
+    start, end, relative = parsed
+    if end < start:
+        return None
+    return {"start": start, "end": end, "days": (end - start).days + 1, "relative": relative}
+
+def cache_stats() -> Dict:
+    info = _parse_normalized.cache_info()  # Keyed on normalized phrase and today's date
+    lookups = info.hits + info.misses
+    return {
+        "size": info.currsize,
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_rate": round(info.hits / lookups, 3) if lookups else 0.0
+    }
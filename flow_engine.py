@@ -0,0 +1,158 @@
+# flow_engine.py - Declarative conversation flows: transition tables, step validators and pre-parsed reply templates
+from string import Formatter
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+END = 0  # goto target that finishes the flow (step 0, no intent)
+DEFAULT = "default"  # Outcome of steps without a validator
+
+# Extra !conversions for templates, e.g. "{bill.type!t}" -> "Water"
+CONVERSIONS = {
+    "t": str.title,
+    "l": str.lower,
+    "u": str.upper,
+    "s": str,
+    "r": repr
+}
+
+Validator = Callable[[Dict, str, Dict], Awaitable[str]]
+
+class Template:
+    """A str.format-style reply parsed once into literal and field pieces
+
+    Fields are looked up in the turn's values first, then in the session context;
+    dotted names index into dicts ("{bill.amount:.2f}" -> context["bill"]["amount"]).
+    """
+
+    __slots__ = ("text", "names", "static", "pieces")
+
+    def __init__(self, text: str):
+        self.text = text
+        names: List[str] = []
+        # (literal, field path or None, format spec, conversion function or None)
+        pieces: List[Tuple[str, Optional[Tuple[str, ...]], str, Optional[Callable]]] = []
+        for literal, field, spec, conversion in Formatter().parse(text):
+            if field is None:
+                pieces.append((literal, None, "", None))
+                continue
+            path = tuple(field.split("."))
+            if not all(key.isidentifier() for key in path):
+                raise ValueError(f"Template field {{{field}}} must be a dotted name: {text[:60]!r}")
+            if conversion and conversion not in CONVERSIONS:
+                raise ValueError(f"Unknown conversion !{conversion} in template: {text[:60]!r}")
+            if "{" in spec:
+                raise ValueError(f"Nested format specs are not supported in template: {text[:60]!r}")
+            if path[0] not in names:
+                names.append(path[0])
+            pieces.append((literal, path, spec, CONVERSIONS[conversion] if conversion else None))
+        self.names = tuple(names)
+        self.pieces = tuple(pieces)
+        # Without fields the reply is the same every time: unescape {{ }} once
+        self.static = "".join(literal for literal, _, _, _ in pieces) if not names else None
+
+    def render(self, values: Dict, context: Dict) -> str:
+        if self.static is not None:
+            return self.static
+        parts = []
+        for literal, path, spec, convert in self.pieces:
+            if literal:
+                parts.append(literal)
+            if path is None:
+                continue
+            value = values[path[0]] if path[0] in values else context[path[0]]
+            for key in path[1:]:
+                value = value[key]
+            if convert is not None:
+                value = convert(value)
+            parts.append(format(value, spec))
+        return "".join(parts)
+
+class Transition:
+    """What a step outcome does: the reply to send and the step to move to
+
+    goto is a step number, END, or None to stay on the current step.
+    options_from names a list in the turn's values shown before the static options.
+    """
+
+    __slots__ = ("reply", "goto", "options", "options_from", "escalate", "auto_continue_delay")
+
+    def __init__(self, reply: str, goto: Optional[int] = None, options: Optional[List[str]] = None,
+                 options_from: Optional[str] = None, escalate: bool = False,
+                 auto_continue_delay: Optional[int] = None):
+        self.reply = Template(reply)
+        self.goto = goto
+        self.options = list(options) if options else None
+        self.options_from = options_from
+        self.escalate = escalate
+        self.auto_continue_delay = auto_continue_delay  # Milliseconds
+
+    def apply(self, session: Dict, values: Dict) -> Dict:
+        if self.goto == END:
+            session["step"] = 0
+            session["intent"] = None
+        elif self.goto is not None:
+            session["step"] = self.goto
+        result = {"response": self.reply.render(values, session["context"]), "needs_escalation": self.escalate}
+        if self.options_from is not None:
+            result["options"] = list(values[self.options_from]) + (self.options or [])
+        elif self.options is not None:
+            result["options"] = self.options
+        if self.auto_continue_delay is not None:
+            result["auto_continue_delay"] = self.auto_continue_delay
+        return result
+
+class Step:
+    """One step of a flow: an optional async validator picks the outcome, the table maps it to a transition
+
+    validate(session, user_input, values) -> outcome; it may update session["context"]
+    and put per-turn template values into values.
+    """
+
+    __slots__ = ("transitions", "validate")
+
+    def __init__(self, transitions: Union[Transition, Dict[str, Transition]], validate: Optional[Validator] = None):
+        self.transitions = transitions if isinstance(transitions, dict) else {DEFAULT: transitions}
+        self.validate = validate
+
+class FlowEngine:
+    """Registered flows, flattened into one (flow, step) -> Step table"""
+
+    def __init__(self):
+        self.steps: Dict[Tuple[str, int], Step] = {}
+        self.flows = set()
+
+    def register(self, name: str, steps: Dict[int, Step]) -> None:
+        """Add a flow; conversations enter it at step 1"""
+        if 1 not in steps:
+            raise ValueError(f"Flow '{name}' has no step 1")
+        for number, step in steps.items():
+            if step.validate is None and set(step.transitions) != {DEFAULT}:
+                raise ValueError(f"Flow '{name}' step {number} has outcomes but no validator")
+            for outcome, transition in step.transitions.items():
+                if transition.goto not in (None, END) and transition.goto not in steps:
+                    raise ValueError(f"Flow '{name}' step {number} ({outcome}) goes to missing step {transition.goto}")
+        for number, step in steps.items():
+            self.steps[(name, number)] = step
+        self.flows.add(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.flows
+
+    async def advance(self, session: Dict, user_input: str) -> Dict:
+        """Run the session's current step on user_input"""
+        step = self.steps[(session["intent"], session["step"])]
+        values = {"input": user_input}
+        outcome = await step.validate(session, user_input, values) if step.validate else DEFAULT
+        try:
+            transition = step.transitions[outcome]
+        except KeyError:
+            raise ValueError(f"Flow '{session['intent']}' step {session['step']} has no transition for '{outcome}'")
+        return transition.apply(session, values)
+
+    def starter(self, name: str):
+        """Intent handler entering the flow"""
+        advance = self.advance
+        async def start(session: Dict, user_input: str) -> Dict:
+            session["intent"] = name
+            session["step"] = 1
+            return await advance(session, user_input)
+        return start
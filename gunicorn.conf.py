@@ -0,0 +1,33 @@
+# gunicorn.conf.py - Multi-worker deployment settings for LIA
+# Start with: gunicorn -c gunicorn.conf.py main:app
+import logging
+import multiprocessing
+import os
+
+logger = logging.getLogger("gunicorn.error")
+
+bind = f"0.0.0.0:{os.getenv('PORT', 8000)}"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 60))
+graceful_timeout = 30
+keepalive = 5
+
+# Every turn can land on a different process, so all state that must agree across turns and
+# workers has to live outside the process: sessions (SESSION_BACKEND=redis), city records such
+# as the garage sale permits the annual limit counts (CITY_DATA_BACKEND=sql) and issued ID
+# sequences (ID_BACKEND=redis, defaults to SESSION_BACKEND). Per-process backends are only
+# safe with a single worker.
+SHARED_BACKENDS = {
+    "SESSION_BACKEND": (os.getenv("SESSION_BACKEND", "memory"), "redis"),
+    "CITY_DATA_BACKEND": (os.getenv("CITY_DATA_BACKEND", "memory"), "sql"),
+    "ID_BACKEND": (os.getenv("ID_BACKEND", os.getenv("SESSION_BACKEND", "memory")), "redis")
+}
+per_process = [f"{name}={required}" for name, (value, required) in SHARED_BACKENDS.items() if value != required]
+if workers > 1 and per_process:
+    logger.warning(f"WEB_CONCURRENCY={workers} requires {', '.join(per_process)}; falling back to 1 worker")
+    workers = 1
+
+# RotatingFileSink renames the file it writes: give each worker its own INTERACTION_LOG_PATH.<pid>
+if workers > 1:
+    os.environ.setdefault("INTERACTION_LOG_PER_PROCESS", "true")
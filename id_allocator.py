@@ -0,0 +1,75 @@
+# id_allocator.py - Atomic sequence allocation for permit, application and service request IDs
+import os
+import threading
+from typing import Dict, Tuple
+
+from session_store import REDIS_URL, SESSION_BACKEND
+
+# Configuration
+ID_BACKEND = os.getenv("ID_BACKEND", SESSION_BACKEND)  # "memory" or "redis" (shared by all workers)
+ID_BLOCK_SIZE = int(os.getenv("ID_BLOCK_SIZE", 1))  # >1 reserves blocks per process: fewer round trips, gaps on restart
+REDIS_SEQUENCE_PREFIX = os.getenv("REDIS_SEQUENCE_PREFIX", "lia:seq:")
+
+class InMemorySequenceStore:
+    """Process-local counters; atomic across threads only"""
+
+    def __init__(self):
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, name: str, count: int) -> int:
+        """Atomically take `count` values and return the last one"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + count
+            return self._counters[name]
+
+    def seed(self, name: str, value: int) -> None:
+        """Make sure the next value handed out is above `value`"""
+        with self._lock:
+            self._counters[name] = max(self._counters.get(name, 0), value)
+
+class RedisSequenceStore:
+    """Counters in Redis: INCRBY is atomic across every worker process"""
+
+    def __init__(self, client, key_prefix: str = REDIS_SEQUENCE_PREFIX):
+        self.client = client
+        self.key_prefix = key_prefix
+
+    def reserve(self, name: str, count: int) -> int:
+        return int(self.client.incrby(f"{self.key_prefix}{name}", count))
+
+    def seed(self, name: str, value: int) -> None:
+        # Only the first process to start seeds the counter; later ones must not move it back
+        self.client.set(f"{self.key_prefix}{name}", value, nx=True)
+
+class IdAllocator:
+    """Hands out unique, increasing numbers per sequence name, optionally from pre-reserved blocks"""
+
+    def __init__(self, store, block_size: int = ID_BLOCK_SIZE):
+        self.store = store
+        self.block_size = max(1, block_size)
+        self._blocks: Dict[str, Tuple[int, int]] = {}  # name -> (next value, last value in block)
+        self._lock = threading.Lock()
+
+    def seed(self, name: str, value: int) -> None:
+        self.store.seed(name, value)
+
+    def next(self, name: str) -> int:
+        if self.block_size == 1:
+            return self.store.reserve(name, 1)
+        with self._lock:
+            next_value, last_value = self._blocks.get(name, (1, 0))
+            if next_value > last_value:
+                last_value = self.store.reserve(name, self.block_size)
+                next_value = last_value - self.block_size + 1
+            self._blocks[name] = (next_value + 1, last_value)
+            return next_value
+
+def create_id_allocator(backend: str = ID_BACKEND) -> IdAllocator:
+    """Build the allocator selected by ID_BACKEND (defaults to the session backend)"""
+    if backend == "redis":
+        import redis  # Optional dependency, only needed for the Redis backend
+        return IdAllocator(RedisSequenceStore(redis.Redis.from_url(REDIS_URL)))
+    if backend != "memory":
+        raise ValueError(f"Unknown ID_BACKEND '{backend}' (expected 'memory' or 'redis')")
+    return IdAllocator(InMemorySequenceStore())
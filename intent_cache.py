@@ -0,0 +1,138 @@
+# intent_cache.py - Bounded cache for intent detection results
+import os
+import re
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+# Configuration
+INTENT_CACHE_SIZE = int(os.getenv("INTENT_CACHE_SIZE", 5000))
+INTENT_CACHE_TTL = float(os.getenv("INTENT_CACHE_TTL", 3600))  # Seconds a cached result stays valid
+INTENT_CACHE_FUZZY = os.getenv("INTENT_CACHE_FUZZY", "false").lower() in ("1", "true", "yes")
+INTENT_CACHE_SIMILARITY = float(os.getenv("INTENT_CACHE_SIMILARITY", 0.85))  # Trigram Jaccard threshold
+
+NEAR_DUPLICATE_MIN_LENGTH = 12  # Short messages differ too much per character to match approximately
+NEAR_DUPLICATE_MAX_CANDIDATES = 50
+
+_PUNCTUATION = re.compile(r"[^\w\s']+")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_message(message: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace: 'Yes, pay now!' -> 'yes pay now'"""
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", message.lower())).strip()
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _copy_result(result: Dict) -> Dict:
+    return dict(result, entities=dict(result.get("entities") or {}))
+
+class IntentCache:
+    """LRU + TTL cache with an exact tier on normalized text and an optional trigram near-duplicate tier
+
+    Entries are keyed by (context, normalized text): the same words can mean another intent
+    in another conversation state, so lookups only match entries stored with the same context.
+    """
+
+    def __init__(self, max_size: int = INTENT_CACHE_SIZE, ttl_seconds: float = INTENT_CACHE_TTL,
+                 fuzzy: bool = INTENT_CACHE_FUZZY, similarity: float = INTENT_CACHE_SIMILARITY,
+                 clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.fuzzy = fuzzy
+        self.similarity = similarity
+        self._clock = clock
+        # (context, normalized text) -> (result, expires_at); ordered from least to most recently used
+        self._entries: "OrderedDict[Tuple[str, str], tuple]" = OrderedDict()
+        # Near-duplicate tier: (context, trigram) -> keys containing it, plus each key's trigram set
+        self._postings: Dict[Tuple[str, str], Set[Tuple[str, str]]] = {}
+        self._key_trigrams: Dict[Tuple[str, str], Set[str]] = {}
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        del self._entries[key]
+        for trigram in self._key_trigrams.pop(key, ()):
+            posting = (key[0], trigram)
+            keys = self._postings[posting]
+            keys.discard(key)
+            if not keys:
+                del self._postings[posting]
+
+    def _live_entry(self, key: Tuple[str, str], now: float):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= now:
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _near_duplicate(self, key: Tuple[str, str], now: float):
+        context, text = key
+        trigrams = _trigrams(text)
+        overlaps = Counter()
+        for trigram in trigrams:
+            overlaps.update(self._postings.get((context, trigram), ()))
+        best_key, best_score = None, self.similarity
+        for candidate, shared in overlaps.most_common(NEAR_DUPLICATE_MAX_CANDIDATES):
+            # Candidates come in decreasing overlap, and Jaccard can never exceed shared / len(trigrams)
+            if shared / len(trigrams) < best_score:
+                break
+            score = shared / (len(trigrams) + len(self._key_trigrams[candidate]) - shared)
+            if score >= best_score:
+                best_key, best_score = candidate, score
+        return self._live_entry(best_key, now) if best_key is not None else None
+
+    def get(self, message: str, context: str = "") -> Optional[Dict]:
+        """Return a copy of the cached result for this message in this context, or None"""
+        text = normalize_message(message)
+        key = (context, text)
+        now = self._clock()
+        entry = self._live_entry(key, now)
+        if entry is not None:
+            self.exact_hits += 1
+            return _copy_result(entry[0])
+        if self.fuzzy and len(text) >= NEAR_DUPLICATE_MIN_LENGTH:
+            entry = self._near_duplicate(key, now)
+            if entry is not None:
+                self.near_hits += 1
+                return _copy_result(entry[0])
+        self.misses += 1
+        return None
+
+    def put(self, message: str, result: Dict, context: str = "") -> None:
+        text = normalize_message(message)
+        key = (context, text)
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (_copy_result(result), self._clock() + self.ttl_seconds)
+        if self.fuzzy and len(text) >= NEAR_DUPLICATE_MIN_LENGTH:
+            trigrams = _trigrams(text)
+            self._key_trigrams[key] = trigrams
+            for trigram in trigrams:
+                self._postings.setdefault((context, trigram), set()).add(key)
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def stats(self) -> Dict:
+        lookups = self.exact_hits + self.near_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "fuzzy": self.fuzzy,
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.exact_hits + self.near_hits) / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
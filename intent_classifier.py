@@ -0,0 +1,104 @@
+# intent_classifier.py - Table-driven keyword intent classifier for LIA
+import re
+from typing import Dict
+
+# Whole-message matches for button clicks, checked before any keyword rule
+EXACT_INTENTS = {
+    "check other services": "greeting",
+    "other services": "greeting",
+    "main menu": "greeting",
+    "back to menu": "greeting",
+    "download receipt": "download_receipt",
+    "get receipt": "download_receipt",
+    "pay another bill": "pay_bill",
+    "another bill": "pay_bill",
+    "i'm all set": "farewell",
+    "all set": "farewell",
+    "done": "farewell",
+    "finished": "farewell",
+    "no thanks": "farewell",
+}
+
+# Keyword rules in priority order: the first rule with any keyword contained in the message wins
+INTENT_RULES = [
+    # Garage sale permit specific detection
+    {"intent": "apply_permit", "confidence": 0.95, "entities": {"permit_type": "garage_sale"},
+     "keywords": ["garage sale permit", "garage sale", "yard sale permit", "yard sale"]},
+    # Permit status checking with garage sale specificity
+    {"intent": "check_status", "confidence": 0.95, "entities": {"permit_type": "garage_sale"},
+     "keywords": ["check permit gsp", "permit gsp", "garage sale status", "check my garage sale"]},
+    {"intent": "greeting", "confidence": 0.9, "entities": {},
+     "keywords": ["hello", "hi", "hey", "help", "start"]},
+    {"intent": "pay_bill", "confidence": 0.9, "entities": {},
+     "keywords": ["bill", "pay", "water", "electricity", "gas", "electric", "utility"]},
+    # General permit application detection
+    {"intent": "apply_permit", "confidence": 0.8, "entities": {},
+     "keywords": ["permit", "license", "apply", "application", "construction"]},
+    {"intent": "pay_ticket", "confidence": 0.9, "entities": {},
+     "keywords": ["ticket", "fine", "violation", "parking", "speeding"]},
+    {"intent": "report_issue", "confidence": 0.9, "entities": {},
+     "keywords": ["report", "issue", "problem", "pothole", "streetlight", "traffic", "noise"]},
+    # Only specific status-related phrases, not general "check"
+    {"intent": "check_status", "confidence": 0.9, "entities": {},
+     "keywords": ["application status", "check status", "track application", "status of", "my application", "permit status"]},
+    {"intent": "escalate", "confidence": 0.9, "entities": {},
+     "keywords": ["human", "agent", "person", "representative", "help me", "confused"]},
+]
+
+FALLBACK_RESULT = {"intent": "other", "confidence": 0.3, "entities": {}, "needs_clarification": True}
+
+def _trie_pattern(keywords) -> str:
+    """Regex alternation shaped like a prefix trie; the longest keyword at a position wins"""
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Greedy optional group: try the longer keywords below this node first
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+def _compile_rules():
+    """Build the keyword -> rule index map and a single scanning pattern"""
+    keyword_rule = {}
+    for index, rule in enumerate(INTENT_RULES):
+        for keyword in rule["keywords"]:
+            keyword_rule.setdefault(keyword, index)
+    # Keywords starting at the same position are prefixes of each other, and the pattern reports
+    # the longest one. Resolve it to the best rule among all its keyword prefixes so
+    # "help me" still counts as greeting ("help") rather than escalate.
+    match_rule = {
+        keyword: min(index for prefix, index in keyword_rule.items() if keyword.startswith(prefix))
+        for keyword in keyword_rule
+    }
+    # The zero-width lookahead lets overlapping keywords match, which keeps the substring
+    # semantics of the rules ("hi" inside "this", "application" inside "my application").
+    pattern = re.compile("(?=(" + _trie_pattern(keyword_rule) + "))")
+    return match_rule, pattern
+
+_KEYWORD_RULE, _KEYWORD_PATTERN = _compile_rules()
+
+def _result(intent: str, confidence: float, entities: Dict) -> Dict:
+    return {"intent": intent, "confidence": confidence, "entities": dict(entities), "needs_clarification": False}
+
+def classify_intent(message: str) -> Dict:
+    """Classify a message with one pass of the precompiled keyword pattern"""
+    message_lower = message.lower().strip()
+
+    exact = EXACT_INTENTS.get(message_lower)
+    if exact is not None:
+        return _result(exact, 0.9, {})
+
+    matches = _KEYWORD_PATTERN.findall(message_lower)
+    if not matches:
+        return dict(FALLBACK_RESULT, entities={})
+    rule = INTENT_RULES[min(map(_KEYWORD_RULE.__getitem__, matches))]
+    return _result(rule["intent"], rule["confidence"], rule["entities"])
@@ -0,0 +1,224 @@
+# interaction_log.py - Queue-backed structured interaction logging with a background writer
+import functools
+import itertools
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import weakref
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+INTERACTION_LOG_PATH = os.getenv("INTERACTION_LOG_PATH", "")  # JSON-lines file; empty = stdout
+INTERACTION_LOG_MAX_BYTES = int(os.getenv("INTERACTION_LOG_MAX_BYTES", 10 * 1024 * 1024))  # Rotate at this size
+INTERACTION_LOG_BACKUPS = int(os.getenv("INTERACTION_LOG_BACKUPS", 5))
+# Each process writes and rotates its own <path>.<pid>; gunicorn.conf.py turns this on for several workers
+INTERACTION_LOG_PER_PROCESS = os.getenv("INTERACTION_LOG_PER_PROCESS", "false").lower() == "true"
+INTERACTION_LOG_QUEUE_SIZE = int(os.getenv("INTERACTION_LOG_QUEUE_SIZE", 10000))  # Records beyond this are dropped
+INTERACTION_LOG_BATCH_SIZE = int(os.getenv("INTERACTION_LOG_BATCH_SIZE", 256))
+INTERACTION_LOG_FLUSH_INTERVAL = float(os.getenv("INTERACTION_LOG_FLUSH_INTERVAL", 0.5))  # Seconds
+DEBUG_LOG_SAMPLE_RATE = float(os.getenv("DEBUG_LOG_SAMPLE_RATE", 0.01))  # Share of debug records kept
+
+_STOP = object()
+
+class StreamSink:
+    """Writes batches to a text stream (stdout by default)"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def write_batch(self, lines: List[str]) -> None:
+        self.stream.write("".join(lines))
+        self.stream.flush()
+
+    def close(self) -> None:
+        pass
+
+class RotatingFileSink:
+    """Appends batches to a JSON-lines file, rotating to path.1 ... path.N at max_bytes
+
+    Rotation renames files, so only one process may write a given path: with per_process
+    the file is <path>.<pid>, opened on the first write (after gunicorn forks the workers).
+    """
+
+    def __init__(self, path: str, max_bytes: int = INTERACTION_LOG_MAX_BYTES, backups: int = INTERACTION_LOG_BACKUPS,
+                 per_process: bool = INTERACTION_LOG_PER_PROCESS):
+        self.base_path = path
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.per_process = per_process
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = None
+        self._pid = None  # Process that opened _file; a forked child opens its own
+
+    def write_batch(self, lines: List[str]) -> None:
+        if self._file is None or self._pid != os.getpid():
+            self.path = f"{self.base_path}.{os.getpid()}" if self.per_process else self.base_path
+            self._file = open(self.path, "a", encoding="utf-8")
+            self._pid = os.getpid()
+        self._file.write("".join(lines))
+        self._file.flush()
+        if self.max_bytes and self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self) -> None:
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class Counter:
+    """Counter bumped from many threads without a lock: next() on itertools.count is atomic"""
+
+    __slots__ = ("_increments", "_reads")
+
+    def __init__(self):
+        self._increments = itertools.count()
+        self._reads = itertools.count()
+
+    def increment(self) -> None:
+        next(self._increments)
+
+    def value(self) -> int:
+        """Callers serialize reads; each read also draws from _increments, so subtract the reads"""
+        return next(self._increments) - next(self._reads)
+
+def _reset_in_child(logger_ref) -> None:
+    interaction_logger = logger_ref()
+    if interaction_logger is not None:
+        interaction_logger._reset()
+
+class InteractionLogger:
+    """Request threads only enqueue records; one writer thread serializes and writes them in batches
+
+    The queue is bounded and never waited on: when the writer falls behind, new records
+    are dropped and counted instead of slowing down /chat.
+    """
+
+    def __init__(self, sink, queue_size: int = INTERACTION_LOG_QUEUE_SIZE, batch_size: int = INTERACTION_LOG_BATCH_SIZE,
+                 flush_interval: float = INTERACTION_LOG_FLUSH_INTERVAL, debug_sample_rate: float = DEBUG_LOG_SAMPLE_RATE):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.debug_sample_rate = debug_sample_rate
+        self.queue_size = queue_size
+        self._stopped = False
+        self._reset()
+        # A worker forked after the logger was used (gunicorn --preload) inherits a writer thread
+        # that no longer exists and locks that may be held; give it fresh ones
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=functools.partial(_reset_in_child, weakref.ref(self)))
+
+    def _reset(self) -> None:
+        """Fresh queue, writer slot, locks and counters: at construction and in a forked child"""
+        self._queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        self._writer: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        # Request threads bump their counters lock-free; the writer's counters have a single writer
+        self._request_counters = {name: Counter() for name in ("enqueued", "dropped", "debug_sampled_out")}
+        self._writer_counters = {"written": 0, "batches": 0, "write_errors": 0}
+        self._stats_lock = threading.Lock()
+
+    def start(self) -> None:
+        # Started lazily on first use, so each worker process gets its own writer thread
+        with self._start_lock:
+            if self._stopped:
+                return
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run, name="interaction-log-writer", daemon=True)
+                self._writer.start()
+
+    def log(self, record: Dict) -> None:
+        """Queue a record for writing; never blocks. Records logged after stop() are dropped"""
+        if self._stopped:
+            self._request_counters["dropped"].increment()
+            return
+        if self._writer is None:
+            self.start()
+        try:
+            self._queue.put_nowait(record)
+            self._request_counters["enqueued"].increment()
+        except queue.Full:
+            self._request_counters["dropped"].increment()
+
+    def debug(self, name: str, **fields) -> None:
+        """Queue a sampled debug record (DEBUG_LOG_SAMPLE_RATE of calls are kept)"""
+        if random.random() >= self.debug_sample_rate:
+            self._request_counters["debug_sampled_out"].increment()
+            return
+        self.log({"event": "debug", "name": name, "timestamp": datetime.now().isoformat(), **fields})
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                stopping = True
+                batch = [record for record in batch if record is not _STOP]
+            self._write(batch)
+
+    def _write(self, batch: List[Dict]) -> None:
+        if not batch:
+            return
+        try:
+            self.sink.write_batch([json.dumps(record, default=str) + "\n" for record in batch])
+            self._writer_counters["written"] += len(batch)
+            self._writer_counters["batches"] += 1
+        except Exception as e:
+            self._writer_counters["write_errors"] += 1
+            logger.error(f"Interaction log write failed, {len(batch)} records lost: {str(e)}")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Write out everything queued so far and stop the writer"""
+        with self._start_lock:
+            if self._stopped:
+                return
+            self._stopped = True
+        if self._writer is not None and self._writer.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            self._writer.join(timeout)
+        self.sink.close()
+
+    @property
+    def counters(self) -> Dict:
+        with self._stats_lock:
+            request_counts = {name: counter.value() for name, counter in self._request_counters.items()}
+        return {**request_counts, **self._writer_counters}
+
+    def stats(self) -> Dict:
+        return {**self.counters, "queued": self._queue.qsize()}
+
+def create_interaction_logger() -> InteractionLogger:
+    """Build the logger writing to INTERACTION_LOG_PATH, or to stdout when it is not set"""
+    sink = RotatingFileSink(INTERACTION_LOG_PATH) if INTERACTION_LOG_PATH else StreamSink()
+    return InteractionLogger(sink)
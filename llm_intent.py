@@ -0,0 +1,247 @@
+# llm_intent.py - Async LLM intent detection with keyword fallback for LIA
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Dict, Optional
+
+import httpx
+
+from conversation_history import ConversationHistory
+from intent_cache import IntentCache
+from intent_classifier import EXACT_INTENTS, classify_intent
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "demo-key")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+LLM_INTENT_ENABLED = os.getenv("LLM_INTENT_ENABLED", "auto")  # "auto" = on when a real API key is set
+LLM_INTENT_MODEL = os.getenv("LLM_INTENT_MODEL", "gpt-3.5-turbo")
+LLM_CALL_TIMEOUT = float(os.getenv("LLM_CALL_TIMEOUT", 1.5))  # Seconds per HTTP attempt
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", 2.5))  # Total seconds budget for one detection, retries included
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", 2))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 20))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", 5))  # Consecutive failures that open the breaker
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", 30))  # Seconds before a half-open probe
+
+KNOWN_INTENTS = [
+    "greeting", "pay_bill", "apply_permit", "pay_ticket", "report_issue",
+    "check_status", "escalate", "download_receipt", "farewell", "other"
+]
+
+SYSTEM_PROMPT = (
+    "You classify messages sent to the City of Kermit services assistant. "
+    f"Reply with a JSON object {{\"intent\": one of {KNOWN_INTENTS}, \"confidence\": 0..1, "
+    "\"entities\": {}}. Use entities.permit_type = \"garage_sale\" for garage or yard sales."
+)
+
+class CircuitBreaker:
+    """Stops calling a failing dependency; lets one probe through after reset_timeout"""
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURES, reset_timeout: float = LLM_BREAKER_RESET,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self._clock() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.probe_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = self._clock()
+
+    def release_probe(self) -> None:
+        """The call ended without an answer either way (cancelled); let the next request probe"""
+        self.probe_in_flight = False
+
+def cache_context(context: str, conversation_history: Optional[ConversationHistory]) -> str:
+    """Intent cache context: the caller's conversation state plus the bot reply being answered"""
+    last = conversation_history.window(1) if conversation_history is not None else []
+    return f"{context}|{last[0].text}" if last else context
+
+class LatencyTracker:
+    """Keeps the most recent samples for percentile reporting"""
+
+    def __init__(self, size: int = 1000):
+        self.samples = deque(maxlen=size)
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def summary(self) -> Dict:
+        p50, p99 = self.percentile(50), self.percentile(99)
+        return {
+            "samples": len(self.samples),
+            "p50_ms": round(p50 * 1000, 2) if p50 is not None else None,
+            "p99_ms": round(p99 * 1000, 2) if p99 is not None else None
+        }
+
+class LLMIntentClassifier:
+    """Classifies intents with an OpenAI-compatible chat completions endpoint"""
+
+    def __init__(self, api_key: str = OPENAI_API_KEY, base_url: str = OPENAI_BASE_URL, model: str = LLM_INTENT_MODEL,
+                 call_timeout: float = LLM_CALL_TIMEOUT, deadline: float = LLM_DEADLINE,
+                 max_attempts: int = LLM_MAX_ATTEMPTS, max_connections: int = LLM_MAX_CONNECTIONS,
+                 breaker: Optional[CircuitBreaker] = None, cache: Optional[IntentCache] = None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self.call_timeout = call_timeout
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.max_connections = max_connections
+        self.breaker = breaker or CircuitBreaker()
+        self.cache = cache
+        self._client: Optional[httpx.AsyncClient] = None
+        self.latency = LatencyTracker()
+        self.counters = {"calls": 0, "llm_successes": 0, "llm_failures": 0, "fallbacks": 0, "breaker_rejections": 0}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the running event loop; reused for connection pooling
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                timeout=httpx.Timeout(self.call_timeout)
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _request_intent(self, message: str, conversation_history: Optional[ConversationHistory]) -> Dict:
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+        if conversation_history is not None:
+            messages.extend(conversation_history.llm_messages(4))
+        messages.append({"role": "user", "content": message})
+
+        response = await self.client.post("/chat/completions", json={
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0,
+            "response_format": {"type": "json_object"}
+        })
+        response.raise_for_status()
+        content = json.loads(response.json()["choices"][0]["message"]["content"])
+        intent = content.get("intent")
+        if intent not in KNOWN_INTENTS:
+            raise ValueError(f"LLM returned unknown intent '{intent}'")
+        entities = content.get("entities")
+        return {
+            "intent": intent,
+            "confidence": float(content.get("confidence", 0.8)),
+            "entities": entities if isinstance(entities, dict) else {},
+            "needs_clarification": intent == "other"
+        }
+
+    async def _detect_within_deadline(self, message: str, conversation_history: Optional[ConversationHistory]) -> Dict:
+        started = time.monotonic()
+        last_error: Optional[Exception] = None
+        for _ in range(self.max_attempts):
+            remaining = self.deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            try:
+                return await asyncio.wait_for(self._request_intent(message, conversation_history),
+                                              timeout=min(self.call_timeout, remaining))
+            except (httpx.HTTPError, asyncio.TimeoutError, ValueError, KeyError, IndexError, TypeError) as e:
+                last_error = e
+        raise last_error or asyncio.TimeoutError()
+
+    async def detect(self, message: str, conversation_history: Optional[ConversationHistory] = None,
+                     context: str = "") -> Dict:
+        """Detect intent with the LLM, falling back to keyword matching on error, timeout or open breaker
+
+        context describes the conversation state (e.g. flow and step); cached answers are reused only
+        for the same context and the same previous bot reply, since the model sees both.
+        """
+        # Button clicks are unambiguous: no reason to pay for a model call
+        if message.lower().strip() in EXACT_INTENTS:
+            return classify_intent(message)
+
+        if self.cache is not None:
+            context = cache_context(context, conversation_history)
+            cached = self.cache.get(message, context)
+            if cached is not None:
+                return cached
+
+        self.counters["calls"] += 1
+        if not self.breaker.allow():
+            self.counters["breaker_rejections"] += 1
+            self.counters["fallbacks"] += 1
+            return classify_intent(message)
+
+        started = time.monotonic()
+        try:
+            result = await self._detect_within_deadline(message, conversation_history)
+        except Exception as e:
+            self.breaker.record_failure()
+            self.counters["llm_failures"] += 1
+            self.counters["fallbacks"] += 1
+            logger.warning(f"LLM intent detection failed, using keyword fallback: {type(e).__name__}: {str(e)}")
+            return classify_intent(message)
+        except BaseException:
+            # Cancelled (client went away, batch deadline): no verdict on the LLM, but the probe must not stay taken
+            self.breaker.release_probe()
+            raise
+        finally:
+            self.latency.record(time.monotonic() - started)
+
+        self.breaker.record_success()
+        self.counters["llm_successes"] += 1
+        # Only model answers are cached; keyword fallbacks must not outlive an outage
+        if self.cache is not None:
+            self.cache.put(message, result, context)
+        return result
+
+    def stats(self) -> Dict:
+        return {**self.counters, "breaker_state": self.breaker.state, "latency": self.latency.summary()}
+
+def create_llm_intent_classifier() -> Optional[LLMIntentClassifier]:
+    """Build the LLM classifier, or None when keyword matching alone is configured"""
+    enabled = LLM_INTENT_ENABLED.lower()
+    if enabled == "auto":
+        enabled = "false" if OPENAI_API_KEY in ("", "demo-key") else "true"
+    if enabled not in ("1", "true", "yes"):
+        return None
+    logger.info(f"LLM intent detection enabled ({LLM_INTENT_MODEL} at {OPENAI_BASE_URL})")
+    return LLMIntentClassifier(cache=IntentCache())
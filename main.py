@@ -1,17 +1,31 @@
 # main.py - LIA Conversational AI Agent for Gov2Biz
-from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from fastapi import FastAPI, Request, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+import asyncio
 import os
 import time
 import uuid
 import logging
 from typing import Dict, Optional, List
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
+import re
+from session_store import create_session_store
+from repository import create_city_repository
+from intent_classifier import classify_intent
+from llm_intent import create_llm_intent_classifier
+from address_index import AddressIndex
+from street_catalogue import StreetCatalogue
+from id_allocator import create_id_allocator
+from date_parser import parse_date_phrase, cache_stats as date_cache_stats
+from interaction_log import create_interaction_logger
+from analytics import ConversationAnalytics
+from conversation_history import ConversationHistory
+from flow_engine import DEFAULT, END, FlowEngine, Step, Transition
+from metrics import registry as metrics_registry
+from ui_assets import UIBundle
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -32,18 +46,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files and templates
-try:
-    app.mount("/static", StaticFiles(directory="static"), name="static")
-except Exception:
-    # Static directory might not exist in demo
-    pass
-
-templates = Jinja2Templates(directory="templates")
+# Chat UI page and static files, rendered and compressed once (see ui_assets.py)
+ui_bundle = UIBundle()
 
 # Configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "demo-key")
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
+BACKEND_LATENCY = float(os.getenv("BACKEND_LATENCY", 0))  # Simulated seconds per payment/ID call (demo data; see CITY_DATA_LATENCY for records)
+GARAGE_SALE_ANNUAL_LIMIT = 2  # Approved garage sale permits per address per calendar year (city ordinance)
 
 class ChatRequest(BaseModel):
     message: str
@@ -57,95 +67,62 @@ class ChatResponse(BaseModel):
     options: Optional[List[str]] = None
     auto_continue_delay: Optional[int] = None  # Milliseconds to wait before auto-continuing
 
-# User sessions storage (use Redis/database in production)
-user_sessions: Dict[str, Dict] = {}
-
-# Mock data for demonstration - In production, replace with real database calls
-MOCK_BILLS = {
-    "123 main st": {
-        "amount": 82.35, 
-        "type": "water", 
-        "due_date": "2025-06-15",
-        "account": "WAT-001234"
-    },
-    "456 olive ave": {
-        "amount": 156.20, 
-        "type": "electricity", 
-        "due_date": "2025-06-10",
-        "account": "ELE-005678"
-    },
-    "789 pine rd": {
-        "amount": 45.80, 
-        "type": "gas", 
-        "due_date": "2025-06-20",
-        "account": "GAS-009876"
-    },
-    "101 oak street": {
-        "amount": 234.50, 
-        "type": "water", 
-        "due_date": "2025-06-18",
-        "account": "WAT-001122"
-    }
-}
+class ChatBatchRequest(BaseModel):
+    messages: List[ChatRequest]
 
-MOCK_TICKETS = {
-    "TK001": {"amount": 45.00, "type": "parking", "location": "Main St", "date": "2025-05-15"},
-    "TK002": {"amount": 125.00, "type": "speeding", "location": "Highway 101", "date": "2025-05-20"},
-    "PK2025001": {"amount": 35.00, "type": "parking meter", "location": "Downtown", "date": "2025-05-22"}
-}
+class ChatBatchResponse(BaseModel):
+    results: List[ChatResponse]  # Same order as the request's messages
 
-# Mock data for demonstration - In production, replace with real database calls
-MOCK_BILLS = {
-    "123 main st": {
-        "amount": 82.35, 
-        "type": "water", 
-        "due_date": "2025-06-15",
-        "account": "WAT-001234"
-    },
-    "456 olive ave": {
-        "amount": 156.20, 
-        "type": "electricity", 
-        "due_date": "2025-06-10",
-        "account": "ELE-005678"
-    },
-    "789 pine rd": {
-        "amount": 45.80, 
-        "type": "gas", 
-        "due_date": "2025-06-20",
-        "account": "GAS-009876"
-    },
-    "101 oak street": {
-        "amount": 234.50, 
-        "type": "water", 
-        "due_date": "2025-06-18",
-        "account": "WAT-001122"
-    }
-}
+# LLM intent detection (None = keyword matching only; see llm_intent.py for settings)
+llm_intent_classifier = create_llm_intent_classifier()
 
-MOCK_TICKETS = {
-    "TK001": {"amount": 45.00, "type": "parking", "location": "Main St", "date": "2025-05-15"},
-    "TK002": {"amount": 125.00, "type": "speeding", "location": "Highway 101", "date": "2025-05-20"},
-    "PK2025001": {"amount": 35.00, "type": "parking meter", "location": "Downtown", "date": "2025-05-22"}
-}
+# Words per `chunk` event on /chat/stream and /ws/chat
+STREAM_CHUNK_WORDS = int(os.getenv("STREAM_CHUNK_WORDS", 3))
 
-# Enhanced garage sales permit tracking system
-GARAGE_SALE_PERMITS = {
-    # Track permits by address and year for annual limit enforcement
-    "123 pine street": [
-        {"permit_id": "GSP-2025-045", "date": "2025-04-15", "duration": 1, "status": "approved", "year": 2025},
-    ],
-    "456 oak avenue": [
-        {"permit_id": "GSP-2025-023", "date": "2025-03-10", "duration": 2, "status": "approved", "year": 2025},
-        {"permit_id": "GSP-2025-031", "date": "2025-04-20", "duration": 1, "status": "approved", "year": 2025},
-    ]
-}
+# /chat/batch limits
+CHAT_BATCH_MAX_MESSAGES = int(os.getenv("CHAT_BATCH_MAX_MESSAGES", 500))  # Messages accepted per request
+CHAT_BATCH_CONCURRENCY = int(os.getenv("CHAT_BATCH_CONCURRENCY", 50))  # Sessions of one batch processed at a time
 
-MOCK_APPLICATIONS = {
-    "APP001": {"type": "construction permit", "status": "pending review", "address": "123 Main St", "submitted": "2025-05-10"},
-    "APP002": {"type": "business license", "status": "under review", "address": "456 Oak Ave", "submitted": "2025-05-18"},
-    "GSP-2025-045": {"type": "garage sale permit", "status": "approved", "address": "123 Pine Street", "submitted": "2025-04-10", "date": "2025-04-15", "duration": "1 day"},
-    "GSP-2025-023": {"type": "garage sale permit", "status": "approved", "address": "456 Oak Avenue", "submitted": "2025-03-05", "date": "2025-03-10", "duration": "2 days"},
-}
+# Message that completes a step the server is finishing on its own (payment processing).
+# HTTP clients send it after auto_continue_delay; WebSocket clients get the result pushed.
+# Once the step has run, sending it again returns the same reply (see process_chat_turn).
+FOLLOW_UP_MESSAGE = "continue_payment"
+
+# Structured interaction records, written off the request path (see interaction_log.py for settings)
+interaction_log = create_interaction_logger()
+
+# Prometheus metrics served at /metrics (METRICS_ENABLED=false turns recording off)
+CHAT_REQUESTS = metrics_registry.counter("lia_chat_requests_total", "Chat turns handled", ["endpoint"])
+CHAT_ERRORS = metrics_registry.counter("lia_chat_errors_total", "Chat turns that failed and were escalated", ["endpoint"])
+CHAT_SECONDS = metrics_registry.histogram("lia_chat_request_duration_seconds", "Chat turn latency", ["endpoint"])
+STAGE_SECONDS = metrics_registry.histogram("lia_chat_stage_duration_seconds", "Time spent per pipeline stage", ["stage"])
+INTENT_SECONDS = metrics_registry.histogram("lia_chat_intent_duration_seconds",
+                                            "Turn processing time per intent (detected or continued flow)", ["intent"])
+
+# Turn counters, active sessions and step funnels, updated per turn (see analytics.py)
+analytics = ConversationAnalytics()
+
+# User sessions storage (SESSION_BACKEND=redis for a shared store in production)
+session_store = create_session_store()
+
+# Permit, application and service request numbers (shared through Redis when ID_BACKEND=redis)
+id_allocator = create_id_allocator()
+
+# Bills, tickets, applications and garage sale permits (CITY_DATA_BACKEND=sql for a shared database)
+city_data = create_city_repository()
+
+def seed_permit_sequences() -> None:
+    """Start each year's GSP sequence after the highest permit number already issued"""
+    highest: Dict[int, int] = {}
+    for permit_id in city_data.issued_ids():
+        match = re.fullmatch(r"GSP-(\d{4})-(\d+)", permit_id)
+        if match:
+            year, number = int(match.group(1)), int(match.group(2))
+            highest[year] = max(highest.get(year, 0), number)
+    for year, number in highest.items():
+        id_allocator.seed(f"GSP-{year}", number)
+
+seed_permit_sequences()
 
 # City of Kermit boundaries (mock data for address validation)
 CITY_BOUNDARIES = [
@@ -156,6 +133,16 @@ CITY_BOUNDARIES = [
     "third street", "third st", "fourth street", "fourth st", "fifth street", "fifth st"
 ]
 
+# Street catalogue used for boundary validation (CITY_STREETS_FILE: one street per line)
+CITY_STREETS_FILE = os.getenv("CITY_STREETS_FILE")
+CITY_STREETS = StreetCatalogue.from_file(CITY_STREETS_FILE) if CITY_STREETS_FILE else StreetCatalogue(CITY_BOUNDARIES)
+
+# Typo-tolerant lookup over the same streets
+CITY_STREET_INDEX = AddressIndex()
+for street in CITY_STREETS.streets:
+    CITY_STREET_INDEX.add(street, street)
+CITY_STREET_MIN_MATCH = 0.7
+
 PERMIT_TYPES = [
     "Garage sale permit",
     "Construction permit", 
@@ -177,105 +164,82 @@ ISSUE_TYPES = [
 # Garage Sales Permit Helper Functions
 def validate_garage_sale_date(date_str: str) -> Dict:
     """Validate garage sale date according to City of Kermit rules"""
-    try:
-        from datetime import datetime, timedelta
-        import re
-        
-        # Parse various date formats
-        date_str = date_str.lower().strip()
-        current_date = datetime.now()
-        
-        # Handle common date formats
-        if re.match(r'^(january|february|march|april|may|june|july|august|september|october|november|december)\s+\d{1,2}', date_str):
-            # "June 8", "June 8th"
-            date_str = re.sub(r'(st|nd|rd|th)', '', date_str)
-            try:
-                parsed_date = datetime.strptime(f"{date_str} {current_date.year}", "%B %d %Y")
-            except:
-                parsed_date = datetime.strptime(f"{date_str} {current_date.year}", "%b %d %Y")
-        elif re.match(r'\d{1,2}/\d{1,2}', date_str):
-            # "6/8" or "06/08"
-            try:
-                parsed_date = datetime.strptime(f"{date_str}/{current_date.year}", "%m/%d/%Y")
-            except:
-                return {"valid": False, "error": "Invalid date format. Try 'June 8' or '6/8'"}
-        elif re.match(r'\d{4}-\d{2}-\d{2}', date_str):
-            # "2025-06-08"
-            parsed_date = datetime.strptime(date_str, "%Y-%m-%d")
-        else:
-            # Try to parse other formats
-            try:
-                parsed_date = datetime.strptime(date_str, "%B %d")
-                parsed_date = parsed_date.replace(year=current_date.year)
-            except:
-                return {"valid": False, "error": "I didn't understand that date format. Please try 'June 8' or '6/8'"}
-        
-        # Check if date is in the past
-        if parsed_date.date() < current_date.date():
-            return {"valid": False, "error": "Sorry, you can't schedule a garage sale for a past date. Please choose a future date."}
-        
-        # Check if date is more than 30 days in advance
-        if parsed_date.date() > (current_date + timedelta(days=30)).date():
-            return {"valid": False, "error": "You can only apply for garage sale permits up to 30 days in advance. Please choose a date within the next 30 days."}
-        
-        return {
-            "valid": True, 
-            "parsed_date": parsed_date,
-            "formatted_date": parsed_date.strftime("%B %d, %Y")
-        }
-        
-    except Exception as e:
-        return {"valid": False, "error": "I had trouble understanding that date. Please try a format like 'June 8' or '6/8'"}
+    today = datetime.now().date()
+    parsed = parse_date_phrase(date_str, today)
+    if parsed is None:
+        return {"valid": False, "error": "I didn't understand that date. Try 'June 8', '6/8', 'next Saturday' or 'June 8-9'"}
+    
+    # Check if date is in the past
+    if parsed["start"] < today:
+        return {"valid": False, "error": "Sorry, you can't schedule a garage sale for a past date. Please choose a future date."}
+    
+    # Check if date is more than 30 days in advance (the start as well as the end of a range)
+    if parsed["start"] > today + timedelta(days=30) or parsed["end"] > today + timedelta(days=30):
+        return {"valid": False, "error": "You can only apply for garage sale permits up to 30 days in advance. Please choose a date within the next 30 days."}
+    
+    if parsed["days"] > 3:
+        return {"valid": False, "error": "Garage sales are limited to maximum 3 consecutive days. For longer events, you may need a special event permit."}
+    
+    parsed_date = datetime.combine(parsed["start"], datetime.min.time())
+    formatted_date = parsed_date.strftime("%B %d, %Y")
+    if parsed["days"] > 1:
+        formatted_date += f" - {parsed['end'].strftime('%B %d, %Y')}"
+    return {
+        "valid": True, 
+        "parsed_date": parsed_date,
+        "end_date": datetime.combine(parsed["end"], datetime.min.time()),
+        "duration": parsed["days"],
+        "formatted_date": formatted_date
+    }
 
-def check_annual_permit_limit(address: str) -> Dict:
+async def check_annual_permit_limit(address: str) -> Dict:
     """Check if address has exceeded 2 garage sale permits per year limit"""
-    address_clean = address.lower().strip()
     current_year = datetime.now().year
-    
-    permits_this_year = 0
-    existing_permits = []
-    
-    for addr, permits in GARAGE_SALE_PERMITS.items():
-        if addr in address_clean or address_clean in addr:
-            year_permits = [p for p in permits if p.get("year", 2025) == current_year and p.get("status") == "approved"]
-            permits_this_year += len(year_permits)
-            existing_permits.extend(year_permits)
+    permits_this_year, existing_permits = await city_data.approved_permits(address, current_year)
     
     return {
-        "within_limit": permits_this_year < 2,
+        "within_limit": permits_this_year < GARAGE_SALE_ANNUAL_LIMIT,
         "current_count": permits_this_year,
         "existing_permits": existing_permits,
-        "remaining": max(0, 2 - permits_this_year)
+        "remaining": max(0, GARAGE_SALE_ANNUAL_LIMIT - permits_this_year)
     }
 
+@STAGE_SECONDS.timed("address_validation")
 def validate_city_address(address: str) -> Dict:
     """Check if address is within City of Kermit boundaries"""
     address_clean = address.lower().strip()
     
-    # Check against known city streets
-    is_valid = any(boundary in address_clean for boundary in CITY_BOUNDARIES)
+    # Check against known city streets (whole tokens only, so "domain street" is not "main street")
+    is_valid = CITY_STREETS.find_street(address_clean) is not None
+    suggested_street = None
+    
+    if not is_valid:
+        # Tolerate typos in the street name ("123 mian st" -> "main st")
+        matches = CITY_STREET_INDEX.fuzzy_search(re.sub(r"\d+", " ", address_clean), limit=1)
+        if matches and matches[0]["match"] >= CITY_STREET_MIN_MATCH:
+            is_valid = True
+            suggested_street = matches[0]["address"]
     
     return {
         "valid": is_valid,
+        "suggested_street": suggested_street,
         "message": "Address verified within City of Kermit limits" if is_valid else "This address appears to be outside City of Kermit boundaries. Please verify the address or contact us at (555) 123-CITY for assistance."
     }
 
 def generate_garage_sale_permit_id() -> str:
     """Generate unique garage sale permit ID in GSP-YYYY-XXX format"""
     current_year = datetime.now().year
-    
-    # Count existing permits for this year to get next number
-    existing_count = 0
-    for permits in GARAGE_SALE_PERMITS.values():
-        existing_count += len([p for p in permits if p.get("year", 2025) == current_year])
-    
-    # Also count from MOCK_APPLICATIONS
-    for app_id, app in MOCK_APPLICATIONS.items():
-        if app_id.startswith("GSP-") and app.get("type") == "garage sale permit":
-            existing_count += 1
-    
-    next_number = existing_count + 1
-    return f"GSP-{current_year}-{next_number:03d}"
+    return f"GSP-{current_year}-{id_allocator.next(f'GSP-{current_year}'):03d}"
+
+def generate_application_id() -> str:
+    """Generate unique application ID in APPYYYYNNNNN format"""
+    current_year = datetime.now().year
+    return f"APP{current_year}{id_allocator.next(f'APP-{current_year}'):05d}"
+
+def generate_service_request_id() -> str:
+    """Generate unique service request ID in SRYYYYNNNNN format"""
+    current_year = datetime.now().year
+    return f"SR{current_year}{id_allocator.next(f'SR-{current_year}'):05d}"
 
 def validate_permit_duration(duration_str: str) -> Dict:
     """Validate garage sale duration"""
@@ -316,105 +280,47 @@ def calculate_garage_sale_fee(duration: int) -> float:
     else:
         return base_fee + ((duration - 1) * additional_day_fee)
 
-def get_session(session_id: str) -> Dict:
+async def get_session(session_id: str) -> Dict:
     """Get or create user session"""
-    if session_id not in user_sessions:
-        user_sessions[session_id] = {
-            "intent": None,
-            "step": 0,
-            "context": {},
-            "conversation_history": [],
-            "failed_attempts": 0,
-            "created_at": datetime.now()
-        }
-    return user_sessions[session_id]
+    return await session_store.aget_or_create(session_id)
 
 def log_interaction(session_id: str, user_message: str, bot_response: str, intent: str = None):
     """Log user interactions for analytics"""
-    log_data = {
+    interaction_log.log({
+        "event": "interaction",
         "timestamp": datetime.now().isoformat(),
         "session_id": session_id,
         "user_message": user_message,
         "bot_response": bot_response[:100] + "..." if len(bot_response) > 100 else bot_response,
         "intent": intent
-    }
-    logger.info(f"Interaction: {json.dumps(log_data)}")
-
-def detect_intent_with_llm(message: str, conversation_history: List = None) -> Dict:
-    """Detect intent using LLM (fallback to keyword matching for demo)"""
-    message_lower = message.lower().strip()
-    
-    # Special cases - handle specific button clicks first
-    if message_lower in ["check other services", "other services", "main menu", "back to menu"]:
-        return {"intent": "greeting", "confidence": 0.9, "entities": {}, "needs_clarification": False}
-    
-    if message_lower in ["download receipt", "get receipt"]:
-        return {"intent": "download_receipt", "confidence": 0.9, "entities": {}, "needs_clarification": False}
-    
-    if message_lower in ["pay another bill", "another bill"]:
-        return {"intent": "pay_bill", "confidence": 0.9, "entities": {}, "needs_clarification": False}
-    
-    if message_lower in ["i'm all set", "all set", "done", "finished", "no thanks"]:
-        return {"intent": "farewell", "confidence": 0.9, "entities": {}, "needs_clarification": False}
-    
-    # Garage sale permit specific detection
-    if any(phrase in message_lower for phrase in ["garage sale permit", "garage sale", "yard sale permit", "yard sale"]):
-        return {"intent": "apply_permit", "confidence": 0.95, "entities": {"permit_type": "garage_sale"}, "needs_clarification": False}
-    
-    # Permit status checking with garage sale specificity
-    if any(phrase in message_lower for phrase in ["check permit gsp", "permit gsp", "garage sale status", "check my garage sale"]):
-        return {"intent": "check_status", "confidence": 0.95, "entities": {"permit_type": "garage_sale"}, "needs_clarification": False}
-    
-    # Greeting detection
-    if any(word in message_lower for word in ["hello", "hi", "hey", "help", "start"]):
-        return {"intent": "greeting", "confidence": 0.9, "entities": {}, "needs_clarification": False}
-    
-    # Bill payment detection
-    if any(word in message_lower for word in ["bill", "pay", "water", "electricity", "gas", "electric", "utility"]):
-        return {"intent": "pay_bill", "confidence": 0.9, "entities": {}, "needs_clarification": False}
-    
-    # General permit application detection
-    if any(word in message_lower for word in ["permit", "license", "apply", "application", "construction"]):
-        return {"intent": "apply_permit", "confidence": 0.8, "entities": {}, "needs_clarification": False}
-    
-    # Ticket/fine payment detection
-    if any(word in message_lower for word in ["ticket", "fine", "violation", "parking", "speeding"]):
-        return {"intent": "pay_ticket", "confidence": 0.9, "entities": {}, "needs_clarification": False}
-    
-    # Issue reporting detection
-    if any(word in message_lower for word in ["report", "issue", "problem", "pothole", "streetlight", "traffic", "noise"]):
-        return {"intent": "report_issue", "confidence": 0.9, "entities": {}, "needs_clarification": False}
-    
-    # Status check detection (only for specific status-related phrases, not general "check")
-    if any(phrase in message_lower for phrase in ["application status", "check status", "track application", "status of", "my application", "permit status"]):
-        return {"intent": "check_status", "confidence": 0.9, "entities": {}, "needs_clarification": False}
-    
-    # Escalation keywords
-    if any(word in message_lower for word in ["human", "agent", "person", "representative", "help me", "confused"]):
-        return {"intent": "escalate", "confidence": 0.9, "entities": {}, "needs_clarification": False}
-    
-    return {"intent": "other", "confidence": 0.3, "entities": {}, "needs_clarification": True}
-
-def search_by_address(address: str, search_type: str) -> Dict:
-    """Search for bills/applications by address with fuzzy matching"""
-    address_clean = address.lower().strip()
-    
-    # Remove common words and normalize
-    address_clean = address_clean.replace("street", "st").replace("avenue", "ave").replace("road", "rd")
-    
-    if search_type == "bills":
-        for addr, bill in MOCK_BILLS.items():
-            addr_normalized = addr.replace("street", "st").replace("avenue", "ave").replace("road", "rd")
-            if any(part in addr_normalized for part in address_clean.split()) or any(part in address_clean for part in addr_normalized.split()):
-                return {"found": True, "data": bill, "address": addr}
-    
-    elif search_type == "applications":
-        for app_id, app in MOCK_APPLICATIONS.items():
-            app_addr = app["address"].lower()
-            if any(part in app_addr for part in address_clean.split()) or any(part in address_clean for part in app_addr.split()):
-                return {"found": True, "data": app, "app_id": app_id}
-    
-    return {"found": False}
+    })
+
+@STAGE_SECONDS.timed("intent_keyword")
+def detect_intent_with_llm(message: str, conversation_history: Optional[ConversationHistory] = None) -> Dict:
+    """Detect intent using keyword matching (synchronous fallback for detect_intent_async)"""
+    return classify_intent(message)
+
+async def detect_intent_async(message: str, conversation_history: Optional[ConversationHistory] = None,
+                              context: str = "") -> Dict:
+    """Detect intent using the LLM when configured, falling back to keyword matching"""
+    if llm_intent_classifier is None:
+        return detect_intent_with_llm(message, conversation_history)
+    with STAGE_SECONDS.time("intent_llm"):
+        return await llm_intent_classifier.detect(message, conversation_history, context)
+
+def submit_payment(payment: Dict) -> str:
+    """Demo payment gateway: accepts every payment and returns a receipt number"""
+    return f"PAY{datetime.now().strftime('%Y%m%d%H%M%S')}"
+
+async def call_city_backend(fn, *args):
+    """Run a payment or ID issuing call; stands in for the network round trip of the real systems
+
+    City records come from city_data (see repository.py). BACKEND_LATENCY simulates the round trip.
+    fn runs in a worker thread: id_allocator.next is a blocking INCRBY with ID_BACKEND=redis.
+    """
+    if BACKEND_LATENCY:
+        await asyncio.sleep(BACKEND_LATENCY)
+    return await asyncio.to_thread(fn, *args)
 
 def handle_greeting() -> str:
     """Handle greeting intent with friendly response"""
@@ -442,451 +348,544 @@ Just tell me what you'd like to do in your own words! For example:
 
 How can I help you today?"""
 
-def handle_pay_bill_flow(session: Dict, user_input: str) -> Dict:
-    """Handle bill payment conversation flow with realistic payment simulation"""
-    if session["step"] == 1:
-        session["step"] = 2
-        return {
-            "response": "I'd be happy to help you find and pay your bills! 💳\n\nTo locate your account, could you please share your address? You can say something like '123 Main Street' or just 'Main Street' - I'll do my best to find it.",
-            "needs_escalation": False
-        }
-    
-    elif session["step"] == 2:
-        result = search_by_address(user_input, "bills")
-        if result["found"]:
-            bill = result["data"]
-            session["context"]["bill"] = bill
-            session["context"]["address"] = result["address"]
-            session["step"] = 3
-            return {
-                "response": f"Perfect! I found your account for **{result['address']}**:\n\n💰 **{bill['type'].title()} Bill**: ${bill['amount']:.2f}\n📅 **Due Date**: {bill['due_date']}\n🏠 **Account**: {bill['account']}\n\nWould you like to proceed with the payment?",
-                "needs_escalation": False,
-                "options": ["Yes, pay now", "Show me other bills", "Not now"]
-            }
-        else:
-            session["failed_attempts"] += 1
-            if session["failed_attempts"] >= 2:
-                return {
-                    "response": "I'm having trouble locating your bill in our system. This might be because:\n• The address format is different\n• The account is under a different name\n• There might be a system issue\n\nLet me connect you with a customer service representative who can help you find your account and process your payment. They'll be able to access more detailed records.",
-                    "needs_escalation": True
-                }
-            return {
-                "response": f"I couldn't find any bills for '{user_input}'. Let me try to help:\n\n• Try a different format (e.g., '123 Main St' instead of '123 Main Street')\n• Double-check the address spelling\n• Make sure it's the address on your account\n\nCould you try entering your address again?",
-                "needs_escalation": False
-            }
-    
-    elif session["step"] == 3:
-        user_lower = user_input.lower()
-        if "yes" in user_lower or "pay" in user_lower:
-            session["step"] = 4  # Move to payment processing step
-            bill = session["context"]["bill"]
-            return {
-                "response": f"Awesome! I'm processing your ${bill['amount']:.2f} {bill['type']} bill payment.\n\n📱 **Please check your SMS and email** for the secure payment link. You'll receive it within a few moments.\n\n⏳ Processing payment...",
-                "needs_escalation": False,
-                "auto_continue_delay": 2000  # Auto-continue after 2 seconds
-            }
-        elif "other" in user_lower or "show" in user_lower:
-            session["step"] = 2
-            return {
-                "response": "I'd be happy to show you other bills! Could you provide the address for the other account you'd like to check?",
-                "needs_escalation": False
-            }
-        else:
-            session["step"] = 0
-            session["intent"] = None
-            return {
-                "response": "No problem at all! Your bill information is saved and you can come back to pay it anytime before the due date.\n\n⏰ **Reminder**: Your bill is due on " + session["context"]["bill"]["due_date"] + "\n\nIs there anything else I can help you with?",
-                "needs_escalation": False
-            }
-    
-    elif session["step"] == 4:
-        # Payment confirmation step (auto-triggered after delay)
-        session["step"] = 0
-        session["intent"] = None
-        bill = session["context"]["bill"]
-        return {
-            "response": f"✅ **Payment Successful!**\n\nYour ${bill['amount']:.2f} {bill['type']} bill has been paid successfully!\n\n🧾 **Receipt #**: PAY{datetime.now().strftime('%Y%m%d%H%M%S')}\n📧 **Confirmation email**: Sent to your registered email\n📱 **SMS confirmation**: Sent to your phone\n\nWhat would you like to do next?",
-            "needs_escalation": False,
-            "options": ["Download receipt", "Pay another bill", "Check other services", "I'm all set"]
-        }
+# Conversation flows: each step's validator picks an outcome, the transition table maps it to
+# the reply and next step (see flow_engine.py). Validators may await city_data and backend calls.
+
+async def find_bill(session: Dict, user_input: str, values: Dict) -> str:
+    if user_input.lower() == "enter a different address":
+        return "retype"
+    with STAGE_SECONDS.time("address_search"):
+        result = await city_data.find_bill(user_input)
+    if result["found"]:
+        session["context"]["bill"] = result["data"]
+        session["context"]["address"] = result["address"]
+        return "found"
+    # Offering candidates uses up an attempt too, so picking nothing cannot loop forever
+    session["failed_attempts"] += 1
+    if session["failed_attempts"] >= 2:
+        return "give_up"
+    if result["candidates"]:
+        values["candidates"] = result["candidates"]
+        return "candidates"
+    return "not_found"
+
+async def choose_bill_action(session: Dict, user_input: str, values: Dict) -> str:
+    user_lower = user_input.lower()
+    if "yes" in user_lower or "pay" in user_lower:
+        return "pay"
+    if "other" in user_lower or "show" in user_lower:
+        return "other"
+    return "later"
+
+async def pay_bill(session: Dict, user_input: str, values: Dict) -> str:
+    values["receipt"] = await call_city_backend(submit_payment, session["context"]["bill"])
+    return "paid"
+
+async def choose_permit_path(session: Dict, user_input: str, values: Dict) -> str:
+    user_lower = user_input.lower()
+    is_garage_sale = "garage sale" in user_lower or "yard sale" in user_lower
+    interaction_log.debug("permit_request", user_input=user_input, garage_sale=is_garage_sale)
+    if is_garage_sale:
+        # Garage sale permits skip the permit type question
+        session["context"]["permit_type"] = "garage sale permit"
+        return "garage_sale"
+    return "choose_type"
+
+async def set_permit_type(session: Dict, user_input: str, values: Dict) -> str:
+    session["context"]["permit_type"] = user_input
+    return DEFAULT
+
+async def submit_permit(session: Dict, user_input: str, values: Dict) -> str:
+    session["context"]["address"] = user_input
+    if "garage sale" in session["context"]["permit_type"].lower():
+        # Garage sale permits are issued immediately, within the annual per-address limit
+        # Refuse early without spending a permit number; the insert below re-checks atomically
+        limit = await check_annual_permit_limit(user_input)
+        if not limit["within_limit"]:
+            values["limit"] = limit
+            return "limit_reached"
+        now = datetime.now()
+        values["app_id"] = await call_city_backend(generate_garage_sale_permit_id)
+        issued = await city_data.issue_garage_sale_permit(user_input, {
+            "permit_id": values["app_id"], "date": now.strftime("%Y-%m-%d"), "duration": 1, "status": "approved", "year": now.year
+        }, GARAGE_SALE_ANNUAL_LIMIT)
+        if not issued["issued"]:
+            # A concurrent request took the last slot between the check and the insert
+            values["limit"] = issued
+            return "limit_reached"
+    else:
+        values["app_id"] = await call_city_backend(generate_application_id)
+    return "submitted"
+
+async def choose_ticket_lookup(session: Dict, user_input: str, values: Dict) -> str:
+    if "ticket number" in user_input.lower():
+        return "by_number"
+    # Simplified for demo - assume we found a ticket
+    session["context"]["ticket"] = {"amount": 45.00, "type": "parking", "location": "Main St"}
+    return "demo_ticket"
+
+async def find_ticket(session: Dict, user_input: str, values: Dict) -> str:
+    values["ticket_num"] = user_input.upper().strip()
+    ticket = await city_data.get_ticket(values["ticket_num"])
+    if ticket:
+        session["context"]["ticket"] = ticket
+        return "found"
+    session["failed_attempts"] += 1
+    return "give_up" if session["failed_attempts"] >= 2 else "not_found"
+
+async def choose_ticket_action(session: Dict, user_input: str, values: Dict) -> str:
+    user_lower = user_input.lower()
+    if "yes" in user_lower and "pay" in user_lower:
+        await call_city_backend(submit_payment, session["context"]["ticket"])
+        return "paid"
+    if "dispute" in user_lower:
+        return "dispute"
+    return "later"
+
+async def set_issue_type(session: Dict, user_input: str, values: Dict) -> str:
+    session["context"]["issue_type"] = user_input
+    return DEFAULT
+
+async def submit_issue(session: Dict, user_input: str, values: Dict) -> str:
+    session["context"]["location"] = user_input
+    values["ticket_id"] = await call_city_backend(generate_service_request_id)
+    return DEFAULT
+
+async def choose_status_lookup(session: Dict, user_input: str, values: Dict) -> str:
+    return "by_id" if "application id" in user_input.lower() else "by_address"
+
+async def find_application(session: Dict, user_input: str, values: Dict) -> str:
+    values["app_id"] = user_input.upper().strip()
+    values["app"] = await city_data.get_application(values["app_id"])
+    return "found" if values["app"] else "not_found"
+
+async def find_application_by_address(session: Dict, user_input: str, values: Dict) -> str:
+    with STAGE_SECONDS.time("address_search"):
+        result = await city_data.find_application_by_address(user_input)
+    if result["found"]:
+        values["app"] = result["data"]
+        return "found"
+    return "not_found"
+
+conversation_flows = FlowEngine()
+
+conversation_flows.register("pay_bill", {
+    1: Step(Transition("I'd be happy to help you find and pay your bills! 💳\n\nTo locate your account, could you please share your address? You can say something like '123 Main Street' or just 'Main Street' - I'll do my best to find it.", goto=2)),
+    2: Step({
+        "retype": Transition("Sure! Please type the address on your account (for example '123 Main Street')."),
+        "found": Transition("Perfect! I found your account for **{address}**:\n\n💰 **{bill.type!t} Bill**: ${bill.amount:.2f}\n📅 **Due Date**: {bill.due_date}\n🏠 **Account**: {bill.account}\n\nWould you like to proceed with the payment?",
+                            goto=3, options=["Yes, pay now", "Show me other bills", "Not now"]),
+        "candidates": Transition("I couldn't find an exact match for '{input}', but these accounts look close. Is one of them yours?",
+                                 options_from="candidates", options=["Enter a different address"]),
+        "not_found": Transition("I couldn't find any bills for '{input}'. Let me try to help:\n\n• Try a different format (e.g., '123 Main St' instead of '123 Main Street')\n• Double-check the address spelling\n• Make sure it's the address on your account\n\nCould you try entering your address again?"),
+        "give_up": Transition("I'm having trouble locating your bill in our system. This might be because:\n• The address format is different\n• The account is under a different name\n• There might be a system issue\n\nLet me connect you with a customer service representative who can help you find your account and process your payment. They'll be able to access more detailed records.",
+                              escalate=True)
+    }, validate=find_bill),
+    3: Step({
+        "pay": Transition("Awesome! I'm processing your ${bill.amount:.2f} {bill.type} bill payment.\n\n📱 **Please check your SMS and email** for the secure payment link. You'll receive it within a few moments.\n\n⏳ Processing payment...",
+                          goto=4, auto_continue_delay=2000),  # Payment completes on the follow-up turn
+        "other": Transition("I'd be happy to show you other bills! Could you provide the address for the other account you'd like to check?", goto=2),
+        "later": Transition("No problem at all! Your bill information is saved and you can come back to pay it anytime before the due date.\n\n⏰ **Reminder**: Your bill is due on {bill.due_date}\n\nIs there anything else I can help you with?", goto=END)
+    }, validate=choose_bill_action),
+    4: Step({
+        "paid": Transition("✅ **Payment Successful!**\n\nYour ${bill.amount:.2f} {bill.type} bill has been paid successfully!\n\n🧾 **Receipt #**: {receipt}\n📧 **Confirmation email**: Sent to your registered email\n📱 **SMS confirmation**: Sent to your phone\n\nWhat would you like to do next?",
+                           goto=END, options=["Download receipt", "Pay another bill", "Check other services", "I'm all set"])
+    }, validate=pay_bill)
+})
+
+conversation_flows.register("apply_permit", {
+    1: Step({
+        "choose_type": Transition("I'd be happy to help you apply for a permit! 📋\n\nWhat type of permit do you need? Here are the most common ones:",
+                                  goto=2, options=PERMIT_TYPES),
+        "garage_sale": Transition("Perfect! I'll help you apply for a **garage sale permit**. Let me gather the required information.\n\n🏠 **What is the address where you'll hold the garage sale?**\n\nPlease provide the full street address (e.g., '123 Pine Street').",
+                                  goto=3)
+    }, validate=choose_permit_path),
+    2: Step(Transition("Great choice! For a **{permit_type}**, I'll need the address where this permit will be used.\n\nCould you please provide the address?", goto=3),
+            validate=set_permit_type),
+    3: Step({
+        "limit_reached": Transition("⚠️ **Annual Limit Reached**\n\n🏠 **{input}** already has {limit.current_count} approved garage sale permits this year. City of Kermit allows 2 garage sales per address per year.\n\n📞 Questions? Call (555) 123-CITY.\n\nAnything else I can help with?", goto=END),
+        "submitted": Transition("✅ **Application Submitted Successfully!**\n\n📋 **Permit Type**: {permit_type}\n🏠 **Address**: {input}\n🆔 **Application ID**: {app_id}\n\n**Next Steps:**\n• You'll receive an email confirmation within 1 hour\n• Required documents list will be sent to you\n• Typical processing time: 5-7 business days\n• You can check status anytime with your application ID\n\n📞 Questions? Call (555) 123-CITY or reply here!\n\nAnything else I can help with?", goto=END)
+    }, validate=submit_permit)
+})
+
+conversation_flows.register("pay_ticket", {
+    1: Step(Transition("I can help you pay your ticket! 🎫\n\nHow would you like me to find your ticket?",
+                       goto=2, options=["I have the ticket number", "Look up by address", "Look up by license plate"])),
+    2: Step({
+        "by_number": Transition("Perfect! Please enter your ticket number (it usually starts with letters like TK or PK followed by numbers):", goto=3),
+        "demo_ticket": Transition("I found a ticket for you:\n\n🎫 **Parking Violation** - $45.00\n📍 **Location**: Main St\n📅 **Date**: May 15, 2025\n\nWould you like to pay this ticket now?",
+                                  goto=4, options=["Yes, pay now", "Not this ticket", "Dispute this ticket"])
+    }, validate=choose_ticket_lookup),
+    3: Step({
+        "found": Transition("Found your ticket! 🎫\n\n**{ticket.type!t} Violation**\n💰 **Amount**: ${ticket.amount:.2f}\n📍 **Location**: {ticket.location}\n📅 **Date**: {ticket.date}\n\nWould you like to pay this ticket now?",
+                            goto=4, options=["Yes, pay now", "Dispute this ticket", "Not now"]),
+        "not_found": Transition("I couldn't find ticket number '{ticket_num}'. Could you double-check the number? It's usually printed at the top of your ticket."),
+        "give_up": Transition("I'm having trouble finding that ticket number in our system. Let me connect you with someone who can help locate your ticket and assist with payment.",
+                              escalate=True)
+    }, validate=find_ticket),
+    4: Step({
+        "paid": Transition("✅ **Ticket Paid Successfully!**\n\nYour ${ticket.amount:.2f} ticket has been paid in full.\n\n📧 Confirmation email sent\n🧾 Receipt available in your account\n🚗 Drive safely!\n\nIs there anything else I can help you with?", goto=END),
+        "dispute": Transition("I understand you'd like to dispute this ticket. Here's what you need to know:\n\n📋 **To dispute**: Visit our online portal or visit City Hall\n📅 **Deadline**: You have 21 days from the ticket date\n📞 **Questions**: Call (555) 123-CITY\n\n⚖️ You can continue to drive while your dispute is being reviewed.\n\nAnything else I can help with?", goto=END),
+        "later": Transition("No problem! Your ticket information is saved. Remember, you can pay anytime to avoid late fees.\n\nIs there anything else I can help you with?", goto=END)
+    }, validate=choose_ticket_action)
+})
+
+conversation_flows.register("report_issue", {
+    1: Step(Transition("Thank you for helping keep our city in great shape! 🛠️\n\nWhat type of issue would you like to report?", goto=2, options=ISSUE_TYPES)),
+    2: Step(Transition("Thanks for reporting a **{issue_type!l}**. To help our team respond quickly, could you provide the specific location?\n\nFor example: '123 Main Street' or 'Corner of Oak and Pine'", goto=3),
+            validate=set_issue_type),
+    3: Step(Transition("✅ **Issue Reported Successfully!**\n\n🎫 **Service Request**: #{ticket_id}\n🛠️ **Issue**: {issue_type}\n📍 **Location**: {input}\n\n**What happens next:**\n• Our maintenance team has been notified\n• Expected response time: 2-3 business days\n• You'll receive email updates on progress\n• Emergency issues are prioritized\n\n📞 For urgent safety issues, call (555) 911-CITY\n\nThank you for helping improve our community! Anything else I can do for you?", goto=END),
+            validate=submit_issue)
+})
+
+conversation_flows.register("check_status", {
+    1: Step(Transition("I can help you check your application status! 📊\n\nDo you have your application ID, or would you like me to look it up by address?",
+                       goto=2, options=["I have the application ID", "Look up by address"])),
+    2: Step({
+        "by_id": Transition("Great! Please enter your application ID (it usually starts with APP followed by numbers):", goto=3),
+        "by_address": Transition("I'll look up your applications by address. What's the address associated with your application?", goto=4)
+    }, validate=choose_status_lookup),
+    3: Step({
+        "found": Transition("📋 **Application Status Found**\n\n🆔 **ID**: {app_id}\n📝 **Type**: {app.type!t}\n🏠 **Address**: {app.address}\n📊 **Status**: {app.status!t}\n📅 **Submitted**: {app.submitted}\n\n**Status Details**: Your application is currently {app.status}. You should receive an update within 2-3 business days.\n\nNeed help with anything else?", goto=END),
+        "not_found": Transition("I couldn't find application ID '{app_id}'. Could you double-check the ID? It should be in your confirmation email.")
+    }, validate=find_application),
+    4: Step({
+        "found": Transition("📋 **Application Found**\n\n📝 **Type**: {app.type!t}\n🏠 **Address**: {app.address}\n📊 **Status**: {app.status!t}\n📅 **Submitted**: {app.submitted}\n\n**Status Details**: Your application is {app.status}.\n\nAnything else I can help with?", goto=END),
+        "not_found": Transition("I couldn't find any applications for '{input}'. The application might be under a different address or name. Would you like me to connect you with someone who can help locate it?",
+                                goto=END, options=["Yes, connect me", "Let me try a different address"])
+    }, validate=find_application_by_address)
+})
+
+def fixed_reply(text: str, needs_escalation: bool = False):
+    """Handler for intents answered with a single message"""
+    async def reply(session: Dict, user_input: str) -> Dict:
+        return {"response": text, "needs_escalation": needs_escalation}
+    return reply
+
+reply_help = fixed_reply("""I'm here to help with city services! I can assist you with:
 
-def handle_apply_permit_flow(session: Dict, user_input: str) -> Dict:
-    """Handle permit application flow"""
-    if session["step"] == 1:
-        session["step"] = 2
-        return {
-            "response": "I'd be happy to help you apply for a permit! 📋\n\nWhat type of permit do you need? Here are the most common ones:",
-            "needs_escalation": False,
-            "options": PERMIT_TYPES
-        }
-    
-    elif session["step"] == 2:
-        session["context"]["permit_type"] = user_input
-        session["step"] = 3
-        return {
-            "response": f"Great choice! For a **{user_input}**, I'll need the address where this permit will be used.\n\nCould you please provide the address?",
-            "needs_escalation": False
-        }
-    
-    elif session["step"] == 3:
-        session["context"]["address"] = user_input
-        session["step"] = 0
-        session["intent"] = None
-        app_id = f"APP{datetime.now().strftime('%Y%m%d%H%M')}"
-        
-        return {
-            "response": f"✅ **Application Submitted Successfully!**\n\n📋 **Permit Type**: {session['context']['permit_type']}\n🏠 **Address**: {user_input}\n🆔 **Application ID**: {app_id}\n\n**Next Steps:**\n• You'll receive an email confirmation within 1 hour\n• Required documents list will be sent to you\n• Typical processing time: 5-7 business days\n• You can check status anytime with your application ID\n\n📞 Questions? Call (555) 123-CITY or reply here!\n\nAnything else I can help with?",
-            "needs_escalation": False
-        }
+• 💳 **"I want to pay my bill"**
+• 📋 **"I need a permit"** 
+• 🎫 **"I want to pay a ticket"**
+• 🛠️ **"I want to report an issue"**
+• 📊 **"Check my application status"**
 
-def handle_pay_ticket_flow(session: Dict, user_input: str) -> Dict:
-    """Handle ticket payment flow"""
-    if session["step"] == 1:
-        session["step"] = 2
-        return {
-            "response": "I can help you pay your ticket! 🎫\n\nHow would you like me to find your ticket?",
-            "needs_escalation": False,
-            "options": ["I have the ticket number", "Look up by address", "Look up by license plate"]
-        }
-    
-    elif session["step"] == 2:
-        if "ticket number" in user_input.lower():
-            session["step"] = 3
-            return {
-                "response": "Perfect! Please enter your ticket number (it usually starts with letters like TK or PK followed by numbers):",
-                "needs_escalation": False
-            }
-        else:
-            # Simplified for demo - assume we found a ticket
-            session["step"] = 4
-            session["context"]["ticket"] = {"amount": 45.00, "type": "parking", "location": "Main St"}
-            return {
-                "response": "I found a ticket for you:\n\n🎫 **Parking Violation** - $45.00\n📍 **Location**: Main St\n📅 **Date**: May 15, 2025\n\nWould you like to pay this ticket now?",
-                "needs_escalation": False,
-                "options": ["Yes, pay now", "Not this ticket", "Dispute this ticket"]
-            }
-    
-    elif session["step"] == 3:
-        # Look up ticket by number
-        ticket_num = user_input.upper().strip()
-        if ticket_num in MOCK_TICKETS:
-            ticket = MOCK_TICKETS[ticket_num]
-            session["context"]["ticket"] = ticket
-            session["step"] = 4
-            return {
-                "response": f"Found your ticket! 🎫\n\n**{ticket['type'].title()} Violation**\n💰 **Amount**: ${ticket['amount']:.2f}\n📍 **Location**: {ticket['location']}\n📅 **Date**: {ticket['date']}\n\nWould you like to pay this ticket now?",
-                "needs_escalation": False,
-                "options": ["Yes, pay now", "Dispute this ticket", "Not now"]
-            }
-        else:
-            session["failed_attempts"] += 1
-            if session["failed_attempts"] >= 2:
-                return {
-                    "response": "I'm having trouble finding that ticket number in our system. Let me connect you with someone who can help locate your ticket and assist with payment.",
-                    "needs_escalation": True
-                }
-            return {
-                "response": f"I couldn't find ticket number '{ticket_num}'. Could you double-check the number? It's usually printed at the top of your ticket.",
-                "needs_escalation": False
-            }
-    
-    elif session["step"] == 4:
-        if "yes" in user_input.lower() and "pay" in user_input.lower():
-            session["step"] = 0
-            session["intent"] = None
-            ticket = session["context"]["ticket"]
-            return {
-                "response": f"✅ **Ticket Paid Successfully!**\n\nYour ${ticket['amount']:.2f} ticket has been paid in full.\n\n📧 Confirmation email sent\n🧾 Receipt available in your account\n🚗 Drive safely!\n\nIs there anything else I can help you with?",
-                "needs_escalation": False
-            }
-        elif "dispute" in user_input.lower():
-            session["step"] = 0
-            session["intent"] = None
-            return {
-                "response": "I understand you'd like to dispute this ticket. Here's what you need to know:\n\n📋 **To dispute**: Visit our online portal or visit City Hall\n📅 **Deadline**: You have 21 days from the ticket date\n📞 **Questions**: Call (555) 123-CITY\n\n⚖️ You can continue to drive while your dispute is being reviewed.\n\nAnything else I can help with?",
-                "needs_escalation": False
-            }
-        else:
-            session["step"] = 0
-            session["intent"] = None
-            return {
-                "response": "No problem! Your ticket information is saved. Remember, you can pay anytime to avoid late fees.\n\nIs there anything else I can help you with?",
-                "needs_escalation": False
-            }
-
-def handle_report_issue_flow(session: Dict, user_input: str) -> Dict:
-    """Handle issue reporting flow"""
-    if session["step"] == 1:
-        session["step"] = 2
-        return {
-            "response": "Thank you for helping keep our city in great shape! 🛠️\n\nWhat type of issue would you like to report?",
-            "needs_escalation": False,
-            "options": ISSUE_TYPES
-        }
-    
-    elif session["step"] == 2:
-        session["context"]["issue_type"] = user_input
-        session["step"] = 3
-        return {
-            "response": f"Thanks for reporting a **{user_input.lower()}**. To help our team respond quickly, could you provide the specific location?\n\nFor example: '123 Main Street' or 'Corner of Oak and Pine'",
-            "needs_escalation": False
-        }
-    
-    elif session["step"] == 3:
-        session["context"]["location"] = user_input
-        session["step"] = 0
-        session["intent"] = None
-        ticket_id = f"SR{datetime.now().strftime('%Y%m%d%H%M')}"
-        
-        return {
-            "response": f"✅ **Issue Reported Successfully!**\n\n🎫 **Service Request**: #{ticket_id}\n🛠️ **Issue**: {session['context']['issue_type']}\n📍 **Location**: {user_input}\n\n**What happens next:**\n• Our maintenance team has been notified\n• Expected response time: 2-3 business days\n• You'll receive email updates on progress\n• Emergency issues are prioritized\n\n📞 For urgent safety issues, call (555) 911-CITY\n\nThank you for helping improve our community! Anything else I can do for you?",
-            "needs_escalation": False
-        }
+Just tell me what you'd like to do, and I'll guide you through it step by step!""")
 
-def handle_check_status_flow(session: Dict, user_input: str) -> Dict:
-    """Handle application status checking"""
-    if session["step"] == 1:
-        session["step"] = 2
-        return {
-            "response": "I can help you check your application status! 📊\n\nDo you have your application ID, or would you like me to look it up by address?",
-            "needs_escalation": False,
-            "options": ["I have the application ID", "Look up by address"]
-        }
-    
-    elif session["step"] == 2:
-        if "application id" in user_input.lower():
-            session["step"] = 3
-            return {
-                "response": "Great! Please enter your application ID (it usually starts with APP followed by numbers):",
-                "needs_escalation": False
-            }
-        else:
-            session["step"] = 4
-            return {
-                "response": "I'll look up your applications by address. What's the address associated with your application?",
-                "needs_escalation": False
-            }
-    
-    elif session["step"] == 3:
-        # Look up by application ID
-        app_id = user_input.upper().strip()
-        if app_id in MOCK_APPLICATIONS:
-            app = MOCK_APPLICATIONS[app_id]
-            session["step"] = 0
-            session["intent"] = None
-            return {
-                "response": f"📋 **Application Status Found**\n\n🆔 **ID**: {app_id}\n📝 **Type**: {app['type'].title()}\n🏠 **Address**: {app['address']}\n📊 **Status**: {app['status'].title()}\n📅 **Submitted**: {app['submitted']}\n\n**Status Details**: Your application is currently {app['status']}. You should receive an update within 2-3 business days.\n\nNeed help with anything else?",
-                "needs_escalation": False
-            }
-        else:
-            return {
-                "response": f"I couldn't find application ID '{app_id}'. Could you double-check the ID? It should be in your confirmation email.",
-                "needs_escalation": False
-            }
-    
-    elif session["step"] == 4:
-        # Look up by address
-        result = search_by_address(user_input, "applications")
-        session["step"] = 0
-        session["intent"] = None
-        
-        if result["found"]:
-            app = result["data"]
-            return {
-                "response": f"📋 **Application Found**\n\n📝 **Type**: {app['type'].title()}\n🏠 **Address**: {app['address']}\n📊 **Status**: {app['status'].title()}\n📅 **Submitted**: {app['submitted']}\n\n**Status Details**: Your application is {app['status']}.\n\nAnything else I can help with?",
-                "needs_escalation": False
-            }
-        else:
-            return {
-                "response": f"I couldn't find any applications for '{user_input}'. The application might be under a different address or name. Would you like me to connect you with someone who can help locate it?",
-                "needs_escalation": False,
-                "options": ["Yes, connect me", "Let me try a different address"]
-            }
+# Handlers for the first message of a conversation, by detected intent (anything else gets reply_help);
+# every registered flow is entered through its step 1
+INTENT_HANDLERS = {
+    **{flow: conversation_flows.starter(flow) for flow in conversation_flows.flows},
+    "greeting": fixed_reply(handle_greeting()),
+    "escalate": fixed_reply("Of course! Let me connect you with a human representative who can provide personalized assistance. Please hold on for just a moment.", needs_escalation=True),
+    "download_receipt": fixed_reply("🧾 **Receipt Download**\n\nYour receipt has been generated and will be downloaded shortly. You can also find all your payment receipts in your account history.\n\nIs there anything else I can help you with today?"),
+    "farewell": fixed_reply("Perfect! Thank you for using our city services. Have a wonderful day! 😊\n\nRemember, I'm here 24/7 whenever you need help with city services. Just come back and start a new conversation anytime!")
+}
 
 @app.get("/", response_class=HTMLResponse)
-def serve_ui(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+async def serve_ui(request: Request):
+    return ui_bundle.page_response(request.headers)
+
+@app.get("/static/{name}")
+async def serve_static(name: str, request: Request, v: Optional[str] = None):
+    response = ui_bundle.asset_response(name, v, request.headers)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return response
 
 @app.get("/health")
 def health_check():
     """Health check endpoint for monitoring"""
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    # worker_pid tells workers apart behind gunicorn (benchmarks/load_workers.py counts them)
+    return {"status": "healthy", "worker_pid": os.getpid(), "timestamp": datetime.now().isoformat()}
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    if llm_intent_classifier is not None:
+        await llm_intent_classifier.aclose()
+
+@app.on_event("shutdown")
+async def close_city_data():
+    await city_data.close()
+
+@app.on_event("shutdown")
+def flush_interaction_log():
+    interaction_log.stop()
 
 @app.post("/chat", response_model=ChatResponse)
-def chat(request: ChatRequest):
+async def chat(request: ChatRequest):
+    return await answer_chat(request, "chat")
+
+@app.post("/chat/batch", response_model=ChatBatchResponse)
+async def chat_batch(request: ChatBatchRequest):
+    """Many turns in one request (SMS/IVR gateway bursts, transcript replay)
+
+    Different sessions run concurrently; each session's messages run in the order given.
+    A message without a session_id starts a new session of its own.
+    """
+    if len(request.messages) > CHAT_BATCH_MAX_MESSAGES:
+        raise HTTPException(status_code=413, detail=f"At most {CHAT_BATCH_MAX_MESSAGES} messages per batch")
+    positions_by_session: Dict[str, List[int]] = {}
+    for position, message in enumerate(request.messages):
+        message.session_id = message.session_id or str(uuid.uuid4())
+        positions_by_session.setdefault(message.session_id, []).append(position)
+    
+    results: List[Optional[ChatResponse]] = [None] * len(request.messages)
+    slots = asyncio.Semaphore(CHAT_BATCH_CONCURRENCY)
+    
+    async def run_session(positions: List[int]) -> None:
+        async with slots:
+            for position in positions:
+                results[position] = await answer_chat(request.messages[position], "batch")
+    
+    await asyncio.gather(*(run_session(positions) for positions in positions_by_session.values()))
+    return ChatBatchResponse(results=results)
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Same turn as /chat, sent as Server-Sent Events: start, chunk..., done (metadata)"""
+    request.session_id = request.session_id or str(uuid.uuid4())
+    
+    async def events():
+        # Sent before the turn runs, so the connection is confirmed while intent detection is in flight
+        yield sse_event("start", {"session_id": request.session_id})
+        response = await answer_chat(request, "chat_stream")
+        for chunk in reply_chunks(response.reply):
+            yield sse_event("chunk", {"text": chunk})
+        yield sse_event("done", response.model_dump(exclude={"reply"}))
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.websocket("/ws/chat")
+async def chat_socket(websocket: WebSocket):
+    """Persistent chat session: one message per turn, replies as chunk/done events, follow-ups pushed"""
+    await websocket.accept()
+    session_id = websocket.query_params.get("session_id") or str(uuid.uuid4())
+    follow_up: Optional[asyncio.Task] = None
+    fire_follow_up = asyncio.Event()
+    
+    async def send_turn(message: str) -> None:
+        nonlocal follow_up
+        response = await answer_chat(ChatRequest(message=message, session_id=session_id), "ws_chat")
+        for chunk in reply_chunks(response.reply):
+            await websocket.send_json({"type": "chunk", "text": chunk})
+        delay = response.auto_continue_delay
+        await websocket.send_json({"type": "done", **response.model_dump(exclude={"reply", "auto_continue_delay"}),
+                                   "follow_up": bool(delay)})
+        if delay:
+            fire_follow_up.clear()
+            follow_up = asyncio.create_task(push_follow_up(delay / 1000))
+    
+    async def push_follow_up(delay: float) -> None:
+        try:
+            await asyncio.wait_for(fire_follow_up.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+        try:
+            await send_turn(FOLLOW_UP_MESSAGE)
+        except Exception as e:
+            logger.warning(f"Could not push follow-up to session {session_id}: {str(e)}")
+    
+    try:
+        await websocket.send_json({"type": "session", "session_id": session_id})
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                message = str(json.loads(raw).get("message", ""))
+            except (ValueError, AttributeError):
+                message = raw  # Plain-text frames are messages too
+            if not message.strip() or message.strip() == FOLLOW_UP_MESSAGE:
+                continue
+            if follow_up is not None and not follow_up.done():
+                # The pending step finishes (and is pushed) before the user's next message is handled
+                fire_follow_up.set()
+                await follow_up
+            await send_turn(message)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        # Sends to a client that vanished without a close frame raise the server library's own error
+        logger.info(f"WebSocket for session {session_id} closed: {type(e).__name__}")
+    finally:
+        if follow_up is not None and not follow_up.done():
+            # Finish the pending step (the payment) now rather than leave the session on it; the push
+            # fails quietly and the client fetches the reply over HTTP
+            fire_follow_up.set()
+            await asyncio.shield(follow_up)
+
+def sse_event(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def reply_chunks(reply: str, words_per_chunk: int = STREAM_CHUNK_WORDS) -> List[str]:
+    """Split a reply into chunks of a few words; the chunks concatenate back to the exact reply"""
+    words = re.findall(r"\s*\S+|\s+$", reply)
+    return ["".join(words[i:i + words_per_chunk]) for i in range(0, len(words), words_per_chunk)]
+
+async def answer_chat(request: ChatRequest, endpoint: str) -> ChatResponse:
+    """Run one chat turn; errors become an escalation reply"""
+    session_id = request.session_id or str(uuid.uuid4())
+    CHAT_REQUESTS.inc(endpoint)
+    started = time.perf_counter()
     try:
-        # Get or create session
-        session_id = request.session_id or str(uuid.uuid4())
-        session = get_session(session_id)
-        
         user_input = request.message.strip()
         
-        # Handle auto-continue messages (don't add to conversation history)
-        is_auto_continue = user_input == "continue_payment"
-        
-        # Add to conversation history (except auto-continue messages)
-        if not is_auto_continue:
-            session["conversation_history"].append({
-                "user": user_input, 
-                "timestamp": datetime.now().isoformat()
-            })
-        
-        response_data = {"needs_escalation": False, "options": None}
-        
-        # Debug session state
-        logger.info(f"Processing message. Session step: {session.get('step')}, Intent: {session.get('intent')}, Auto-continue: {is_auto_continue}")
-        
-        # Handle conversation flow
-        if session["step"] == 0 and not is_auto_continue:
-            # Detect intent for new conversation (but not for auto-continue)
-            intent_result = detect_intent_with_llm(user_input, session["conversation_history"])
-            intent = intent_result["intent"]
-            
-            if intent == "greeting":
-                response_text = handle_greeting()
-            elif intent == "pay_bill":
-                session["intent"] = "pay_bill"
-                session["step"] = 1
-                result = handle_pay_bill_flow(session, user_input)
-                response_text = result["response"]
-                response_data.update(result)
-            elif intent == "apply_permit":
-                session["intent"] = "apply_permit"
-                
-                # Check if it's specifically a garage sale permit request  
-                is_garage_sale = (
-                    "garage sale permit" in user_input.lower() or 
-                    "garage sale" in user_input.lower() or
-                    "yard sale permit" in user_input.lower() or
-                    "yard sale" in user_input.lower()
-                )
-                
-                # Log for debugging
-                logger.info(f"Permit request detected. User input: '{user_input}', Is garage sale: {is_garage_sale}")
-                
-                if is_garage_sale:
-                    # For garage sale permits, start the enhanced flow directly
-                    session["context"]["permit_type"] = "garage sale permit"
-                    session["step"] = 3
-                    response_text = "Perfect! I'll help you apply for a **garage sale permit**. Let me gather the required information.\n\n🏠 **What is the address where you'll hold the garage sale?**\n\nPlease provide the full street address (e.g., '123 Pine Street')."
-                    response_data["needs_escalation"] = False
-                    logger.info(f"Garage sale permit flow initiated. Step: {session['step']}")
-                else:
-                    # For other permits, use generic flow
-                    session["step"] = 1
-                    result = handle_apply_permit_flow(session, user_input)
-                    response_text = result["response"]
-                    response_data.update(result)
-                    logger.info(f"Generic permit flow initiated. Step: {session['step']}")
-
-            elif intent == "pay_ticket":
-                session["intent"] = "pay_ticket"
-                session["step"] = 1
-                result = handle_pay_ticket_flow(session, user_input)
-                response_text = result["response"]
-                response_data.update(result)
-            elif intent == "report_issue":
-                session["intent"] = "report_issue"
-                session["step"] = 1
-                result = handle_report_issue_flow(session, user_input)
-                response_text = result["response"]
-                response_data.update(result)
-            elif intent == "check_status":
-                session["intent"] = "check_status"
-                session["step"] = 1
-                result = handle_check_status_flow(session, user_input)
-                response_text = result["response"]
-                response_data.update(result)
-            elif intent == "escalate":
-                response_text = "Of course! Let me connect you with a human representative who can provide personalized assistance. Please hold on for just a moment."
-                response_data["needs_escalation"] = True
-            elif intent == "download_receipt":
-                response_text = "🧾 **Receipt Download**\n\nYour receipt has been generated and will be downloaded shortly. You can also find all your payment receipts in your account history.\n\nIs there anything else I can help you with today?"
-            elif intent == "farewell":
-                response_text = "Perfect! Thank you for using our city services. Have a wonderful day! 😊\n\nRemember, I'm here 24/7 whenever you need help with city services. Just come back and start a new conversation anytime!"
-            else:
-                response_text = """I'm here to help with city services! I can assist you with:
-
-• 💳 **"I want to pay my bill"**
-• 📋 **"I need a permit"** 
-• 🎫 **"I want to pay a ticket"**
-• 🛠️ **"I want to report an issue"**
-• 📊 **"Check my application status"**
-
-Just tell me what you'd like to do, and I'll guide you through it step by step!"""
-        
-        else:
-            # Continue existing conversation flow (including auto-continue)
-            if session["intent"] == "pay_bill":
-                result = handle_pay_bill_flow(session, user_input)
-                response_text = result["response"]
-                response_data.update(result)
-            elif session["intent"] == "apply_permit":
-                result = handle_apply_permit_flow(session, user_input)
-                response_text = result["response"]
-                response_data.update(result)
-            elif session["intent"] == "pay_ticket":
-                result = handle_pay_ticket_flow(session, user_input)
-                response_text = result["response"]
-                response_data.update(result)
-            elif session["intent"] == "report_issue":
-                result = handle_report_issue_flow(session, user_input)
-                response_text = result["response"]
-                response_data.update(result)
-            elif session["intent"] == "check_status":
-                result = handle_check_status_flow(session, user_input)
-                response_text = result["response"]
-                response_data.update(result)
+        # Detect intent before taking the session lock, so the LLM round trip doesn't hold it
+        intent_result = None
+        if llm_intent_classifier is not None and user_input != FOLLOW_UP_MESSAGE:
+            session = await session_store.aget(session_id)
+            if session is None or session["step"] == 0:
+                history = session["conversation_history"] if session else None
+                context = f"{session['intent']}:{session['step']}" if session else ""  # Intent cache key
+                intent_result = await detect_intent_async(user_input, history, context)
         
-        # Log interaction (skip auto-continue messages)
-        if not is_auto_continue:
-            log_interaction(session_id, user_input, response_text, session.get("intent"))
-        
-        # Add bot response to history
-        session["conversation_history"].append({
-            "bot": response_text[:200] + "..." if len(response_text) > 200 else response_text,
-            "timestamp": datetime.now().isoformat()
-        })
-        
-        return ChatResponse(
-            reply=response_text,
-            session_id=session_id,
-            intent=session.get("intent"),
-            needs_escalation=response_data["needs_escalation"],
-            options=response_data.get("options"),
-            auto_continue_delay=response_data.get("auto_continue_delay")
-        )
+        return await run_locked_turn(session_id, user_input, intent_result)
         
     except Exception as e:
         logger.error(f"Chat error: {str(e)}")
+        CHAT_ERRORS.inc(endpoint)
         return ChatResponse(
             reply="I'm experiencing some technical difficulties right now. Let me connect you with a human representative who can help you immediately.",
-            session_id=session_id or str(uuid.uuid4()),
+            session_id=session_id,
             needs_escalation=True,
             auto_continue_delay=None
         )
+    finally:
+        CHAT_SECONDS.observe(time.perf_counter() - started, endpoint)
+
+async def run_locked_turn(session_id: str, user_input: str, intent_result: Optional[Dict] = None) -> ChatResponse:
+    """Run one turn while holding the session lock (across tasks and, with Redis, across workers)"""
+    waiting = time.perf_counter()
+    async with session_store.alock(session_id):
+        STAGE_SECONDS.observe(time.perf_counter() - waiting, "session_lock")
+        return await process_chat_turn(session_id, user_input, intent_result)
+
+async def process_chat_turn(session_id: str, user_input: str, intent_result: Optional[Dict] = None) -> ChatResponse:
+    """Run one conversation turn; callers must hold the session lock
+
+    intent_result is a precomputed intent for fresh turns; it is ignored if the session
+    moved into a flow in the meantime, and keyword detection is used when it is missing.
+    """
+    turn_started = time.perf_counter()
+    with STAGE_SECONDS.time("session_load"):
+        session = await get_session(session_id)
+    is_new_session = not session["conversation_history"]
+    flow_before, step_before = session["intent"], session["step"]
+    intent = None
+    
+    # Handle auto-continue messages (don't add to conversation history)
+    is_auto_continue = user_input == FOLLOW_UP_MESSAGE
+    if is_auto_continue and session.get("follow_up"):
+        # Already run (pushed over a socket that then closed, or sent twice): same reply, no second step
+        return ChatResponse(session_id=session_id, intent=session.get("intent"), **session["follow_up"])
+    
+    # Add to conversation history (except auto-continue messages)
+    if not is_auto_continue:
+        session["conversation_history"].append("user", user_input)
+    
+    response_data = {"needs_escalation": False, "options": None}
+    
+    # Debug session state (sampled)
+    interaction_log.debug("turn", session_id=session_id, step=session.get("step"), intent=session.get("intent"),
+                          auto_continue=is_auto_continue)
+    
+    # Handle conversation flow: new conversations dispatch on the detected intent,
+    # ongoing ones (including auto-continue) on the flow they are in
+    flow_started = time.perf_counter()
+    if session["step"] == 0 and not is_auto_continue:
+        if intent_result is None:
+            intent_result = detect_intent_with_llm(user_input, session["conversation_history"])
+        intent = intent_result["intent"]
+        handler = INTENT_HANDLERS.get(intent, reply_help)
+    else:
+        handler = conversation_flows.advance if session["intent"] in conversation_flows else reply_help
+    result = await handler(session, user_input)
+    response_text = result["response"]
+    response_data.update(result)
+    
+    STAGE_SECONDS.observe(time.perf_counter() - flow_started, "flow_handler")
+    
+    # Log interaction (skip auto-continue messages)
+    if not is_auto_continue:
+        with STAGE_SECONDS.time("logging"):
+            log_interaction(session_id, user_input, response_text, session.get("intent"))
+    
+    # Add bot response to history
+    session["conversation_history"].append("bot", response_text)
+    if is_auto_continue:
+        session["follow_up"] = {"reply": response_text, "options": response_data.get("options"),
+                                "needs_escalation": response_data["needs_escalation"]}
+    else:
+        session.pop("follow_up", None)
+    
+    # Persist the updated session (also refreshes its idle expiry)
+    with STAGE_SECONDS.time("session_save"):
+        await session_store.asave(session_id, session)
+    analytics.record_turn(session_id, is_new_session, intent, step_before, flow_before, session["intent"],
+                          session["step"], 1 if is_auto_continue else 2, response_data["needs_escalation"])
+    INTENT_SECONDS.observe(time.perf_counter() - turn_started, intent or flow_before or "other")
+    
+    return ChatResponse(
+        reply=response_text,
+        session_id=session_id,
+        intent=session.get("intent"),
+        needs_escalation=response_data["needs_escalation"],
+        options=response_data.get("options"),
+        auto_continue_delay=response_data.get("auto_continue_delay")
+    )
+
+# Gauges read from the existing stats() at scrape time, so they add nothing per request
+def cache_hit_ratios() -> Dict:
+    ratios = {("date_parser",): date_cache_stats()["hit_rate"]}
+    if llm_intent_classifier and llm_intent_classifier.cache:
+        ratios[("intent",)] = llm_intent_classifier.cache.stats()["hit_rate"] or 0.0
+    return ratios
+
+# session_store.stats() is a Redis round trip with SESSION_BACKEND=redis: /metrics takes
+# one snapshot per scrape and both session gauges read it
+session_store_snapshot: Dict = {}
+
+def session_lookups() -> Dict:
+    return {("hit",): session_store_snapshot["hits"], ("miss",): session_store_snapshot["misses"]}
+
+def llm_intent_calls() -> Dict:
+    if not llm_intent_classifier:
+        return {}
+    return {(outcome,): count for outcome, count in llm_intent_classifier.counters.items()}
+
+metrics_registry.gauge("lia_session_store_sessions", "Sessions held by the session store",
+                       lambda: {(): session_store_snapshot["size"]})
+metrics_registry.gauge("lia_session_store_lookups", "Session lookups by result", session_lookups, ["result"])
+metrics_registry.gauge("lia_active_sessions", "Sessions with a turn in the active window (this worker)",
+                       lambda: {(): analytics.active_sessions()})
+metrics_registry.gauge("lia_cache_hit_ratio", "Hit rate of the intent and date parser caches", cache_hit_ratios, ["cache"])
+metrics_registry.gauge("lia_interaction_log_records", "Interaction log records by state",
+                       lambda: {(state,): interaction_log.stats()[state] for state in ("queued", "written", "dropped")},
+                       ["state"])
+metrics_registry.gauge("lia_llm_intent_calls", "LLM intent detection calls by outcome", llm_intent_calls, ["outcome"])
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus scrape endpoint"""
+    global session_store_snapshot
+    try:
+        session_store_snapshot = session_store.stats()
+    except Exception as e:
+        logger.warning(f"Could not read session store stats: {str(e)}")
+        session_store_snapshot = {}  # The session gauges are left out of this scrape
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/analytics/summary")
 def get_analytics_summary():
     """Analytics endpoint for monitoring"""
     try:
-        total_sessions = len(user_sessions)
-        active_sessions = sum(1 for s in user_sessions.values() 
-                            if (datetime.now() - s["created_at"]).seconds < 3600)
-        total_interactions = sum(len(s["conversation_history"]) for s in user_sessions.values())
-        
-        # Intent distribution
-        intents = {}
-        for session in user_sessions.values():
-            intent = session.get("intent", "unknown")
-            intents[intent] = intents.get(intent, 0) + 1
-        
         return {
             "status": "healthy",
-            "total_sessions": total_sessions,
-            "active_sessions": active_sessions,
-            "total_interactions": total_interactions,
-            "intent_distribution": intents,
+            **analytics.summary(),
+            "session_store": session_store.stats(),
+            "llm_intent": llm_intent_classifier.stats() if llm_intent_classifier else {"enabled": False},
+            "intent_cache": llm_intent_classifier.cache.stats() if llm_intent_classifier and llm_intent_classifier.cache else {"enabled": False},
+            "interaction_log": interaction_log.stats(),
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
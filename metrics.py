@@ -0,0 +1,200 @@
+# metrics.py - Lock-free counters and latency histograms with Prometheus text exposition
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Configuration
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Upper bounds in seconds; chat stages range from microseconds (keyword intents) to seconds (LLM calls)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                   2.5, 5.0)
+
+Labels = Tuple[str, ...]
+
+class _Metric:
+    """Values live in per-thread shards: each thread only ever writes its own, so updates need no lock
+
+    A scrape sums the shards; it may miss an update that is in flight, never corrupt one.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, label_names: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.enabled = METRICS_ENABLED
+        self._local = threading.local()
+        self._shards: List[Dict[Labels, list]] = []
+        self._shards_lock = threading.Lock()  # Taken once per thread, when its shard is created
+
+    def _shard(self) -> Dict[Labels, list]:
+        try:
+            return self._local.values
+        except AttributeError:
+            values: Dict[Labels, list] = {}
+            with self._shards_lock:
+                self._shards.append(values)
+            self._local.values = values
+            return values
+
+    def _merged(self, width: int) -> Dict[Labels, list]:
+        merged: Dict[Labels, list] = {}
+        for shard in list(self._shards):
+            for labels, values in list(shard.items()):
+                total = merged.setdefault(labels, [0] * width)
+                for i, value in enumerate(values):
+                    total[i] += value
+        return merged
+
+    def _label_text(self, labels: Labels, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        if not self.enabled:
+            return
+        shard = self._shard()
+        values = shard.get(labels)
+        if values is None:
+            values = shard[labels] = [0]
+        values[0] += amount
+
+    def collect(self) -> List[str]:
+        return [f"{self.name}{self._label_text(labels)} {_number(values[0])}"
+                for labels, values in sorted(self._merged(1).items())]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: Iterable[str] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels: str) -> None:
+        if not self.enabled:
+            return
+        shard = self._shard()
+        values = shard.get(labels)
+        if values is None:
+            # One slot per bucket (non-cumulative), then +Inf, sum and count
+            values = shard[labels] = [0] * (len(self.buckets) + 3)
+        values[bisect_left(self.buckets, value)] += 1
+        values[-2] += value
+        values[-1] += 1
+
+    def time(self, *labels: str) -> "_Timer":
+        """Context manager observing the elapsed time of its block"""
+        return _Timer(self, labels)
+
+    def timed(self, *labels: str):
+        """Decorator observing the duration of every call"""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - started, *labels)
+            return wrapper
+        return decorator
+
+    def collect(self) -> List[str]:
+        lines = []
+        for labels, values in sorted(self._merged(len(self.buckets) + 3).items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = self._label_text(labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(labels)} {values[-2]!r}")
+            lines.append(f"{self.name}_count{self._label_text(labels)} {values[-1]}")
+        return lines
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: Labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+        return False
+
+class Gauge:
+    """Value read from a callback at scrape time, e.g. a store size; nothing to update per request"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, label_names: Iterable[str], read: Callable[[], Dict[Labels, float]]):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.read = read
+
+    def collect(self) -> List[str]:
+        lines = []
+        for labels, value in sorted(self.read().items()):
+            pairs = ",".join(f'{name}="{_escape(label)}"' for name, label in zip(self.label_names, labels))
+            lines.append(f"{self.name}{{{pairs}}} {_number(value)}" if pairs else f"{self.name} {_number(value)}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: List = []
+
+    def counter(self, name: str, help_text: str, label_names: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, label_names))
+
+    def histogram(self, name: str, help_text: str, label_names: Iterable[str] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, label_names, buckets))
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], Dict[Labels, float]],
+              label_names: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, label_names, read))
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def set_enabled(self, enabled: bool) -> None:
+        for metric in self.metrics:
+            metric.enabled = enabled
+
+    def render(self) -> str:
+        """Prometheus text exposition format 0.0.4"""
+        lines = []
+        for metric in self.metrics:
+            try:
+                samples = metric.collect()
+            except Exception:
+                continue  # A failing gauge source (e.g. Redis down) must not break the scrape
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+# Shared registry for the app
+registry = MetricsRegistry()
@@ -0,0 +1,37 @@
+# permit_index.py - Per-address, per-year index of approved garage sale permits
+from typing import Dict, List, Tuple
+
+from address_index import canonical_address
+
+class PermitIndex:
+    """canonical address -> year -> approved permits, so annual limit checks are a dict lookup
+
+    Addresses are compared in canonical form ("123 Pine Street" == "123 pine st"), never by
+    substring, so "12 oak ave" and "112 oak ave" keep separate counts.
+    """
+
+    def __init__(self):
+        self._approved: Dict[str, Dict[int, List[Dict]]] = {}
+        self.total = 0
+
+    @classmethod
+    def from_registry(cls, registry: Dict[str, List[Dict]]) -> "PermitIndex":
+        """Build from a {address: [permit, ...]} mapping such as SEED_GARAGE_SALE_PERMITS"""
+        index = cls()
+        for address, permits in registry.items():
+            for permit in permits:
+                index.add(address, permit)
+        return index
+
+    def add(self, address: str, permit: Dict) -> None:
+        """Record a permit; only approved permits count toward the annual limit"""
+        if permit.get("status") != "approved":
+            return
+        by_year = self._approved.setdefault(canonical_address(address), {})
+        by_year.setdefault(permit.get("year", 2025), []).append(permit)
+        self.total += 1
+
+    def approved(self, address: str, year: int) -> Tuple[int, List[Dict]]:
+        """Number of approved permits for the address in the year, and the permits themselves"""
+        permits = self._approved.get(canonical_address(address), {}).get(year, [])
+        return len(permits), list(permits)
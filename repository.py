@@ -0,0 +1,468 @@
+# repository.py - City records (bills, tickets, applications, garage sale permits) behind an async repository
+import asyncio
+import copy
+import logging
+import os
+import queue
+import sqlite3
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from address_index import AddressIndex, canonical_address
+from permit_index import PermitIndex
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+CITY_DATA_BACKEND = os.getenv("CITY_DATA_BACKEND", "memory")  # "memory" or "sql"
+DATABASE_PATH = os.getenv("DATABASE_PATH", "lia.db")  # SQLite file for CITY_DATA_BACKEND=sql (":memory:" for tests)
+DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", 5))
+DATABASE_BUSY_TIMEOUT = float(os.getenv("DATABASE_BUSY_TIMEOUT", 5))  # Seconds a write waits for another writer
+CITY_DATA_LATENCY = float(os.getenv("CITY_DATA_LATENCY", 0))  # Simulated seconds per in-memory lookup (demo data)
+
+# Demo records; a new in-memory repository or empty database starts with these
+SEED_BILLS = {
+    "123 main st": {
+        "amount": 82.35,
+        "type": "water",
+        "due_date": "2025-06-15",
+        "account": "WAT-001234"
+    },
+    "456 olive ave": {
+        "amount": 156.20,
+        "type": "electricity",
+        "due_date": "2025-06-10",
+        "account": "ELE-005678"
+    },
+    "789 pine rd": {
+        "amount": 45.80,
+        "type": "gas",
+        "due_date": "2025-06-20",
+        "account": "GAS-009876"
+    },
+    "101 oak street": {
+        "amount": 234.50,
+        "type": "water",
+        "due_date": "2025-06-18",
+        "account": "WAT-001122"
+    }
+}
+
+SEED_TICKETS = {
+    "TK001": {"amount": 45.00, "type": "parking", "location": "Main St", "date": "2025-05-15"},
+    "TK002": {"amount": 125.00, "type": "speeding", "location": "Highway 101", "date": "2025-05-20"},
+    "PK2025001": {"amount": 35.00, "type": "parking meter", "location": "Downtown", "date": "2025-05-22"}
+}
+
+# Garage sale permits by address, for annual limit enforcement
+SEED_GARAGE_SALE_PERMITS = {
+    "123 pine street": [
+        {"permit_id": "GSP-2025-045", "date": "2025-04-15", "duration": 1, "status": "approved", "year": 2025},
+    ],
+    "456 oak avenue": [
+        {"permit_id": "GSP-2025-023", "date": "2025-03-10", "duration": 2, "status": "approved", "year": 2025},
+        {"permit_id": "GSP-2025-031", "date": "2025-04-20", "duration": 1, "status": "approved", "year": 2025},
+    ]
+}
+
+SEED_APPLICATIONS = {
+    "APP001": {"type": "construction permit", "status": "pending review", "address": "123 Main St", "submitted": "2025-05-10"},
+    "APP002": {"type": "business license", "status": "under review", "address": "456 Oak Ave", "submitted": "2025-05-18"},
+    "GSP-2025-045": {"type": "garage sale permit", "status": "approved", "address": "123 Pine Street", "submitted": "2025-04-10", "date": "2025-04-15", "duration": "1 day"},
+    "GSP-2025-023": {"type": "garage sale permit", "status": "approved", "address": "456 Oak Avenue", "submitted": "2025-03-05", "date": "2025-03-10", "duration": "2 days"},
+}
+
+def permit_application(address: str, permit: Dict) -> Dict:
+    """Application record listed for an issued garage sale permit"""
+    day_word = "day" if permit["duration"] == 1 else "days"
+    return {
+        "type": "garage sale permit",
+        "status": permit["status"],
+        "address": address,
+        "submitted": datetime.now().strftime("%Y-%m-%d"),
+        "date": permit["date"],
+        "duration": f"{permit['duration']} {day_word}"
+    }
+
+class CityRepository:
+    """Interface shared by all city data backends
+
+    Free-form addresses are resolved to record keys with typo-tolerant AddressIndexes
+    kept in process; the records themselves are fetched from the backend by key.
+    """
+
+    def __init__(self):
+        self.bill_addresses = AddressIndex()  # address -> bill key
+        self.application_addresses = AddressIndex()  # address -> application id
+
+    async def get_bill(self, address: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    async def get_ticket(self, ticket_number: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    async def get_application(self, app_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    async def approved_permits(self, address: str, year: int) -> Tuple[int, List[Dict]]:
+        """Number of approved garage sale permits for the address in the year, and the permits"""
+        raise NotImplementedError
+
+    async def add_garage_sale_permit(self, address: str, permit: Dict) -> None:
+        """Store an issued permit together with its application record"""
+        raise NotImplementedError
+
+    async def issue_garage_sale_permit(self, address: str, permit: Dict, annual_limit: int) -> Dict:
+        """Store the permit only while the address has fewer than annual_limit approved permits in its year
+
+        Counting and inserting are one atomic step, so concurrent requests cannot both take the
+        last slot. Returns {"issued", "current_count", "existing_permits"} (counted before the insert).
+        """
+        raise NotImplementedError
+
+    def issued_ids(self) -> List[str]:
+        """Permit and application ids issued so far (blocking; used once at startup to seed sequences)"""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+    async def find_bill(self, address: str) -> Dict:
+        """Bill for a free-form address, or the closest addresses as candidates"""
+        key, candidates = self._resolve(self.bill_addresses, address)
+        if key is None:
+            return {"found": False, "candidates": candidates}
+        return {"found": True, "data": await self.get_bill(key), "address": key}
+
+    async def find_application_by_address(self, address: str) -> Dict:
+        app_id, candidates = self._resolve(self.application_addresses, address)
+        if app_id is None:
+            return {"found": False, "candidates": candidates}
+        return {"found": True, "data": await self.get_application(app_id), "app_id": app_id}
+
+    @staticmethod
+    def _resolve(index: AddressIndex, address: str) -> Tuple[Optional[str], List[str]]:
+        # Found only when every street-name/house-number token matches one address and no other
+        # address matches as well ("main street" with bills on 123 and 500 Main St asks which)
+        matches = index.fuzzy_search(address, limit=5)
+        if not matches:
+            return None, []
+        best = matches[0]
+        best_address = canonical_address(best["address"])
+        rivals = [match for match in matches[1:] if canonical_address(match["address"]) != best_address
+                  and (match["match"] >= 1.0 or match["score"] == best["score"])]
+        if best["match"] < 1.0 or rivals:
+            candidates = {}  # One entry per address, best first
+            for match in matches:
+                candidates.setdefault(canonical_address(match["address"]), match["address"].title())
+            return None, list(candidates.values())[:3]
+        return best["record"], []
+
+class InMemoryCityRepository(CityRepository):
+    """Records in process-local dicts (the demo data); latency simulates a database round trip"""
+
+    def __init__(self, bills: Dict = SEED_BILLS, tickets: Dict = SEED_TICKETS, applications: Dict = SEED_APPLICATIONS,
+                 garage_sale_permits: Dict = SEED_GARAGE_SALE_PERMITS, latency: float = CITY_DATA_LATENCY):
+        super().__init__()
+        self.latency = latency
+        self.bills = copy.deepcopy(bills)
+        self.tickets = copy.deepcopy(tickets)
+        self.applications = copy.deepcopy(applications)
+        self.garage_sale_permits = copy.deepcopy(garage_sale_permits)
+        self.permit_index = PermitIndex.from_registry(self.garage_sale_permits)
+        for address in self.bills:
+            self.bill_addresses.add(address, address)
+        for app_id, app in self.applications.items():
+            self.application_addresses.add(app["address"], app_id)
+
+    async def _round_trip(self) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def get_bill(self, address: str) -> Optional[Dict]:
+        await self._round_trip()
+        return self.bills.get(address)
+
+    async def get_ticket(self, ticket_number: str) -> Optional[Dict]:
+        await self._round_trip()
+        return self.tickets.get(ticket_number)
+
+    async def get_application(self, app_id: str) -> Optional[Dict]:
+        await self._round_trip()
+        return self.applications.get(app_id)
+
+    async def approved_permits(self, address: str, year: int) -> Tuple[int, List[Dict]]:
+        await self._round_trip()
+        return self.permit_index.approved(address, year)
+
+    async def add_garage_sale_permit(self, address: str, permit: Dict) -> None:
+        await self._round_trip()
+        self._store_permit(address, permit)
+
+    async def issue_garage_sale_permit(self, address: str, permit: Dict, annual_limit: int) -> Dict:
+        await self._round_trip()
+        # No await between the count and the insert, so no other turn can run in between
+        count, permits = self.permit_index.approved(address, permit["year"])
+        if count < annual_limit:
+            self._store_permit(address, permit)
+        return {"issued": count < annual_limit, "current_count": count, "existing_permits": permits}
+
+    def _store_permit(self, address: str, permit: Dict) -> None:
+        self.garage_sale_permits.setdefault(address.lower().strip(), []).append(permit)
+        self.permit_index.add(address, permit)
+        self.applications[permit["permit_id"]] = permit_application(address, permit)
+        self.application_addresses.add(address, permit["permit_id"])
+
+    def issued_ids(self) -> List[str]:
+        permit_ids = [p["permit_id"] for permits in self.garage_sale_permits.values() for p in permits]
+        return permit_ids + list(self.applications)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bills (
+    address TEXT PRIMARY KEY,
+    amount REAL NOT NULL,
+    type TEXT NOT NULL,
+    due_date TEXT NOT NULL,
+    account TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tickets (
+    ticket_number TEXT PRIMARY KEY,
+    amount REAL NOT NULL,
+    type TEXT NOT NULL,
+    location TEXT NOT NULL,
+    date TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS applications (
+    app_id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    address TEXT NOT NULL,
+    address_key TEXT NOT NULL,
+    submitted TEXT NOT NULL,
+    date TEXT,
+    duration TEXT
+);
+CREATE INDEX IF NOT EXISTS applications_by_address ON applications (address_key);
+CREATE TABLE IF NOT EXISTS garage_sale_permits (
+    permit_id TEXT PRIMARY KEY,
+    address TEXT NOT NULL,
+    address_key TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    duration INTEGER NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS garage_sale_permits_by_address_year ON garage_sale_permits (address_key, year, status);
+"""
+
+# Parameterized lookups; sqlite3 keeps each connection's prepared statements in its statement cache
+SELECT_BILL = "SELECT amount, type, due_date, account FROM bills WHERE address = ?"
+SELECT_TICKET = "SELECT amount, type, location, date FROM tickets WHERE ticket_number = ?"
+SELECT_APPLICATION = "SELECT type, status, address, submitted, date, duration FROM applications WHERE app_id = ?"
+SELECT_APPLICATION_BY_ADDRESS = ("SELECT app_id, type, status, address, submitted, date, duration FROM applications "
+                                 "WHERE address_key = ? ORDER BY rowid LIMIT 1")
+# Rows added since a rowid, as (rowid, address, record key) for the address indexes
+SELECT_NEW_ADDRESSES = {
+    "bills": "SELECT rowid, address, address FROM bills WHERE rowid > ? ORDER BY rowid",
+    "applications": "SELECT rowid, address, app_id FROM applications WHERE rowid > ? ORDER BY rowid"
+}
+SELECT_APPROVED_PERMITS = ("SELECT permit_id, date, duration, status, year FROM garage_sale_permits "
+                           "WHERE address_key = ? AND year = ? AND status = 'approved' ORDER BY date")
+INSERT_PERMIT = ("INSERT INTO garage_sale_permits (permit_id, address, address_key, year, date, duration, status) "
+                 "VALUES (?, ?, ?, ?, ?, ?, ?)")
+INSERT_APPLICATION = ("INSERT OR REPLACE INTO applications (app_id, type, status, address, address_key, submitted, date, duration) "
+                      "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+# Seeding skips rows that are already there
+SEED_STATEMENTS = {
+    "bills": "INSERT OR IGNORE INTO bills VALUES (?, ?, ?, ?, ?)",
+    "tickets": "INSERT OR IGNORE INTO tickets VALUES (?, ?, ?, ?, ?)",
+    "applications": "INSERT OR IGNORE INTO applications VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+    "garage_sale_permits": ("INSERT OR IGNORE INTO garage_sale_permits "
+                            "(permit_id, address, address_key, year, date, duration, status) VALUES (?, ?, ?, ?, ?, ?, ?)")
+}
+
+class ConnectionPool:
+    """Fixed set of SQLite connections; each query runs in a worker thread on a borrowed connection
+
+    A call borrows, queries and returns the connection inside the same thread, so a
+    caller waiting for a connection never holds a thread that a borrower needs.
+    """
+
+    def __init__(self, path: str, size: int = DATABASE_POOL_SIZE, busy_timeout: float = DATABASE_BUSY_TIMEOUT):
+        if path == ":memory:":
+            # Connections only share an in-memory database through a named shared cache
+            path = f"file:lia-{uuid.uuid4().hex}?mode=memory&cache=shared"
+        self.path = path
+        self.size = size
+        self._idle: queue.Queue = queue.Queue()
+        for _ in range(size):
+            connection = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False,
+                                         uri=path.startswith("file:"), cached_statements=64)
+            connection.row_factory = sqlite3.Row
+            self._idle.put(connection)
+
+    def run_sync(self, fn, *args):
+        connection = self._idle.get()
+        try:
+            return fn(connection, *args)
+        finally:
+            self._idle.put(connection)
+
+    async def run(self, fn, *args):
+        return await asyncio.to_thread(self.run_sync, fn, *args)
+
+    def close(self) -> None:
+        for _ in range(self.size):
+            self._idle.get().close()
+
+def _row(row: Optional[sqlite3.Row]) -> Optional[Dict]:
+    if row is None:
+        return None
+    return {key: row[key] for key in row.keys() if row[key] is not None}
+
+class SQLCityRepository(CityRepository):
+    """Records in a SQLite database shared by every worker, queried through a connection pool
+
+    The typo-tolerant address indexes live in each process: before every address lookup
+    they take in the rows any worker inserted since the last one (by rowid), so records
+    written by other workers are found too. Exact application addresses are looked up
+    in the database by address_key; lookups by key always go to the database.
+    """
+
+    def __init__(self, path: str = DATABASE_PATH, pool_size: int = DATABASE_POOL_SIZE):
+        super().__init__()
+        self.pool = ConnectionPool(path, pool_size)
+        self.pool.run_sync(self._create_schema)
+        self._indexed_rowids = {"bills": 0, "applications": 0}  # Highest rowid in each address index
+        for table in self._indexed_rowids:
+            self._index_rows(table, self.pool.run_sync(self._query_all, SELECT_NEW_ADDRESSES[table],
+                                                       (self._indexed_rowids[table],)))
+
+    def _index_rows(self, table: str, rows: List[tuple]) -> None:
+        index = self.bill_addresses if table == "bills" else self.application_addresses
+        for rowid, address, key in rows:
+            # A concurrent refresh may have added the row already
+            if rowid > self._indexed_rowids[table]:
+                index.add(address, key)
+                self._indexed_rowids[table] = rowid
+
+    async def _refresh_index(self, table: str) -> None:
+        rows = await self.pool.run(self._query_all, SELECT_NEW_ADDRESSES[table], (self._indexed_rowids[table],))
+        self._index_rows(table, rows)
+
+    async def find_bill(self, address: str) -> Dict:
+        await self._refresh_index("bills")
+        return await super().find_bill(address)
+
+    async def find_application_by_address(self, address: str) -> Dict:
+        application = await self.pool.run(self._query_one, SELECT_APPLICATION_BY_ADDRESS, (canonical_address(address),))
+        if application is not None:
+            app_id = application.pop("app_id")
+            return {"found": True, "data": application, "app_id": app_id}
+        await self._refresh_index("applications")
+        return await super().find_application_by_address(address)
+
+    @staticmethod
+    def _create_schema(connection: sqlite3.Connection) -> None:
+        if not connection.execute("PRAGMA journal_mode").fetchone()[0] == "memory":
+            connection.execute("PRAGMA journal_mode=WAL")  # Readers don't wait for the writer
+        connection.executescript(SCHEMA)
+        # Every worker runs this at import: BEGIN IMMEDIATE takes the write lock before the
+        # emptiness check, so one process seeds while the others wait and then find the rows
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            if connection.execute("SELECT 1 FROM bills LIMIT 1").fetchone() is None:
+                logger.info("Seeding empty city database with demo records")
+                connection.executemany(SEED_STATEMENTS["bills"], [
+                    (address, b["amount"], b["type"], b["due_date"], b["account"]) for address, b in SEED_BILLS.items()
+                ])
+                connection.executemany(SEED_STATEMENTS["tickets"], [
+                    (number, t["amount"], t["type"], t["location"], t["date"]) for number, t in SEED_TICKETS.items()
+                ])
+                connection.executemany(SEED_STATEMENTS["applications"], [
+                    (app_id, a["type"], a["status"], a["address"], canonical_address(a["address"]), a["submitted"],
+                     a.get("date"), a.get("duration"))
+                    for app_id, a in SEED_APPLICATIONS.items()
+                ])
+                connection.executemany(SEED_STATEMENTS["garage_sale_permits"], [
+                    (p["permit_id"], address, canonical_address(address), p["year"], p["date"], p["duration"], p["status"])
+                    for address, permits in SEED_GARAGE_SALE_PERMITS.items() for p in permits
+                ])
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+
+    @staticmethod
+    def _query_one(connection: sqlite3.Connection, sql: str, params: tuple) -> Optional[Dict]:
+        return _row(connection.execute(sql, params).fetchone())
+
+    @staticmethod
+    def _query_all(connection: sqlite3.Connection, sql: str, params: tuple = ()) -> List[tuple]:
+        return [tuple(row) for row in connection.execute(sql, params).fetchall()]
+
+    async def get_bill(self, address: str) -> Optional[Dict]:
+        return await self.pool.run(self._query_one, SELECT_BILL, (address,))
+
+    async def get_ticket(self, ticket_number: str) -> Optional[Dict]:
+        return await self.pool.run(self._query_one, SELECT_TICKET, (ticket_number,))
+
+    async def get_application(self, app_id: str) -> Optional[Dict]:
+        return await self.pool.run(self._query_one, SELECT_APPLICATION, (app_id,))
+
+    async def approved_permits(self, address: str, year: int) -> Tuple[int, List[Dict]]:
+        def query(connection: sqlite3.Connection) -> List[Dict]:
+            rows = connection.execute(SELECT_APPROVED_PERMITS, (canonical_address(address), year)).fetchall()
+            return [_row(row) for row in rows]
+        permits = await self.pool.run(query)
+        return len(permits), permits
+
+    @staticmethod
+    def _insert_permit(connection: sqlite3.Connection, address: str, permit: Dict) -> None:
+        application = permit_application(address, permit)
+        connection.execute(INSERT_PERMIT, (permit["permit_id"], address, canonical_address(address),
+                                           permit["year"], permit["date"], permit["duration"], permit["status"]))
+        connection.execute(INSERT_APPLICATION, (permit["permit_id"], application["type"], application["status"],
+                                                address, canonical_address(address), application["submitted"],
+                                                application["date"], application["duration"]))
+
+    async def add_garage_sale_permit(self, address: str, permit: Dict) -> None:
+        def insert(connection: sqlite3.Connection) -> None:
+            with connection:  # One transaction for the permit and its application
+                self._insert_permit(connection, address, permit)
+        await self.pool.run(insert)
+
+    async def issue_garage_sale_permit(self, address: str, permit: Dict, annual_limit: int) -> Dict:
+        def count_and_insert(connection: sqlite3.Connection) -> List[Dict]:
+            # The write lock is taken before counting: workers issuing for the same address queue up here
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = connection.execute(SELECT_APPROVED_PERMITS, (canonical_address(address), permit["year"])).fetchall()
+                permits = [_row(row) for row in rows]
+                if len(permits) < annual_limit:
+                    self._insert_permit(connection, address, permit)
+                connection.commit()
+            except BaseException:
+                connection.rollback()
+                raise
+            return permits
+        permits = await self.pool.run(count_and_insert)
+        return {"issued": len(permits) < annual_limit, "current_count": len(permits), "existing_permits": permits}
+
+    def issued_ids(self) -> List[str]:
+        rows = self.pool.run_sync(self._query_all, "SELECT permit_id FROM garage_sale_permits "
+                                                    "UNION SELECT app_id FROM applications")
+        return [permit_id for permit_id, in rows]
+
+    async def close(self) -> None:
+        self.pool.close()
+
+def create_city_repository(backend: str = CITY_DATA_BACKEND) -> CityRepository:
+    """Build the repository selected by CITY_DATA_BACKEND"""
+    if backend == "sql":
+        logger.info(f"Using SQLite city database at {DATABASE_PATH}")
+        return SQLCityRepository()
+    if backend != "memory":
+        raise ValueError(f"Unknown CITY_DATA_BACKEND '{backend}' (expected 'memory' or 'sql')")
+    return InMemoryCityRepository()
@@ -0,0 +1,354 @@
+# session_store.py - Session storage backends for LIA
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from conversation_history import ConversationHistory
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")  # "memory" or "redis"
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", 3600))  # Idle time before a session expires
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", 10000))  # Hard cap for the in-process store
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_KEY_PREFIX = os.getenv("REDIS_KEY_PREFIX", "lia:session:")
+SESSION_LOCK_TIMEOUT = float(os.getenv("SESSION_LOCK_TIMEOUT", 10))  # Max seconds a turn may hold a session lock
+SESSION_LOCK_WAIT = float(os.getenv("SESSION_LOCK_WAIT", 5))  # Max seconds to wait for a busy session
+SESSION_LOCK_STRIPES = 256  # Lock stripes for the in-process store
+
+def new_session() -> Dict:
+    """Build an empty conversation session"""
+    return {
+        "intent": None,
+        "step": 0,
+        "context": {},
+        "conversation_history": ConversationHistory(),
+        "failed_attempts": 0,
+        "created_at": datetime.now()
+    }
+
+class SessionStore:
+    """Interface shared by all session storage backends"""
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def save(self, session_id: str, session: Dict) -> None:
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    def values(self) -> Iterator[Dict]:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        raise NotImplementedError
+
+    def lock(self, session_id: str):
+        """Context manager serializing turns of one session (read-modify-write of step/intent/context)"""
+        raise NotImplementedError
+
+    def get_or_create(self, session_id: str) -> Dict:
+        """Return the stored session, creating (and saving) a new one if missing"""
+        session = self.get(session_id)
+        if session is None:
+            session = new_session()
+            self.save(session_id, session)
+        return session
+
+    # Async variants for the chat path; by default the blocking calls run in a worker thread
+
+    async def aget(self, session_id: str) -> Optional[Dict]:
+        return await asyncio.to_thread(self.get, session_id)
+
+    async def asave(self, session_id: str, session: Dict) -> None:
+        await asyncio.to_thread(self.save, session_id, session)
+
+    def alock(self, session_id: str):
+        """Async context manager with the same guarantee as lock()"""
+        return ThreadedLock(self.lock(session_id))
+
+    async def aget_or_create(self, session_id: str) -> Dict:
+        session = await self.aget(session_id)
+        if session is None:
+            session = new_session()
+            await self.asave(session_id, session)
+        return session
+
+class ThreadedLock:
+    """Async context manager around a blocking lock
+
+    Waiters poll acquire(blocking=False) instead of blocking a worker thread, so many
+    waiting turns cannot starve the holder of the thread it needs to release.
+    """
+
+    def __init__(self, lock, wait: float = SESSION_LOCK_WAIT, poll_interval: float = 0.01):
+        self.lock = lock
+        self.wait = wait
+        self.poll_interval = poll_interval
+
+    async def __aenter__(self):
+        deadline = time.monotonic() + self.wait
+        while not await asyncio.to_thread(self.lock.acquire, blocking=False):
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Session is busy (lock not acquired within {self.wait}s)")
+            await asyncio.sleep(self.poll_interval)
+        return self
+
+    async def __aexit__(self, *exc):
+        await asyncio.to_thread(self.lock.release)
+        return False
+
+class InMemorySessionStore(SessionStore):
+    """In-process LRU store with idle expiry and a hard entry cap"""
+
+    def __init__(self, ttl_seconds: int = SESSION_TTL_SECONDS, max_entries: int = SESSION_MAX_ENTRIES,
+                 clock=time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        # session_id -> (session, last_access); ordered from least to most recently used
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Striped per-session locks: bounded memory no matter how many sessions come and go
+        self._session_locks = [threading.Lock() for _ in range(SESSION_LOCK_STRIPES)]
+        # asyncio locks belong to one event loop, so each loop gets its own stripes
+        self._async_locks: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self.hits = 0
+        self.misses = 0
+        self.expired_evictions = 0
+        self.capacity_evictions = 0
+
+    def _purge_expired(self, now: float) -> None:
+        # Least recently used entries sit at the front, so expired ones are always a prefix
+        entries = self._entries
+        while entries:
+            session_id, (_, last_access) = next(iter(entries.items()))
+            if now - last_access < self.ttl_seconds:
+                break
+            del entries[session_id]
+            self.expired_evictions += 1
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        with self._lock:
+            now = self._clock()
+            self._purge_expired(now)
+            entry = self._entries.get(session_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries[session_id] = (entry[0], now)
+            self._entries.move_to_end(session_id)
+            return entry[0]
+
+    def save(self, session_id: str, session: Dict) -> None:
+        with self._lock:
+            self._entries[session_id] = (session, self._clock())
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.capacity_evictions += 1
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def lock(self, session_id: str):
+        return self._session_locks[hash(session_id) % SESSION_LOCK_STRIPES]
+
+    # Dict operations only, so the async variants run inline on the event loop
+
+    async def aget(self, session_id: str) -> Optional[Dict]:
+        return self.get(session_id)
+
+    async def asave(self, session_id: str, session: Dict) -> None:
+        self.save(session_id, session)
+
+    def alock(self, session_id: str):
+        loop = asyncio.get_running_loop()
+        stripes = self._async_locks.get(loop)
+        if stripes is None:
+            stripes = self._async_locks[loop] = [asyncio.Lock() for _ in range(SESSION_LOCK_STRIPES)]
+        return stripes[hash(session_id) % SESSION_LOCK_STRIPES]
+
+    def values(self) -> Iterator[Dict]:
+        with self._lock:
+            self._purge_expired(self._clock())
+            sessions = [session for session, _ in self._entries.values()]
+        return iter(sessions)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._purge_expired(self._clock())
+            return len(self._entries)
+
+    def stats(self) -> Dict:
+        return {
+            "backend": "memory",
+            "size": len(self),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired_evictions": self.expired_evictions,
+            "capacity_evictions": self.capacity_evictions
+        }
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, ConversationHistory):
+        return {"__history__": value.to_dict()}
+    raise TypeError(f"Cannot serialize {type(value).__name__} in session")
+
+def _decode_object(obj: Dict):
+    if "__datetime__" in obj and len(obj) == 1:
+        return datetime.fromisoformat(obj["__datetime__"])
+    if "__history__" in obj and len(obj) == 1:
+        return ConversationHistory.from_dict(obj["__history__"])
+    if isinstance(obj.get("conversation_history"), list):  # Saved before histories were bounded
+        obj["conversation_history"] = ConversationHistory.from_entries(obj["conversation_history"])
+    return obj
+
+class RedisSessionStore(SessionStore):
+    """Redis-backed store; idle expiry uses key TTLs, the hard cap comes from Redis maxmemory policy
+
+    Each save also records the session in a sorted set scored by save time, so the live
+    session count is one ZCOUNT instead of a SCAN over every session key. Works with any
+    client exposing the redis-py API (redis.Redis, fakeredis.FakeRedis, ...).
+    """
+
+    def __init__(self, client, ttl_seconds: int = SESSION_TTL_SECONDS, key_prefix: str = REDIS_KEY_PREFIX,
+                 async_client=None):
+        self.client = client
+        self.async_client = async_client  # redis.asyncio client for the chat path; None = run client calls in threads
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.key_prefix}{session_id}"
+
+    def _active_key(self) -> str:
+        # Outside key_prefix, like the lock keys, so it never shows up in session scans
+        return f"{self.key_prefix.rstrip(':')}-active"
+
+    def _scan_keys(self) -> List:
+        return list(self.client.scan_iter(match=f"{self.key_prefix}*", count=500))
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        raw = self.client.get(self._key(session_id))
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw, object_hook=_decode_object)
+
+    def save(self, session_id: str, session: Dict) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        self._queue_save(pipe, session_id, session)
+        pipe.execute()
+
+    def _queue_save(self, pipe, session_id: str, session: Dict) -> None:
+        now = time.time()
+        # Re-setting the TTL on every write gives sliding idle expiry
+        pipe.set(self._key(session_id), json.dumps(session, default=_encode_value), ex=self.ttl_seconds)
+        pipe.zadd(self._active_key(), {session_id: now})
+        # Members whose session key has expired by now; keeps the set as small as the live sessions
+        pipe.zremrangebyscore(self._active_key(), "-inf", now - self.ttl_seconds)
+
+    def delete(self, session_id: str) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        pipe.delete(self._key(session_id))
+        pipe.zrem(self._active_key(), session_id)
+        pipe.execute()
+
+    def lock(self, session_id: str):
+        # Distributed lock so turns are serialized across every worker process;
+        # the timeout releases it automatically if a worker dies mid-turn.
+        # Lock keys live outside key_prefix so they never show up in session scans.
+        # thread_local=False: ThreadedLock may release from a different thread than it acquired on.
+        return self.client.lock(self._lock_key(session_id), timeout=SESSION_LOCK_TIMEOUT,
+                                blocking_timeout=SESSION_LOCK_WAIT, thread_local=False)
+
+    def _lock_key(self, session_id: str) -> str:
+        return f"{self.key_prefix.rstrip(':')}-lock:{session_id}"
+
+    async def aget(self, session_id: str) -> Optional[Dict]:
+        if self.async_client is None:
+            return await super().aget(session_id)
+        raw = await self.async_client.get(self._key(session_id))
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw, object_hook=_decode_object)
+
+    async def asave(self, session_id: str, session: Dict) -> None:
+        if self.async_client is None:
+            return await super().asave(session_id, session)
+        pipe = self.async_client.pipeline(transaction=False)
+        self._queue_save(pipe, session_id, session)
+        await pipe.execute()
+
+    def alock(self, session_id: str):
+        if self.async_client is None:
+            return super().alock(session_id)
+        return self.async_client.lock(self._lock_key(session_id), timeout=SESSION_LOCK_TIMEOUT,
+                                      blocking_timeout=SESSION_LOCK_WAIT)
+
+    def values(self) -> Iterator[Dict]:
+        keys = self._scan_keys()
+        for start in range(0, len(keys), 500):
+            for raw in self.client.mget(keys[start:start + 500]):
+                if raw is not None:
+                    yield json.loads(raw, object_hook=_decode_object)
+
+    def __len__(self) -> int:
+        # Sessions saved within the TTL; keys Redis evicted early under maxmemory still count until then
+        return self.client.zcount(self._active_key(), time.time() - self.ttl_seconds, "+inf")
+
+    def stats(self) -> Dict:
+        stats = {
+            "backend": "redis",
+            "size": len(self),
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired_evictions": None,
+            "capacity_evictions": None
+        }
+        try:
+            # Server-wide counters: Redis does not track expiries per key prefix
+            info = self.client.info("stats")
+            stats["expired_evictions"] = info.get("expired_keys")
+            stats["capacity_evictions"] = info.get("evicted_keys")
+        except Exception as e:
+            logger.warning(f"Could not read Redis stats: {str(e)}")
+        return stats
+
+def create_session_store(backend: str = SESSION_BACKEND) -> SessionStore:
+    """Build the session store selected by SESSION_BACKEND"""
+    if backend == "redis":
+        import redis  # Optional dependency, only needed for the Redis backend
+        import redis.asyncio
+        client = redis.Redis.from_url(REDIS_URL)
+        logger.info(f"Using Redis session store at {REDIS_URL}")
+        return RedisSessionStore(client, async_client=redis.asyncio.Redis.from_url(REDIS_URL))
+    if backend != "memory":
+        raise ValueError(f"Unknown SESSION_BACKEND '{backend}' (expected 'memory' or 'redis')")
+    return InMemorySessionStore()
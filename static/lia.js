@@ -0,0 +1,361 @@
+class LIAChat {
+    constructor() {
+        this.sessionId = null;
+        this.messagesContainer = document.getElementById('chatMessages');
+        this.chatForm = document.getElementById('chatForm');
+        this.chatInput = document.getElementById('chatInput');
+        this.sendButton = document.getElementById('sendButton');
+        this.typingIndicator = document.getElementById('typingIndicator');
+        this.isLoading = false;
+        this.socket = null;
+        this.pendingTurn = null;  // { resolve, reject } for the turn sent over the socket
+        this.replyDiv = null;     // Bot message being streamed
+        this.replyText = '';
+        this.followUpPending = false;  // The socket owes us a pushed follow-up
+
+        this.init();
+    }
+
+    init() {
+        this.chatForm.addEventListener('submit', (e) => this.handleSubmit(e));
+
+        // Handle textarea auto-resize and enter key
+        this.chatInput.addEventListener('input', () => this.autoResize());
+        this.chatInput.addEventListener('keydown', (e) => {
+            if (e.key === 'Enter' && !e.shiftKey) {
+                e.preventDefault();
+                if (!this.isLoading) {
+                    this.handleSubmit(e);
+                }
+            }
+        });
+
+        // Auto-focus input
+        this.chatInput.focus();
+
+        // One persistent connection for all turns; falls back to /chat/stream when unavailable
+        this.connectSocket();
+
+        // Handle visibility change to reconnect if needed
+        document.addEventListener('visibilitychange', () => {
+            if (!document.hidden && this.isLoading) {
+                // Reset if page was hidden during a request
+                setTimeout(() => {
+                    if (this.isLoading) {
+                        this.setLoading(false);
+                    }
+                }, 5000);
+            }
+        });
+    }
+
+    autoResize() {
+        const input = this.chatInput;
+        input.style.height = 'auto';
+        input.style.height = Math.min(input.scrollHeight, 120) + 'px';
+    }
+
+    async handleSubmit(e) {
+        e.preventDefault();
+        const message = this.chatInput.value.trim();
+        if (!message || this.isLoading) return;
+
+        this.addMessage(message, 'user');
+        this.chatInput.value = '';
+        this.chatInput.style.height = 'auto';
+        this.setLoading(true);
+
+        try {
+            await this.sendTurn(message);
+        } catch (error) {
+            console.error('Chat error:', error);
+            this.setLoading(false);
+            this.addMessage(
+                "I'm sorry, I'm having trouble connecting right now. This could be due to network issues or server maintenance. Please try again in a moment, or contact our support team directly at (555) 123-CITY if the problem persists.",
+                'bot',
+                null,
+                true
+            );
+        }
+    }
+
+    async handleAutoContinue() {
+        // Auto-continue for payment processing simulation (HTTP fallback; the socket gets it pushed)
+        this.setLoading(true);
+
+        try {
+            await this.streamReply("continue_payment"); // Special message to trigger next step
+        } catch (error) {
+            console.error('Auto-continue error:', error);
+            this.setLoading(false);
+            this.addMessage(
+                "Payment processing completed! Your bill has been paid successfully.",
+                'bot'
+            );
+        }
+    }
+
+    connectSocket() {
+        if (!('WebSocket' in window)) return;
+
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        const query = this.sessionId ? `?session_id=${encodeURIComponent(this.sessionId)}` : '';
+        const socket = new WebSocket(`${protocol}//${window.location.host}/ws/chat${query}`);
+
+        socket.addEventListener('open', () => {
+            this.socket = socket;
+        });
+        socket.addEventListener('message', (e) => {
+            const event = JSON.parse(e.data);
+            this.handleEvent(event.type, event);
+        });
+        socket.addEventListener('close', () => {
+            this.socket = null;
+            if (this.pendingTurn) {
+                this.pendingTurn.reject(new Error('Connection closed'));
+                this.pendingTurn = null;
+            }
+            if (this.followUpPending) {
+                // The push was lost with the socket; the server still finishes the step and
+                // repeats its reply to continue_payment, so fetch it over HTTP
+                this.followUpPending = false;
+                if (this.replyDiv) {
+                    this.replyDiv.remove();
+                    this.replyDiv = null;
+                    this.replyText = '';
+                }
+                this.handleAutoContinue();
+            }
+            // Reconnect with the same session; turns use HTTP until then
+            setTimeout(() => this.connectSocket(), 3000);
+        });
+    }
+
+    sendTurn(message) {
+        if (!this.socket || this.socket.readyState !== WebSocket.OPEN) {
+            return this.streamReply(message);
+        }
+        return new Promise((resolve, reject) => {
+            this.pendingTurn = { resolve, reject };
+            this.socket.send(JSON.stringify({ message: message }));
+        });
+    }
+
+    async streamReply(message) {
+        // Render the reply chunk by chunk as /chat/stream sends it
+        const response = await fetch('/chat/stream', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                message: message,
+                session_id: this.sessionId
+            })
+        });
+
+        if (!response.ok || !response.body) {
+            throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            // Events are separated by a blank line; keep any partial event for the next read
+            const events = buffer.split('\n\n');
+            buffer = events.pop();
+
+            for (const raw of events) {
+                const event = this.parseEvent(raw);
+                this.handleEvent(event.type, event.data);
+                if (event.type === 'done') return;
+            }
+        }
+
+        throw new Error('Stream ended before the reply was complete');
+    }
+
+    handleEvent(type, data) {
+        // Shared by the WebSocket and /chat/stream: session/start, chunk..., done
+        if (type === 'session' || type === 'start') {
+            this.sessionId = data.session_id;
+        } else if (type === 'chunk') {
+            if (!this.replyDiv) {
+                this.typingIndicator.style.display = 'none';
+                this.replyDiv = this.addMessage('', 'bot');
+            }
+            this.replyText += data.text;
+            this.replyDiv.innerHTML = this.formatBotMessage(this.replyText);
+            this.scrollToBottom();
+        } else if (type === 'done') {
+            this.sessionId = data.session_id;
+            this.replyDiv = null;
+            this.replyText = '';
+            this.addMessageExtras(data.options, data.needs_escalation);
+
+            // Over the socket the server pushes the follow-up (payment completion) itself
+            this.followUpPending = Boolean(data.follow_up);
+            this.setLoading(this.followUpPending);
+
+            // Over HTTP the client asks for it after the delay
+            if (data.auto_continue_delay) {
+                setTimeout(() => {
+                    this.handleAutoContinue();
+                }, data.auto_continue_delay);
+            }
+
+            if (this.pendingTurn) {
+                this.pendingTurn.resolve();
+                this.pendingTurn = null;
+            }
+        }
+    }
+
+    parseEvent(raw) {
+        const event = { type: 'message', data: null };
+        raw.split('\n').forEach(line => {
+            if (line.startsWith('event: ')) {
+                event.type = line.slice(7);
+            } else if (line.startsWith('data: ')) {
+                event.data = JSON.parse(line.slice(6));
+            }
+        });
+        return event;
+    }
+
+    addMessage(content, sender, options = null, needsEscalation = false) {
+        const messageDiv = document.createElement('div');
+        messageDiv.className = `message ${sender}-message`;
+
+        // Format content with better line breaks and emphasis
+        if (sender === 'bot') {
+            messageDiv.innerHTML = this.formatBotMessage(content);
+        } else {
+            messageDiv.textContent = content;
+        }
+
+        this.messagesContainer.appendChild(messageDiv);
+
+        if (sender === 'bot') {
+            this.addMessageExtras(options, needsEscalation);
+        }
+
+        this.scrollToBottom();
+        return messageDiv;
+    }
+
+    addMessageExtras(options, needsEscalation) {
+        if (options && options.length > 0) {
+            setTimeout(() => this.addOptions(options), 300);
+        }
+
+        if (needsEscalation) {
+            setTimeout(() => this.addEscalationNotice(), 500);
+        }
+    }
+
+    formatBotMessage(content) {
+        // Simple formatting for better readability
+        return content
+            .replace(/\*\*(.*?)\*\*/g, '<strong>$1</strong>')
+            .replace(/\n\n/g, '<br><br>')
+            .replace(/\n/g, '<br>')
+            .replace(/•/g, '•');
+    }
+
+    addOptions(options) {
+        const optionsContainer = document.createElement('div');
+        optionsContainer.className = 'options-container';
+
+        options.forEach((option, index) => {
+            const optionButton = document.createElement('button');
+            optionButton.className = 'option-button';
+            optionButton.textContent = option;
+            optionButton.style.animationDelay = `${index * 100}ms`;
+
+            optionButton.addEventListener('click', () => {
+                if (!this.isLoading) {
+                    this.chatInput.value = option;
+                    this.autoResize();
+                    this.chatInput.focus();
+
+                    // Auto-submit after a short delay
+                    setTimeout(() => {
+                        if (!this.isLoading) {
+                            this.handleSubmit(new Event('submit'));
+                        }
+                    }, 200);
+                }
+            });
+
+            optionsContainer.appendChild(optionButton);
+        });
+
+        this.messagesContainer.appendChild(optionsContainer);
+        this.scrollToBottom();
+    }
+
+    addEscalationNotice() {
+        const escalationDiv = document.createElement('div');
+        escalationDiv.className = 'escalation-notice';
+        escalationDiv.innerHTML = `
+            <strong>🤝 Connecting you to human support</strong><br>
+            A customer service representative will be with you shortly. Please hold on while we transfer your conversation.
+        `;
+        this.messagesContainer.appendChild(escalationDiv);
+        this.scrollToBottom();
+    }
+
+    setLoading(loading) {
+        this.isLoading = loading;
+        this.sendButton.disabled = loading;
+        this.chatInput.disabled = loading;
+
+        if (loading) {
+            this.typingIndicator.style.display = 'block';
+            this.chatInput.placeholder = "LIA is thinking...";
+            this.scrollToBottom();
+        } else {
+            this.typingIndicator.style.display = 'none';
+            this.chatInput.placeholder = "Type your message here...";
+            this.chatInput.focus();
+        }
+    }
+
+    scrollToBottom() {
+        setTimeout(() => {
+            const container = this.messagesContainer;
+            container.scrollTop = container.scrollHeight;
+        }, 100);
+    }
+}
+
+// Global function for quick actions
+function sendQuickMessage(message) {
+    const chat = window.liaChat;
+    if (chat && !chat.isLoading) {
+        chat.chatInput.value = message;
+        chat.autoResize();
+        chat.handleSubmit(new Event('submit'));
+    }
+}
+
+// Initialize chat when page loads
+document.addEventListener('DOMContentLoaded', () => {
+    window.liaChat = new LIAChat();
+});
+
+// Add service worker for offline support (optional)
+if ('serviceWorker' in navigator) {
+    window.addEventListener('load', () => {
+        navigator.serviceWorker.register('/sw.js').catch(() => {
+            // Service worker registration failed - ignore silently
+        });
+    });
+}
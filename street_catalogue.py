@@ -0,0 +1,58 @@
+# street_catalogue.py - Street catalogue with token-boundary matching for city address validation
+from typing import Dict, Iterable, List, Optional
+
+from address_index import tokenize_address
+
+_TERMINAL = ""  # Trie key marking the end of a street name (never a real token)
+
+class StreetCatalogue:
+    """Token trie of canonical street names
+
+    Matching walks the trie from each token of the address, so the cost grows with the
+    address length, not the catalogue size, and only whole tokens match: "domain street"
+    does not contain "main street".
+    """
+
+    def __init__(self, streets: Iterable[str] = ()):
+        self._trie: Dict = {}
+        self.streets: List[str] = []  # Canonical names, in insertion order
+        for street in streets:
+            self.add(street)
+
+    @classmethod
+    def from_file(cls, path: str) -> "StreetCatalogue":
+        """Load one street name per line; blank lines and '#' comments are ignored"""
+        with open(path, encoding="utf-8") as f:
+            return cls(line.strip() for line in f if line.strip() and not line.lstrip().startswith("#"))
+
+    def add(self, street: str) -> None:
+        tokens = [token for token, _ in tokenize_address(street)]
+        if not tokens:
+            return
+        node = self._trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        if _TERMINAL not in node:
+            node[_TERMINAL] = " ".join(tokens)
+            self.streets.append(node[_TERMINAL])
+
+    def find_street(self, address: str) -> Optional[str]:
+        """Return the canonical catalogue street contained in the address (longest match), or None"""
+        tokens = [token for token, _ in tokenize_address(address)]
+        best = None
+        for start in range(len(tokens)):
+            node = self._trie
+            for token in tokens[start:]:
+                node = node.get(token)
+                if node is None:
+                    break
+                street = node.get(_TERMINAL)
+                if street is not None and (best is None or len(street) > len(best)):
+                    best = street
+        return best
+
+    def __len__(self) -> int:
+        return len(self.streets)
+
+    def __contains__(self, address: str) -> bool:
+        return self.find_street(address) is not None
@@ -0,0 +1,6 @@
+# tests/conftest.py - Shared setup: import the application modules from the repository root
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("INTERACTION_LOG_PATH", os.devnull)
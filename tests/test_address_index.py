@@ -0,0 +1,61 @@
+# tests/test_address_index.py - Canonical tokenization, ranked address lookup and typo tolerance
+import pytest
+
+from address_index import AddressIndex, TypoIndex, allowed_typos, canonical_address, tokenize_address, typo_distance
+
+ADDRESSES = ["123 Main St", "500 Main St", "456 Olive Ave", "789 Pine Rd", "101 Oak Street"]
+
+@pytest.fixture
+def index():
+    addresses = AddressIndex()
+    for address in ADDRESSES:
+        addresses.add(address, address.lower())
+    return addresses
+
+@pytest.mark.parametrize("spelling", ["123 Main Street", "123 main st.", "123 MAIN ST", "123 Main St Apt 4"])
+def test_spellings_share_a_canonical_form(spelling):
+    assert canonical_address(spelling) == "123 main st"
+
+def test_tokens_are_typed():
+    assert tokenize_address("123 North First Avenue") == [("123", "number"), ("n", "suffix"), ("1st", "name"),
+                                                         ("ave", "suffix")]
+
+def test_full_address_ranks_first(index):
+    matches = index.search("123 Main Street")
+    assert [match["record"] for match in matches] == ["123 main st", "500 main st"]
+    assert matches[0]["match"] == 1.0
+    assert matches[1]["match"] == 0.5  # Same street, other house number
+
+def test_street_name_alone_matches_every_house(index):
+    assert {match["address"] for match in index.search("main")} == {"123 Main St", "500 Main St"}
+
+def test_limit_and_no_match(index):
+    assert len(index.search("main", limit=1)) == 1
+    assert index.search("nothing here") == []
+    assert len(index) == len(ADDRESSES)
+
+# Typo tolerance
+
+@pytest.mark.parametrize("a, b, typos", [("main", "main", 0), ("mian", "main", 1), ("olvie", "olive", 1),
+                                          ("pne", "pine", 1), ("elmwod", "elmwood", 1), ("oak", "elm", 3)])
+def test_typo_distance_counts_swaps_once(a, b, typos):
+    assert typo_distance(a, b) == typos
+
+def test_typo_index_finds_words_within_the_budget():
+    words = TypoIndex(["main", "olive", "pine", "elmwood", "elmhurst"])
+    assert words.closest("olvie", 1) == [("olive", 1)]
+    assert words.closest("elmwod", 2) == [("elmwood", 1)]
+    assert words.closest("zzzz", 2) == []
+
+def test_allowed_typos_grow_with_token_length():
+    assert [allowed_typos(word) for word in ("oak", "pine", "elmwood")] == [0, 1, 2]
+
+def test_fuzzy_search_corrects_street_names_and_suffixes(index):
+    assert index.search("olvie ave") == []
+    match = index.fuzzy_search("456 olvie avenu")[0]
+    assert match["record"] == "456 olive ave"
+    assert 0 < match["match"] < 1.0  # Corrected tokens count as partial matches
+
+def test_short_tokens_must_match_exactly(index):
+    assert index.fuzzy_search("oka") == []  # Three letters: no typo allowed
+    assert index.fuzzy_search("oak")[0]["record"] == "101 oak street"
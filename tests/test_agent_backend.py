@@ -0,0 +1,61 @@
+# tests/test_agent_backend.py - Orchestrator routing, speculation alongside LLM intent detection, failure replies
+import asyncio
+
+import pytest
+
+from backend import lia_agent_backend as agents
+from llm_intent import LLMIntentClassifier
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def llm_intent_agent(intent: str, delay: float = 0.05) -> agents.LLMIntentAgent:
+    """LLMIntentAgent whose model call takes `delay` seconds and answers `intent`"""
+    classifier = LLMIntentClassifier()
+    async def model(message, conversation_history):
+        await asyncio.sleep(delay)
+        return {"intent": intent, "confidence": 0.9, "entities": {}, "needs_clarification": False}
+    classifier._detect_within_deadline = model
+    return agents.LLMIntentAgent(classifier)
+
+def test_keyword_routing_does_not_speculate():
+    orchestrator = agents.LIAOrchestrator()
+    result = run(orchestrator.run("I want to pay my bill", {"address": "456 Olive Ave"}, likely_intent="pay_bill"))
+    assert result["intent"] == "pay_bill" and "$82.35" in result["response"]
+    assert [timing["speculative"] for timing in result["agents"]] == [False, False]
+
+def test_llm_intent_agent_is_used_when_configured(monkeypatch):
+    monkeypatch.setattr(agents, "create_llm_intent_classifier", lambda: LLMIntentClassifier())
+    agent = agents.create_intent_agent()
+    assert isinstance(agent, agents.LLMIntentAgent) and agent.awaits_io
+    assert agent.timeout > agent.classifier.deadline
+    monkeypatch.setattr(agents, "create_llm_intent_classifier", lambda: None)
+    assert not agents.create_intent_agent().awaits_io
+
+def test_correct_guess_reuses_the_speculative_agent():
+    orchestrator = agents.LIAOrchestrator(llm_intent_agent("pay_bill"))
+    result = run(orchestrator.run("my bill please", {"address": "456 Olive Ave"}, likely_intent="pay_bill"))
+    assert "$82.35" in result["response"]
+    assert sorted((timing["agent"], timing["speculative"]) for timing in result["agents"]) == [
+        ("Bill Agent", True), ("Intent Agent", False)]  # No second, confirmed Bill Agent call
+
+def test_wrong_guess_is_cancelled(monkeypatch):
+    monkeypatch.setattr(agents, "AGENT_LATENCY", 1.0)  # The speculative lookup is still running
+    orchestrator = agents.LIAOrchestrator(llm_intent_agent("report_issue"))
+    result = run(orchestrator.run("there is a pothole", {"address": "456 Olive Ave"}, likely_intent="pay_bill"))
+    assert result["response"] == agents.UNKNOWN_REPLY
+    guess = next(timing for timing in result["agents"] if timing["speculative"])
+    assert guess["agent"] == "Bill Agent" and guess["status"] == "cancelled"
+
+@pytest.mark.parametrize("failure, reply", [("timeout", agents.TIMEOUT_REPLY), ("error", agents.ERROR_REPLY)])
+def test_failed_intent_detection_explains_itself(failure, reply):
+    class FailingIntentAgent(agents.IntentAgent):
+        timeout = 0.05
+        async def ahandle(self, input_text, context):
+            if failure == "timeout":
+                await asyncio.sleep(1)
+            raise RuntimeError("intent service unavailable")
+    orchestrator = agents.LIAOrchestrator(FailingIntentAgent())
+    result = run(orchestrator.run("pay my bill", {}))
+    assert result["response"] == reply and result["intent"] == "unknown"
+    assert result["agents"][0]["status"] == failure
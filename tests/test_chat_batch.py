@@ -0,0 +1,38 @@
+# tests/test_chat_batch.py - /chat/batch ordering, session handling and limits
+import asyncio
+
+import httpx
+
+import main
+
+def post(path, payload):
+    async def send():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(path, json=payload)
+    return asyncio.run(send())
+
+def test_results_follow_request_order():
+    messages = [
+        {"session_id": "batch-a", "message": "I want to pay my bill"},
+        {"session_id": "batch-b", "message": "hello"},
+        {"session_id": "batch-a", "message": "123 Main Street"},
+    ]
+    results = post("/chat/batch", {"messages": messages}).json()["results"]
+    assert [result["session_id"] for result in results] == ["batch-a", "batch-b", "batch-a"]
+    assert results[0]["intent"] == results[2]["intent"] == "pay_bill"
+    assert "WAT-001234" in results[2]["reply"]  # Second turn of batch-a saw the first
+
+def test_batch_replies_match_single_turns():
+    turns = ["I want to pay my bill", "123 Main Street"]
+    single = [post("/chat", {"session_id": "single-c", "message": turn}).json()["reply"] for turn in turns]
+    batch = post("/chat/batch", {"messages": [{"session_id": "batch-c", "message": turn} for turn in turns]})
+    assert [result["reply"] for result in batch.json()["results"]] == single
+
+def test_messages_without_a_session_start_their_own():
+    results = post("/chat/batch", {"messages": [{"message": "hello"}, {"message": "hello"}]}).json()["results"]
+    assert results[0]["session_id"] != results[1]["session_id"]
+
+def test_oversized_batch_is_rejected():
+    messages = [{"message": "hello"}] * (main.CHAT_BATCH_MAX_MESSAGES + 1)
+    assert post("/chat/batch", {"messages": messages}).status_code == 413
@@ -0,0 +1,52 @@
+# tests/test_chat_socket.py - /ws/chat turns and the payment follow-up when the socket closes early
+import time
+
+from starlette.testclient import TestClient
+
+import main
+
+PAY_TURNS = ["I want to pay my bill", "123 Main Street", "Yes, pay now"]
+
+def receive_turn(socket) -> dict:
+    """Collect chunk events up to the turn's done event"""
+    text = ""
+    while True:
+        event = socket.receive_json()
+        if event["type"] == "done":
+            return dict(event, reply=text)
+        text += event["text"]
+
+def wait_for_step(session_id: str, step: int, timeout: float) -> dict:
+    """The socket handler finishes after the test client has let go of the socket"""
+    deadline = time.monotonic() + timeout
+    while main.session_store.get(session_id)["step"] != step and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return main.session_store.get(session_id)
+
+def test_follow_up_is_pushed():
+    with TestClient(main.app) as client, client.websocket_connect("/ws/chat?session_id=ws-push") as socket:
+        assert socket.receive_json() == {"type": "session", "session_id": "ws-push"}
+        for turn in PAY_TURNS:
+            socket.send_json({"message": turn})
+            done = receive_turn(socket)
+        assert done["follow_up"]
+        assert "Payment Successful" in receive_turn(socket)["reply"]  # Pushed without a message from us
+
+def test_disconnect_during_follow_up_finishes_the_step():
+    with TestClient(main.app) as client:
+        with client.websocket_connect("/ws/chat?session_id=ws-drop") as socket:
+            socket.receive_json()
+            for turn in PAY_TURNS:
+                socket.send_json({"message": turn})
+                done = receive_turn(socket)
+            assert done["follow_up"]
+        # Closed before the push: the server runs the step right away instead of waiting out the delay
+        session = wait_for_step("ws-drop", 0, timeout=1.0)
+        assert session["step"] == 0 and "Payment Successful" in session["follow_up"]["reply"]
+        history = [turn.text for turn in session["conversation_history"].window(20)]
+        # The client's HTTP fallback gets the same reply without paying twice
+        replies = [client.post("/chat", json={"session_id": "ws-drop", "message": main.FOLLOW_UP_MESSAGE}).json()
+                   for _ in range(2)]
+        assert replies[0] == replies[1]
+        assert "Payment Successful" in replies[0]["reply"] and "Download receipt" in replies[0]["options"]
+        assert [turn.text for turn in main.session_store.get("ws-drop")["conversation_history"].window(20)] == history
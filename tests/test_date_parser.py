@@ -0,0 +1,59 @@
+# tests/test_date_parser.py - Date phrases users type, and the garage sale date rules built on them
+from datetime import date, timedelta
+
+import pytest
+
+import main
+from date_parser import normalize_date_phrase, parse_date_phrase
+
+TODAY = date(2026, 6, 3)  # A Wednesday
+
+@pytest.mark.parametrize("text, start, end", [
+    ("June 8", date(2026, 6, 8), date(2026, 6, 8)),
+    ("On June 8th, 2026 through the 9th", date(2026, 6, 8), date(2026, 6, 9)),
+    ("8-9 June", date(2026, 6, 8), date(2026, 6, 9)),
+    ("6/8/26", date(2026, 6, 8), date(2026, 6, 8)),
+    ("2026-06-08", date(2026, 6, 8), date(2026, 6, 8)),
+    ("tomorrow", date(2026, 6, 4), date(2026, 6, 4)),
+    ("next saturday", date(2026, 6, 6), date(2026, 6, 6)),
+    ("this weekend", date(2026, 6, 6), date(2026, 6, 7)),
+    ("in two weeks", date(2026, 6, 17), date(2026, 6, 17)),
+    ("Dec 31 - Jan 1", date(2026, 12, 31), date(2027, 1, 1)),
+])
+def test_parses_phrases(text, start, end):
+    parsed = parse_date_phrase(text, TODAY)
+    assert (parsed["start"], parsed["end"]) == (start, end)
+    assert parsed["days"] == (end - start).days + 1
+
+def test_month_without_year_picks_the_nearer_year():
+    assert parse_date_phrase("Jan 5", date(2026, 12, 20))["start"] == date(2027, 1, 5)
+    assert parse_date_phrase("Jun 1", TODAY)["start"] == date(2026, 6, 1)
+
+@pytest.mark.parametrize("text", [
+    "feb 30", "13/45", "in 99999999 days", "in 99999999 weeks",
+    "nov 20 2027 - nov 1 2026", "hello", ""
+])
+def test_rejects_impossible_dates(text):
+    assert parse_date_phrase(text, TODAY) is None
+
+def test_normalization():
+    assert normalize_date_phrase("On June 8th, 2026 through the 9th") == "june 8 2026-9"
+
+def days_from_now(days: int) -> str:
+    return (date.today() + timedelta(days=days)).isoformat()
+
+@pytest.mark.parametrize("text, valid", [
+    ("tomorrow", True),
+    ("yesterday", False),
+    (days_from_now(30), True),
+    (days_from_now(31), False),
+    ("in 99999999 days", False),
+    ("nov 20 2027 - nov 1 2026", False),
+])
+def test_garage_sale_date_window(text, valid):
+    assert main.validate_garage_sale_date(text)["valid"] is valid
+
+def test_garage_sale_range_is_at_most_three_days():
+    start, end = date.today() + timedelta(days=2), date.today() + timedelta(days=5)
+    result = main.validate_garage_sale_date(f"{start:%m/%d/%Y} - {end:%m/%d/%Y}")
+    assert not result["valid"] and "3 consecutive days" in result["error"]
@@ -0,0 +1,69 @@
+# tests/test_flow_engine.py - Smoke tests for reply templates and flow transitions
+import asyncio
+
+import pytest
+
+from flow_engine import END, FlowEngine, Step, Template, Transition
+from session_store import new_session
+
+def test_template_fields_specs_and_conversions():
+    template = Template("{bill.type!t} bill for {address}: ${bill.amount:.2f} {{paid}}")
+    rendered = template.render({"address": "123 Main St"}, {"bill": {"type": "water", "amount": 82.35}})
+    assert rendered == "Water bill for 123 Main St: $82.35 {paid}"
+
+def test_template_prefers_turn_values_over_context():
+    assert Template("{input}").render({"input": "from values"}, {"input": "from context"}) == "from values"
+
+def test_static_template():
+    assert Template("Hello {{there}}").render({}, {}) == "Hello {there}"
+
+@pytest.mark.parametrize("text", ["{bill[0]}", "{x!z}", "{x:{width}}"])
+def test_template_rejects_unsupported_fields(text):
+    with pytest.raises(ValueError):
+        Template(text)
+
+def test_template_missing_field_raises():
+    with pytest.raises(KeyError):
+        Template("{missing}").render({}, {})
+
+async def pick_color(session, user_input, values):
+    if user_input in ("red", "blue"):
+        session["context"]["color"] = user_input
+        return "chosen"
+    values["choices"] = ["red", "blue"]
+    return "unknown"
+
+def color_flow() -> FlowEngine:
+    engine = FlowEngine()
+    engine.register("color", {
+        1: Step(Transition("Which color?", goto=2)),
+        2: Step({
+            "chosen": Transition("You picked {color!u}.", goto=END),
+            "unknown": Transition("'{input}' is not a color.", options_from="choices", options=["Cancel"])
+        }, validate=pick_color)
+    })
+    return engine
+
+def test_flow_runs_to_end():
+    engine = color_flow()
+    session = new_session()
+    async def run():
+        first = await engine.starter("color")(session, "colors please")
+        retry = await engine.advance(session, "green")
+        done = await engine.advance(session, "blue")
+        return first, retry, done
+    first, retry, done = asyncio.run(run())
+    assert first["response"] == "Which color?"
+    assert retry == {"response": "'green' is not a color.", "needs_escalation": False, "options": ["red", "blue", "Cancel"]}
+    assert done["response"] == "You picked BLUE."
+    assert session["step"] == 0 and session["intent"] is None
+    assert "color" in engine
+
+def test_register_rejects_broken_flows():
+    engine = FlowEngine()
+    with pytest.raises(ValueError):
+        engine.register("no_start", {2: Step(Transition("hi"))})
+    with pytest.raises(ValueError):
+        engine.register("dangling", {1: Step(Transition("hi", goto=3))})
+    with pytest.raises(ValueError):
+        engine.register("no_validator", {1: Step({"yes": Transition("hi")})})
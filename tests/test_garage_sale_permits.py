@@ -0,0 +1,28 @@
+# tests/test_garage_sale_permits.py - The annual garage sale limit holds for sequential and concurrent requests
+import asyncio
+
+import httpx
+
+import main
+
+def chat_batch(messages):
+    async def post():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/chat/batch", json={"messages": messages})
+            return [result["reply"] for result in response.json()["results"]]
+    return asyncio.run(post())
+
+def apply_for(sessions, address):
+    messages = [{"session_id": session, "message": "I need a garage sale permit"} for session in sessions]
+    messages += [{"session_id": session, "message": address} for session in sessions]
+    return chat_batch(messages)[len(sessions):]
+
+def test_concurrent_sessions_cannot_exceed_the_limit():
+    replies = apply_for([f"race-{number}" for number in range(4)], "900 Maple Avenue")
+    assert sum("Submitted Successfully" in reply for reply in replies) == main.GARAGE_SALE_ANNUAL_LIMIT
+    assert sum("Annual Limit Reached" in reply for reply in replies) == 4 - main.GARAGE_SALE_ANNUAL_LIMIT
+
+def test_sequential_requests_refuse_the_third_permit():
+    replies = [apply_for([f"seq-{number}"], "901 Maple Avenue")[0] for number in range(3)]
+    assert ["Submitted Successfully" in reply for reply in replies] == [True, True, False]
@@ -0,0 +1,43 @@
+# tests/test_id_allocator.py - Unique, increasing IDs from the in-memory and Redis sequence stores
+import fakeredis
+import pytest
+
+from benchmarks.stress_id_allocator import allocate_threaded
+from id_allocator import IdAllocator, InMemorySequenceStore, RedisSequenceStore, create_id_allocator
+
+@pytest.fixture(params=["memory", "redis"])
+def make_store(request):
+    """Factory for stores; Redis stores built by one factory share a server, like workers do"""
+    if request.param == "memory":
+        store = InMemorySequenceStore()
+        return lambda: store
+    server = fakeredis.FakeServer()
+    return lambda: RedisSequenceStore(fakeredis.FakeRedis(server=server))
+
+def test_sequences_are_independent(make_store):
+    allocator = IdAllocator(make_store())
+    assert [allocator.next("permit") for _ in range(3)] == [1, 2, 3]
+    assert allocator.next("application") == 1
+
+def test_seed_only_moves_forward(make_store):
+    allocator = IdAllocator(make_store())
+    allocator.seed("permit", 45)
+    assert allocator.next("permit") == 46
+    allocator.seed("permit", 10)  # A later worker starting up with the seed data
+    assert allocator.next("permit") == 47
+
+def test_blocks_are_split_between_allocators(make_store):
+    first, second = IdAllocator(make_store(), block_size=10), IdAllocator(make_store(), block_size=10)
+    assert [first.next("permit") for _ in range(3)] == [1, 2, 3]
+    assert second.next("permit") == 11
+    assert [first.next("permit") for _ in range(8)] == [4, 5, 6, 7, 8, 9, 10, 21]
+
+@pytest.mark.parametrize("block_size", [1, 16])
+def test_no_duplicates_across_threads(make_store, block_size):
+    allocator = IdAllocator(make_store(), block_size=block_size)
+    values, _ = allocate_threaded(allocator, "permit", threads=8, per_thread=200)
+    assert len(set(values)) == len(values) == 1600
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="ID_BACKEND"):
+        create_id_allocator("sqlite")
@@ -0,0 +1,93 @@
+# tests/test_intent_cache.py - Intent cache tiers, expiry, eviction and conversation context
+import asyncio
+import json
+
+import httpx
+
+import main
+from conversation_history import ConversationHistory
+from intent_cache import IntentCache, normalize_message
+from llm_intent import LLMIntentClassifier
+
+PAY_BILL = {"intent": "pay_bill", "confidence": 0.9, "entities": {}, "needs_clarification": False}
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_normalization():
+    assert normalize_message("  Yes, pay NOW!  ") == "yes pay now"
+
+def test_exact_hits_ignore_case_and_punctuation():
+    cache = IntentCache()
+    cache.put("I want to pay my bill", PAY_BILL)
+    assert cache.get("i want to pay my bill!!") == PAY_BILL
+    assert cache.get("I want to pay my bills") is None
+    assert cache.stats()["exact_hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_hits_are_copies():
+    cache = IntentCache()
+    cache.put("garage sale", dict(PAY_BILL, entities={"permit_type": "garage_sale"}))
+    cache.get("garage sale")["entities"]["date"] = "2026-06-08"
+    assert cache.get("garage sale")["entities"] == {"permit_type": "garage_sale"}
+
+def test_context_separates_entries():
+    cache = IntentCache()
+    cache.put("yes", PAY_BILL, context="pay_bill:3")
+    assert cache.get("yes", context="pay_bill:3") == PAY_BILL
+    assert cache.get("yes", context="apply_permit:2") is None
+    assert cache.get("yes") is None
+
+def test_entries_expire():
+    clock = FakeClock()
+    cache = IntentCache(ttl_seconds=10, clock=clock)
+    cache.put("pay my bill", PAY_BILL)
+    clock.now = 10
+    assert cache.get("pay my bill") is None
+    assert cache.stats()["expirations"] == 1 and cache.stats()["size"] == 0
+
+def test_least_recently_used_is_evicted():
+    cache = IntentCache(max_size=2)
+    cache.put("one", PAY_BILL)
+    cache.put("two", PAY_BILL)
+    cache.get("one")
+    cache.put("three", PAY_BILL)
+    assert cache.get("two") is None and cache.get("one") == PAY_BILL
+    assert cache.stats()["evictions"] == 1
+
+def test_near_duplicates_stay_within_their_context():
+    cache = IntentCache(fuzzy=True, similarity=0.8)
+    cache.put("my water bill is too high this month", PAY_BILL, context="a")
+    assert cache.get("my water bill is too high this month!", context="a") == PAY_BILL  # Exact after normalizing
+    assert cache.get("my water bil is too high this month", context="a") == PAY_BILL
+    assert cache.get("my water bil is too high this month", context="b") is None
+    assert cache.stats()["near_hits"] == 1
+    cache.put("my water bill is too high this month", PAY_BILL, context="a")  # Replacing keeps postings consistent
+    cache._remove(("a", "my water bill is too high this month"))
+    assert cache._postings == {}
+
+def test_classifier_keys_on_the_reply_being_answered():
+    calls = []
+    def handler(request):
+        calls.append(request)
+        content = json.dumps({"intent": "pay_bill", "confidence": 0.9})
+        return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+    classifier = LLMIntentClassifier(cache=IntentCache())
+    classifier._client = httpx.AsyncClient(base_url="http://llm.test", transport=httpx.MockTransport(handler))
+    after_bill, after_permit = ConversationHistory(), ConversationHistory()
+    after_bill.append("bot", "Would you like to pay another bill?")
+    after_permit.append("bot", "Would you like to apply for another permit?")
+    async def detect_all():
+        for history in (after_bill, after_bill, after_permit, None, None):
+            await classifier.detect("sure, another one", history, "None:0")
+    asyncio.run(detect_all())
+    assert len(calls) == 3  # One model call per distinct previous reply
+    assert classifier.cache.stats()["exact_hits"] == 2
+
+def test_analytics_reports_a_disabled_cache(monkeypatch):
+    monkeypatch.setattr(main, "llm_intent_classifier", None)
+    summary = main.get_analytics_summary()
+    assert summary["intent_cache"] == {"enabled": False} and summary["llm_intent"] == {"enabled": False}
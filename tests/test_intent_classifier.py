@@ -0,0 +1,40 @@
+# tests/test_intent_classifier.py - Keyword rule priority and parity with the original cascade
+import pytest
+
+from benchmarks.bench_intent import CORPUS, legacy_detect_intent
+from intent_classifier import FALLBACK_RESULT, classify_intent
+
+@pytest.mark.parametrize("message, intent", [
+    ("Done", "farewell"),  # Button clicks match the whole message
+    ("Check other services", "greeting"),
+    ("I need a garage sale permit", "apply_permit"),
+    ("check permit GSP-2026-001", "check_status"),
+    ("pay my water bill", "pay_bill"),
+    ("I got a parking ticket", "pay_ticket"),
+    ("There is a pothole", "report_issue"),
+    ("check status", "check_status"),
+    ("check my application status", "apply_permit"),  # "application" is a permit keyword, checked first
+    ("I want to talk to a human", "escalate"),
+    ("help me", "greeting"),  # "help" outranks the longer "help me"
+    ("this is weird", "greeting"),  # Keywords match inside words: "hi" in "this"
+])
+def test_rule_priority(message, intent):
+    assert classify_intent(message)["intent"] == intent
+
+def test_garage_sale_entities():
+    result = classify_intent("Yard sale next weekend")
+    assert result["entities"] == {"permit_type": "garage_sale"}
+    assert result["confidence"] == 0.95 and not result["needs_clarification"]
+
+def test_unmatched_message_needs_clarification():
+    assert classify_intent("xyz") == FALLBACK_RESULT
+
+def test_results_do_not_share_entities():
+    classify_intent("garage sale")["entities"]["date"] = "2026-06-08"
+    classify_intent("xyz")["entities"]["date"] = "2026-06-08"
+    assert classify_intent("garage sale")["entities"] == {"permit_type": "garage_sale"}
+    assert FALLBACK_RESULT["entities"] == {}
+
+@pytest.mark.parametrize("message", CORPUS)
+def test_matches_the_original_cascade(message):
+    assert classify_intent(message) == legacy_detect_intent(message)
@@ -0,0 +1,64 @@
+# tests/test_interaction_log.py - Background writer, lock-free counters and forked workers
+import io
+import json
+import os
+import threading
+
+import pytest
+
+from interaction_log import Counter, InteractionLogger, RotatingFileSink, StreamSink
+
+def test_records_are_written_in_order():
+    stream = io.StringIO()
+    interaction_log = InteractionLogger(StreamSink(stream), batch_size=4, flush_interval=0.01)
+    for i in range(10):
+        interaction_log.log({"event": "interaction", "n": i})
+    interaction_log.stop()
+    assert [json.loads(line)["n"] for line in stream.getvalue().splitlines()] == list(range(10))
+    stats = interaction_log.stats()
+    assert 3 <= stats.pop("batches") <= 10  # Batches of up to 4, depending on how fast the writer keeps up
+    assert stats == {"enqueued": 10, "written": 10, "dropped": 0, "write_errors": 0, "debug_sampled_out": 0, "queued": 0}
+
+def test_full_queue_and_stopped_logger_drop_records():
+    release = threading.Event()
+    class StalledSink(StreamSink):
+        def write_batch(self, lines):
+            release.wait(5)
+    interaction_log = InteractionLogger(StalledSink(), queue_size=2, batch_size=1, flush_interval=0.01)
+    for i in range(10):
+        interaction_log.log({"n": i})
+    release.set()
+    interaction_log.stop()
+    interaction_log.log({"n": "late"})
+    counters = interaction_log.counters
+    assert counters["enqueued"] + counters["dropped"] == 11 and counters["dropped"] >= 7
+
+def test_counters_are_exact_across_threads():
+    counter = Counter()
+    threads = [threading.Thread(target=lambda: [counter.increment() for _ in range(10000)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.value() == counter.value() == 80000  # Reading does not move the count
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_worker_starts_its_own_writer(tmp_path):
+    path = str(tmp_path / "interactions.jsonl")
+    interaction_log = InteractionLogger(RotatingFileSink(path, per_process=True), flush_interval=0.01)
+    interaction_log.log({"process": "parent"})  # Writer thread started before the fork, as with --preload
+    pid = os.fork()
+    if pid == 0:
+        try:
+            interaction_log.log({"process": "child"})
+            interaction_log.stop()
+            os._exit(0 if interaction_log.counters["written"] == 1 else 1)
+        finally:
+            os._exit(2)
+    _, status = os.waitpid(pid, 0)
+    interaction_log.stop()
+    assert os.waitstatus_to_exitcode(status) == 0
+    with open(f"{path}.{pid}") as f:
+        assert [json.loads(line) for line in f] == [{"process": "child"}]
+    with open(f"{path}.{os.getpid()}") as f:
+        assert [json.loads(line) for line in f] == [{"process": "parent"}]
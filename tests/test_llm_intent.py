@@ -0,0 +1,118 @@
+# tests/test_llm_intent.py - Circuit breaker states and the LLM classifier's keyword fallback
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from llm_intent import CircuitBreaker, LLMIntentClassifier
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def test_breaker_opens_after_consecutive_failures():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()  # Resets the streak
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+def test_half_open_breaker_lets_one_probe_through():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    clock.now = 30
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()  # The probe is still in flight
+    breaker.record_failure()  # Failed probe: open for another reset_timeout
+    assert breaker.state == "open"
+    clock.now = 60
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
+
+def test_released_probe_can_be_retried():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    clock.now = 30
+    assert breaker.allow()
+    breaker.release_probe()
+    assert breaker.allow()
+
+def completion(payload) -> httpx.Response:
+    return httpx.Response(200, json={"choices": [{"message": {"content": json.dumps(payload)}}]})
+
+def classifier_for(handler, **kwargs) -> LLMIntentClassifier:
+    classifier = LLMIntentClassifier(max_attempts=2, **kwargs)
+    classifier._client = httpx.AsyncClient(base_url="http://llm.test", transport=httpx.MockTransport(handler))
+    return classifier
+
+def test_model_answer_is_used():
+    classifier = classifier_for(lambda request: completion({"intent": "pay_ticket", "confidence": 0.7}))
+    result = run(classifier.detect("the city towed my car"))
+    assert result == {"intent": "pay_ticket", "confidence": 0.7, "entities": {}, "needs_clarification": False}
+    assert classifier.stats()["llm_successes"] == 1
+
+def test_button_clicks_skip_the_model():
+    def handler(request):
+        raise AssertionError("button clicks must not call the model")
+    assert run(classifier_for(handler).detect("Download receipt"))["intent"] == "download_receipt"
+
+@pytest.mark.parametrize("response", [
+    httpx.Response(500),
+    completion({"intent": "order_pizza"}),  # Not one of KNOWN_INTENTS
+    httpx.Response(200, json={"choices": []}),
+])
+def test_bad_answers_fall_back_to_keywords(response):
+    attempts = []
+    def handler(request):
+        attempts.append(request)
+        return response
+    classifier = classifier_for(handler)
+    assert run(classifier.detect("pay my water bill"))["intent"] == "pay_bill"
+    assert len(attempts) == 2  # Retried within the deadline
+    assert classifier.counters["llm_failures"] == classifier.counters["fallbacks"] == 1
+
+def test_open_breaker_skips_the_model():
+    calls = []
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503)
+    classifier = classifier_for(handler, breaker=CircuitBreaker(failure_threshold=2, clock=FakeClock()))
+    for _ in range(4):
+        assert run(classifier.detect("I want to report a pothole"))["intent"] == "report_issue"
+    assert len(calls) == 4  # Two detections with two attempts each, then the breaker opened
+    assert classifier.stats()["breaker_state"] == "open"
+    assert classifier.counters["breaker_rejections"] == 2
+
+def test_cancelled_probe_is_released():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    clock.now = 30
+    classifier = LLMIntentClassifier(breaker=breaker)
+    async def hang(message, conversation_history):
+        await asyncio.sleep(10)
+    classifier._detect_within_deadline = hang
+    async def cancel_detection():
+        task = asyncio.create_task(classifier.detect("is the pool open"))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    run(cancel_detection())
+    assert not breaker.probe_in_flight and breaker.allow()
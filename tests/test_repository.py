@@ -0,0 +1,99 @@
+# tests/test_repository.py - Smoke tests for the city data repositories (in-memory and SQLite)
+import asyncio
+import copy
+from typing import Dict
+
+import pytest
+
+from repository import SEED_BILLS, InMemoryCityRepository, SQLCityRepository
+
+@pytest.fixture(params=["memory", "sql"])
+def repo(request):
+    if request.param == "memory":
+        repository = InMemoryCityRepository(latency=0)
+    else:
+        repository = SQLCityRepository(path=":memory:", pool_size=2)
+    yield repository
+    asyncio.run(repository.close())
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def test_find_bill_by_full_address(repo):
+    result = run(repo.find_bill("123 Main Street"))
+    assert result["found"]
+    assert result["address"] == "123 main st"
+    assert result["data"]["type"] == "water"
+
+def test_misspelled_address_offers_candidates(repo):
+    result = run(repo.find_bill("12 mian"))
+    assert not result["found"]
+    assert result["candidates"] == ["123 Main St"]
+
+def test_unknown_address(repo):
+    assert run(repo.find_bill("999 Nowhere Boulevard")) == {"found": False, "candidates": []}
+
+def test_tickets_and_applications(repo):
+    assert run(repo.get_ticket("TK002"))["type"] == "speeding"
+    assert run(repo.get_ticket("nope")) is None
+    assert run(repo.get_application("APP001"))["status"] == "pending review"
+    result = run(repo.find_application_by_address("123 main st"))
+    assert result["found"] and result["app_id"] == "APP001"
+
+def test_garage_sale_permit_counts_toward_limit(repo):
+    permit = {"permit_id": "GSP-2026-001", "date": "2026-06-08", "duration": 1, "status": "approved", "year": 2026}
+    run(repo.add_garage_sale_permit("77 Elm Street", permit))
+    count, permits = run(repo.approved_permits("77 elm st", 2026))
+    assert count == 1 and permits[0]["permit_id"] == "GSP-2026-001"
+    assert run(repo.approved_permits("77 elm st", 2025))[0] == 0
+    assert run(repo.find_application_by_address("77 Elm Street"))["app_id"] == "GSP-2026-001"
+    assert "GSP-2026-001" in repo.issued_ids()
+
+def test_tied_addresses_ask_which_one():
+    bills = copy.deepcopy(SEED_BILLS)
+    bills["500 main st"] = dict(bills["123 main st"], account="WAT-005000")
+    repository = InMemoryCityRepository(bills=bills, latency=0)
+    result = run(repository.find_bill("main street"))
+    assert not result["found"]
+    assert result["candidates"] == ["123 Main St", "500 Main St"]
+    assert run(repository.find_bill("500 main st"))["address"] == "500 main st"
+
+def test_sql_seeding_is_idempotent(tmp_path):
+    path = str(tmp_path / "lia.db")
+    first = SQLCityRepository(path=path, pool_size=1)
+    second = SQLCityRepository(path=path, pool_size=1)  # Another worker starting on the seeded file
+    assert len(second.bill_addresses) == len(first.bill_addresses) == len(SEED_BILLS)
+    run(first.close())
+    run(second.close())
+
+@pytest.mark.parametrize("backend", ["memory", "sql"])
+def test_concurrent_permits_respect_the_annual_limit(backend, tmp_path):
+    if backend == "memory":
+        repository = InMemoryCityRepository(latency=0.01)
+    else:
+        repository = SQLCityRepository(path=str(tmp_path / "lia.db"), pool_size=4)
+    async def issue(number: int) -> Dict:
+        permit = {"permit_id": f"GSP-2026-1{number:02d}", "date": "2026-06-08", "duration": 1,
+                  "status": "approved", "year": 2026}
+        return await repository.issue_garage_sale_permit("900 Maple Avenue", permit, 2)
+    async def burst():
+        return await asyncio.gather(*(issue(number) for number in range(6)))
+    results = run(burst())
+    assert sum(result["issued"] for result in results) == 2
+    assert run(repository.approved_permits("900 maple ave", 2026))[0] == 2
+    assert all(result["current_count"] == 2 for result in results if not result["issued"])
+    run(repository.close())
+
+def test_sql_workers_see_each_others_records(tmp_path):
+    path = str(tmp_path / "lia.db")
+    worker_a = SQLCityRepository(path=path, pool_size=1)
+    worker_b = SQLCityRepository(path=path, pool_size=1)
+    permit = {"permit_id": "GSP-2026-007", "date": "2026-06-08", "duration": 1, "status": "approved", "year": 2026}
+    run(worker_a.issue_garage_sale_permit("77 Elmwood Street", permit, 2))
+    assert run(worker_b.find_application_by_address("77 elmwood st"))["app_id"] == "GSP-2026-007"
+    assert run(worker_b.find_application_by_address("77 Elmwod"))["candidates"] == ["77 Elmwood Street"]  # Address index
+    worker_a.pool.run_sync(lambda connection: connection.execute(
+        "INSERT INTO bills VALUES ('9 birch rd', 10.0, 'water', '2026-07-01', 'WAT-009999')").connection.commit())
+    assert run(worker_b.find_bill("9 Birch Road"))["address"] == "9 birch rd"
+    run(worker_a.close())
+    run(worker_b.close())
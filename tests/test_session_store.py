@@ -0,0 +1,147 @@
+# tests/test_session_store.py - The same get/save/TTL/lock checks against every session store backend
+import asyncio
+import time
+from datetime import datetime
+
+import fakeredis
+import fakeredis.aioredis
+import pytest
+
+from conversation_history import ConversationHistory
+from session_store import InMemorySessionStore, RedisSessionStore, new_session
+
+TTL = 1  # Seconds; Redis key TTLs have one-second resolution
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture(params=["memory", "redis"])
+def store_and_advance(request):
+    """(store, advance) where advance(seconds) moves the store's notion of time forward"""
+    if request.param == "memory":
+        clock = FakeClock()
+        def advance(seconds: float) -> None:
+            clock.now += seconds
+        return InMemorySessionStore(ttl_seconds=TTL, max_entries=100, clock=clock), advance
+    server = fakeredis.FakeServer()
+    store = RedisSessionStore(fakeredis.FakeRedis(server=server), ttl_seconds=TTL,
+                              async_client=fakeredis.aioredis.FakeRedis(server=server))
+    return store, time.sleep
+
+@pytest.fixture
+def store(store_and_advance):
+    return store_and_advance[0]
+
+def test_get_missing_session(store):
+    assert store.get("nobody") is None
+    assert store.stats()["misses"] == 1
+
+def test_save_and_get_round_trip(store):
+    session = new_session()
+    session["intent"] = "pay_bill"
+    session["step"] = 2
+    session["context"]["address"] = "123 main st"
+    session["conversation_history"].append("user", "I want to pay my water bill")
+    store.save("s1", session)
+
+    loaded = store.get("s1")
+    assert loaded["intent"] == "pay_bill"
+    assert loaded["step"] == 2
+    assert loaded["context"] == {"address": "123 main st"}
+    assert isinstance(loaded["created_at"], datetime)
+    assert isinstance(loaded["conversation_history"], ConversationHistory)
+    assert [turn.text for turn in loaded["conversation_history"]] == ["I want to pay my water bill"]
+    assert store.stats()["hits"] == 1
+
+def test_get_or_create_saves_new_session(store):
+    session = store.get_or_create("s1")
+    assert session["step"] == 0
+    assert store.get("s1") is not None
+    assert len(store) == 1
+
+def test_delete(store):
+    store.save("s1", new_session())
+    store.save("s2", new_session())
+    store.delete("s1")
+    assert store.get("s1") is None
+    assert len(store) == 1
+    assert store.stats()["size"] == 1
+
+def test_values(store):
+    for number in range(3):
+        session = new_session()
+        session["step"] = number
+        store.save(f"s{number}", session)
+    assert sorted(session["step"] for session in store.values()) == [0, 1, 2]
+
+def test_idle_sessions_expire(store_and_advance):
+    store, advance = store_and_advance
+    store.save("idle", new_session())
+    store.save("busy", new_session())
+    advance(TTL * 0.6)
+    store.save("busy", store.get("busy"))  # Saving again restarts the idle timer
+    advance(TTL * 0.6)
+    assert store.get("idle") is None
+    assert store.get("busy") is not None
+    assert len(store) == 1
+
+def test_lock_is_exclusive_per_session(store):
+    first = store.lock("s1")
+    assert first.acquire(blocking=False)
+    try:
+        assert not store.lock("s1").acquire(blocking=False)
+    finally:
+        first.release()
+    again = store.lock("s1")
+    assert again.acquire(blocking=False)
+    again.release()
+
+def test_async_api_round_trip(store):
+    async def run():
+        await store.asave("s1", new_session())
+        session = await store.aget("s1")
+        created = await store.aget_or_create("s2")
+        return session, created
+    session, created = asyncio.run(run())
+    assert session["step"] == 0
+    assert created["step"] == 0
+    assert len(store) == 2
+
+def test_alock_serializes_turns(store):
+    inside = []
+    overlaps = []
+    async def turn():
+        async with store.alock("s1"):
+            if inside:
+                overlaps.append(True)
+            inside.append(True)
+            await asyncio.sleep(0.01)
+            inside.pop()
+    async def run():
+        await asyncio.gather(*(turn() for _ in range(3)))
+    asyncio.run(run())
+    assert overlaps == []
+
+def test_memory_store_evicts_least_recently_used():
+    store = InMemorySessionStore(ttl_seconds=60, max_entries=2)
+    store.save("a", new_session())
+    store.save("b", new_session())
+    store.get("a")
+    store.save("c", new_session())
+    assert store.get("b") is None
+    assert store.get("a") is not None
+    assert store.stats()["capacity_evictions"] == 1
+
+def test_redis_store_size_does_not_scan():
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server)
+    store = RedisSessionStore(client, ttl_seconds=60)
+    for number in range(5):
+        store.save(f"s{number}", new_session())
+    client.scan_iter = None  # len() and stats() must not need a SCAN
+    assert len(store) == 5
+    assert store.stats()["size"] == 5
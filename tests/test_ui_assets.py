@@ -0,0 +1,84 @@
+# tests/test_ui_assets.py - Content negotiation, ETags and revalidation for the precompressed UI
+import asyncio
+import gzip
+import os
+
+import httpx
+import pytest
+
+import main
+import ui_assets
+from ui_assets import VERSIONED_CACHE_CONTROL, CompressedAsset, UIBundle, accepted_encodings
+
+BODY = b"body { color: #123456; }\n" * 40
+
+@pytest.mark.parametrize("header, accepted", [
+    ("gzip, deflate, br", {"gzip", "deflate", "br"}),
+    ("br;q=0, gzip;q=0.8", {"gzip"}),
+    ("GZIP ; q=1", {"gzip"}),
+    ("", {""}),
+])
+def test_accepted_encodings(header, accepted):
+    assert accepted_encodings(header) == accepted
+
+def test_preferred_encoding():
+    asset = CompressedAsset(BODY, "text/css")
+    assert asset.encoding_for("gzip") == "gzip"
+    assert asset.encoding_for("deflate") == "identity"
+    assert asset.encoding_for("") == "identity"
+    assert asset.encoding_for("*") == ("br" if ui_assets.brotli else "gzip")
+    assert CompressedAsset(BODY, "image/png", compress=False).encoding_for("gzip") == "identity"
+
+def test_every_encoding_has_its_own_etag():
+    asset = CompressedAsset(BODY, "text/css")
+    assert len(set(asset.etags.values())) == len(asset.bodies)
+    assert gzip.decompress(asset.bodies["gzip"]) == BODY
+
+def test_matching_etag_revalidates():
+    asset = CompressedAsset(BODY, "text/css")
+    response = asset.response("gzip", None, "no-cache")
+    assert response.headers["content-encoding"] == "gzip" and response.headers["vary"] == "Accept-Encoding"
+    etag = response.headers["etag"]
+    assert asset.response("gzip", etag, "no-cache").status_code == 304
+    assert asset.response("gzip", f'"other", W/{etag}', "no-cache").status_code == 304
+    assert asset.response("gzip", "*", "no-cache").status_code == 304
+    # The gzip tag does not validate the identity representation
+    assert asset.response("", etag, "no-cache").status_code == 200
+
+def make_bundle(tmp_path, **kwargs) -> UIBundle:
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "static").mkdir()
+    (tmp_path / "templates" / "index.html").write_text('<link href="{{ asset_url(\'app.css\') }}">')
+    (tmp_path / "static" / "app.css").write_bytes(BODY)
+    return UIBundle(str(tmp_path / "templates"), str(tmp_path / "static"), **kwargs)
+
+def test_page_links_versioned_assets(tmp_path):
+    bundle = make_bundle(tmp_path)
+    version = bundle.assets["app.css"].version
+    assert f"/static/app.css?v={version}".encode() in bundle.page.bodies["identity"]
+    assert bundle.asset_response("app.css", version, {}).headers["cache-control"] == VERSIONED_CACHE_CONTROL
+    assert bundle.asset_response("app.css", "stale", {}).headers["cache-control"] == "no-cache"
+    assert bundle.asset_response("missing.css", None, {}) is None
+
+def test_reload_changes_the_etag(tmp_path, monkeypatch):
+    monkeypatch.setattr(ui_assets, "UI_RELOAD_CHECK_SECONDS", 0)
+    bundle = make_bundle(tmp_path, auto_reload=True)
+    etag = bundle.page_response({}).headers["etag"]
+    css = tmp_path / "static" / "app.css"
+    css.write_bytes(BODY + b"p { margin: 0; }\n")
+    os.utime(css, (css.stat().st_atime, css.stat().st_mtime + 1))  # Coarse filesystem clocks
+    response = bundle.page_response({"if-none-match": etag})
+    assert response.status_code == 200 and response.headers["etag"] != etag
+    assert bundle.loads == 2
+
+def test_served_page_revalidates_over_http():
+    async def fetch():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = await client.get("/", headers={"Accept-Encoding": "gzip"})
+            second = await client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})
+            return first, second
+    first, second = asyncio.run(fetch())
+    assert first.status_code == 200 and b"<html" in first.content.lower()
+    assert second.status_code == 304 and second.content == b""
+    assert second.headers["etag"] == first.headers["etag"]
@@ -0,0 +1,182 @@
+# ui_assets.py - Chat UI rendered once and held precompressed (gzip, brotli) with strong ETags
+import gzip
+import hashlib
+import logging
+import os
+import time
+from functools import lru_cache
+from typing import Dict, Optional
+
+from jinja2 import Environment, FileSystemLoader
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # Optional; without it only gzip is offered
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+UI_TEMPLATE_DIR = os.getenv("UI_TEMPLATE_DIR", "templates")
+UI_STATIC_DIR = os.getenv("UI_STATIC_DIR", "static")
+UI_AUTO_RELOAD = os.getenv("UI_AUTO_RELOAD", "false").lower() == "true"  # Re-render when a template or static file changes
+UI_RELOAD_CHECK_SECONDS = 1.0  # Minimum time between file checks with UI_AUTO_RELOAD
+
+PAGE_CACHE_CONTROL = "no-cache"  # Revalidate the page every time; unchanged pages cost a 304
+VERSIONED_CACHE_CONTROL = "public, max-age=31536000, immutable"  # /static/<file>?v=<content hash>
+UNVERSIONED_CACHE_CONTROL = "no-cache"
+
+MEDIA_TYPES = {
+    ".css": "text/css",  # Starlette adds the charset to text/* types
+    ".js": "application/javascript; charset=utf-8",
+    ".html": "text/html",
+    ".svg": "image/svg+xml",
+    ".json": "application/json",
+    ".png": "image/png",
+    ".ico": "image/x-icon"
+}
+COMPRESSIBLE = {".css", ".js", ".html", ".svg", ".json"}
+
+@lru_cache(maxsize=256)  # Browsers send a handful of distinct headers
+def accepted_encodings(accept_encoding: str) -> frozenset:
+    """Content codings the client accepts (q=0 excluded)"""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                pass
+        accepted.add(name.strip().lower())
+    return frozenset(accepted)
+
+class CompressedAsset:
+    """One response body with its compressed encodings and a strong ETag for each"""
+
+    __slots__ = ("media_type", "bodies", "etags", "version")
+
+    def __init__(self, body: bytes, media_type: str, compress: bool = True):
+        self.media_type = media_type
+        digest = hashlib.sha256(body).hexdigest()
+        self.version = digest[:12]
+        self.bodies = {"identity": body}
+        if compress:
+            if brotli is not None:
+                self.bodies["br"] = brotli.compress(body, quality=11)
+            self.bodies["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+        # Each representation is a different byte sequence, so it gets its own strong tag
+        self.etags = {encoding: f'"{digest[:16]}"' if encoding == "identity" else f'"{digest[:16]}-{encoding}"'
+                      for encoding in self.bodies}
+
+    def encoding_for(self, accept_encoding: str) -> str:
+        if len(self.bodies) == 1 or not accept_encoding:
+            return "identity"
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in ("br", "gzip"):
+            if encoding in self.bodies and (encoding in accepted or "*" in accepted):
+                return encoding
+        return "identity"
+
+    def response(self, accept_encoding: str, if_none_match: Optional[str], cache_control: str) -> Response:
+        encoding = self.encoding_for(accept_encoding)
+        etag = self.etags[encoding]
+        headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            if etag in tags or "*" in tags:
+                return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(self.bodies[encoding], media_type=self.media_type, headers=headers)
+
+class UIBundle:
+    """index.html and the static files it links, loaded once and swapped in whole on reload
+
+    The page links assets as /static/<name>?v=<content hash>, so browsers keep them
+    until a deploy changes them and only revalidate the page itself.
+    """
+
+    def __init__(self, template_dir: str = UI_TEMPLATE_DIR, static_dir: str = UI_STATIC_DIR,
+                 auto_reload: bool = UI_AUTO_RELOAD):
+        self.template_dir = template_dir
+        self.static_dir = static_dir
+        self.auto_reload = auto_reload
+        self.page: Optional[CompressedAsset] = None
+        self.assets: Dict[str, CompressedAsset] = {}
+        self.loads = 0
+        self._mtimes: Dict[str, float] = {}
+        self._checked = 0.0
+        self.load()
+
+    def _files(self) -> Dict[str, float]:
+        files = {}
+        for directory in (self.template_dir, self.static_dir):
+            if os.path.isdir(directory):
+                for name in os.listdir(directory):
+                    path = os.path.join(directory, name)
+                    if os.path.isfile(path):
+                        files[path] = os.stat(path).st_mtime
+        return files
+
+    def load(self) -> None:
+        mtimes = self._files()
+        assets = {}
+        if os.path.isdir(self.static_dir):
+            for name in sorted(os.listdir(self.static_dir)):
+                path = os.path.join(self.static_dir, name)
+                if not os.path.isfile(path):
+                    continue
+                extension = os.path.splitext(name)[1].lower()
+                with open(path, "rb") as f:
+                    assets[name] = CompressedAsset(f.read(), MEDIA_TYPES.get(extension, "application/octet-stream"),
+                                                   extension in COMPRESSIBLE)
+
+        def asset_url(name: str) -> str:
+            asset = assets.get(name)
+            return f"/static/{name}?v={asset.version}" if asset else f"/static/{name}"
+
+        environment = Environment(loader=FileSystemLoader(self.template_dir), autoescape=True)
+        html = environment.get_template("index.html").render(asset_url=asset_url)
+        self.page = CompressedAsset(html.encode("utf-8"), MEDIA_TYPES[".html"])
+        self.assets = assets
+        self._mtimes = mtimes
+        self.loads += 1
+        logger.info(f"UI loaded: page {len(self.page.bodies['identity'])} bytes, {len(assets)} static files"
+                    f"{'' if brotli else ' (brotli not installed, gzip only)'}")
+
+    def refresh(self) -> None:
+        """Reload if a file changed (UI_AUTO_RELOAD only, checked at most once per UI_RELOAD_CHECK_SECONDS)"""
+        if not self.auto_reload:
+            return
+        now = time.monotonic()
+        if now - self._checked < UI_RELOAD_CHECK_SECONDS:
+            return
+        self._checked = now
+        if self._files() != self._mtimes:
+            logger.info("UI files changed, reloading")
+            self.load()
+
+    def page_response(self, headers) -> Response:
+        self.refresh()
+        return self.page.response(headers.get("accept-encoding", ""), headers.get("if-none-match"), PAGE_CACHE_CONTROL)
+
+    def asset_response(self, name: str, version: Optional[str], headers) -> Optional[Response]:
+        """None when there is no such static file"""
+        self.refresh()
+        asset = self.assets.get(name)
+        if asset is None:
+            return None
+        cache_control = VERSIONED_CACHE_CONTROL if version == asset.version else UNVERSIONED_CACHE_CONTROL
+        return asset.response(headers.get("accept-encoding", ""), headers.get("if-none-match"), cache_control)
+
+    def stats(self) -> Dict:
+        return {
+            "loads": self.loads,
+            "page_bytes": {encoding: len(body) for encoding, body in self.page.bodies.items()},
+            "static_files": len(self.assets),
+            "brotli": brotli is not None
+        }